@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+# Benchmark für wav2flac: erzeugt synthetische Archive und misst Suche, Parser, Tracknummern
+# und Konvertierung. Aufruf aus dem Ordner Audio-Konvertierung: python3 -m benchmark --help
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Benchmark für wav2flac
+# Aufruf (im Ordner Audio-Konvertierung):
+#   python3 -m benchmark                          # Standard-Archiv, Bericht nach benchmark-<commit>.json
+#   python3 -m benchmark --boxes 20 --tracks 12   # größeres Archiv
+#   python3 -m benchmark --compare alt.json       # Vergleich mit einem früheren Bericht
+# Gemessen werden Suche, Parser, Tracknummern und die Konvertierung mit ffmpeg und einem Schein-Encoder,
+# der nur einen gültigen FLAC-Header schreibt (misst alles außer der eigentlichen Kodierung).
+
+# --- Imports ---
+import os, sys, json, time, wave, io, struct, shutil, platform, tempfile, argparse, statistics, subprocess
+from dataclasses import fields
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # wav2flac.py liegt neben dem Paket
+
+import wav2flac
+import normalization # von wav2flac in sys.path eingetragen
+from scheduler import ByteBudget
+from benchmark.archive import ArchiveSpec, generate_archive
+
+# --- Schein-Encoder ---
+def fake_streaminfo(data: bytes | None, in_wav: Path) -> bytes:
+    # STREAMINFO (34 Bytes) mit den Eckdaten der WAV, ohne Audiodaten und MD5
+    with wave.open(io.BytesIO(data) if data is not None else str(in_wav), "rb") as w:
+        rate, channels, bits, frames = w.getframerate(), w.getnchannels(), w.getsampwidth() * 8, w.getnframes()
+    packed = (rate << 44) | ((channels - 1) << 41) | ((bits - 1) << 36) | frames
+    return struct.pack(">HH", 4096, 4096) + bytes(6) + packed.to_bytes(8, "big") + bytes(16)
+
+def encode_fake(in_wav: Path, out_flac: Path, tags: dict, picture, compression_level: int = 5,
+                dry_run: bool = False, data: bytes | None = None) -> bool:
+    out_flac.parent.mkdir(parents=True, exist_ok=True)
+    if dry_run:
+        return False
+    header = b"fLaC" + wav2flac.flac_block(0, fake_streaminfo(data, in_wav)) \
+        + wav2flac.flac_block(1, bytes(wav2flac.FLAC_PADDING), is_last=True)
+    out_flac.write_bytes(header)
+    return False # Tags und Cover schreibt wie bei ffmpeg die Schreib-Stufe
+
+wav2flac.ENCODERS["fake"] = encode_fake
+
+# --- Messung ---
+CACHED = [ # vor jeder Messung leeren, sonst misst der zweite Durchlauf nur Cache-Treffer
+    wav2flac.classify_dir, wav2flac.resolve_single_media, wav2flac.resolve_box_disc, wav2flac.resolve_work,
+    wav2flac.find_cover, wav2flac.load_picture, wav2flac.cover_key, wav2flac.has_booklet, *normalization.CACHED,
+]
+
+def clear_caches() -> None:
+    for func in CACHED:
+        func.cache_clear()
+
+def measure(func, repeat: int, setup=None) -> list[float]:
+    runs = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        clear_caches()
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+def summarize(runs: list[float], items: int) -> dict:
+    best = min(runs)
+    return {
+        "items": items,
+        "runs": [round(r, 6) for r in runs],
+        "best": round(best, 6),
+        "median": round(statistics.median(runs), 6),
+        "per_item_us": round(best / max(1, items) * 1e6, 2),
+    }
+
+def convert_once(src: Path, out: Path, encoder: str, workers: int, manifest: dict | None = None) -> dict:
+    # Der Schein-Encoder schreibt keine MD5 -> Prüf-Stufe nur für echte Encoder
+    cfg = wav2flac.RunConfig(src, out, manifest if manifest is not None else {}, encoder=encoder,
+                             budget=ByteBudget(wav2flac.BUFFER_BYTES), verify=encoder != "fake")
+    counts, errors, submitted = wav2flac.convert_tree(cfg, workers)
+    if errors:
+        raise RuntimeError(f"{len(errors)} Fehler bei Encoder {encoder}, z. B. {errors[0][0]}: {errors[0][1]}")
+    return cfg.manifest
+
+def run_benchmarks(src: Path, work: Path, args) -> dict:
+    results = {}
+    containers = list(wav2flac.iter_containers(src))
+    wavs = [w for _, ws in containers for w in ws]
+    print(f"Archiv: {len(wavs)} WAV-Dateien in {len(containers)} Containern")
+
+    runs = measure(lambda: list(wav2flac.iter_containers(src)), args.repeat)
+    results["discovery"] = summarize(runs, len(wavs))
+
+    runs = measure(lambda: [wav2flac.parse_path(w) for w in wavs], args.repeat)
+    results["parse"] = summarize(runs, len(wavs))
+
+    runs = measure(lambda: [wav2flac.assign_tracknumbers(ws) for _, ws in containers], args.repeat)
+    results["tracknumbers"] = summarize(runs, len(wavs))
+
+    for encoder in args.encoders:
+        if encoder == "ffmpeg" and not shutil.which("ffmpeg"):
+            print("ffmpeg nicht gefunden - Messung übersprungen.", file=sys.stderr)
+            continue
+        if not wav2flac.encoder_available(encoder):
+            print(f"Encoder {encoder} nicht verfügbar - Messung übersprungen.", file=sys.stderr)
+            continue
+        out = work / f"out-{encoder}"
+        reset = lambda: shutil.rmtree(out, ignore_errors=True)
+        manifest = {}
+        def convert():
+            manifest.clear()
+            manifest.update(convert_once(src, out, encoder, args.workers))
+        results[f"convert_{encoder}"] = summarize(measure(convert, args.e2e_repeat, setup=reset), len(wavs))
+
+        # Zweiter Lauf über denselben Ausgabeordner: nur Manifest-Abgleich, nichts zu tun
+        runs = measure(lambda: convert_once(src, out, encoder, args.workers, manifest=dict(manifest)), args.e2e_repeat)
+        results[f"rerun_{encoder}"] = summarize(runs, len(wavs))
+    return results
+
+# --- Bericht ---
+def git_commit() -> tuple[str, bool]:
+    here = Path(__file__).resolve().parent
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=here, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--", ".."], cwd=here,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, dirty
+
+def print_results(results: dict) -> None:
+    print(f"\n{'Messung':<20} {'Dateien':>8} {'beste [s]':>10} {'Median [s]':>11} {'pro Datei [µs]':>15}")
+    for name, r in results.items():
+        print(f"{name:<20} {r['items']:>8} {r['best']:>10.4f} {r['median']:>11.4f} {r['per_item_us']:>15.1f}")
+
+def print_comparison(old: dict, new: dict) -> None:
+    if old.get("spec") != new.get("spec"):
+        print("\n[WARNING] Archiv-Parameter unterscheiden sich - Zahlen nur bedingt vergleichbar.")
+    print(f"\nVergleich mit {old.get('commit', 'unknown')[:10]} (beste Zeit):")
+    print(f"{'Messung':<20} {'alt [s]':>10} {'neu [s]':>10} {'Änderung':>10}")
+    for name, r in new["results"].items():
+        before = old.get("results", {}).get(name)
+        if not before:
+            print(f"{name:<20} {'-':>10} {r['best']:>10.4f} {'neu':>10}")
+            continue
+        change = (r["best"] - before["best"]) / before["best"] * 100 if before["best"] else 0.0
+        print(f"{name:<20} {before['best']:>10.4f} {r['best']:>10.4f} {change:>+9.1f}%")
+
+# --- Argumente ---
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    defaults = ArchiveSpec()
+    parser = argparse.ArgumentParser(prog="python3 -m benchmark", description="Benchmark für wav2flac mit synthetischem Archiv.")
+    parser.add_argument("--singles", type=int, default=defaults.singles, help="Anzahl Einzel-CDs")
+    parser.add_argument("--boxes", type=int, default=defaults.boxes, help="Anzahl Boxen")
+    parser.add_argument("--discs", type=int, default=defaults.discs, help="CDs pro Box")
+    parser.add_argument("--works", type=int, default=defaults.works, help="Werke pro CD")
+    parser.add_argument("--tracks", type=int, default=defaults.tracks, help="Sätze pro Werk")
+    parser.add_argument("--seconds", type=float, default=defaults.seconds, help="Länge jeder WAV in Sekunden")
+    parser.add_argument("--no-edge-cases", action="store_true", help="nur einfache Namen (ohne --, Op., Nº, Großschreibung)")
+    parser.add_argument("--no-covers", action="store_true", help="keine Booklet-Cover anlegen")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--repeat", type=int, default=5, help="Wiederholungen für Suche/Parser/Tracknummern")
+    parser.add_argument("--e2e-repeat", type=int, default=1, help="Wiederholungen für die Konvertierung")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Kodier-Threads")
+    parser.add_argument("--encoders", default="fake,ffmpeg", help="kommagetrennt, z. B. fake,ffmpeg,libflac")
+    parser.add_argument("--keep", type=Path, help="Archiv und Ausgaben in diesem Ordner behalten")
+    parser.add_argument("--output", type=Path, help="Bericht (JSON); Standard: benchmark-<commit>.json")
+    parser.add_argument("--compare", type=Path, help="früherer Bericht zum Vergleich")
+    args = parser.parse_args(argv)
+    args.encoders = [e.strip() for e in args.encoders.split(",") if e.strip()]
+    return args
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    spec = ArchiveSpec(singles=args.singles, boxes=args.boxes, discs=args.discs, works=args.works, tracks=args.tracks,
+                       seconds=args.seconds, edge_cases=not args.no_edge_cases, covers=not args.no_covers, seed=args.seed)
+
+    work = args.keep or Path(tempfile.mkdtemp(prefix="wav2flac-bench-"))
+    try:
+        src = work / "archiv"
+        shutil.rmtree(src, ignore_errors=True)
+        start = time.perf_counter()
+        count = generate_archive(src, spec)
+        print(f"Archiv erzeugt: {count} WAV-Dateien in {time.perf_counter() - start:.1f} s ({src})")
+        results = run_benchmarks(src, work, args)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work, ignore_errors=True)
+
+    commit, dirty = git_commit()
+    report = {
+        "commit": commit,
+        "dirty": dirty,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "workers": args.workers,
+        "spec": {f.name: getattr(spec, f.name) for f in fields(spec)},
+        "results": results,
+    }
+    print_results(results)
+
+    output = args.output or Path(f"benchmark-{commit[:10]}{'-dirty' if dirty else ''}.json")
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nBericht: {output}")
+
+    if args.compare:
+        print_comparison(json.loads(args.compare.read_text(encoding="utf-8")), report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Synthetische Archive im Layout, das classify_path erwartet:
+#   <root>/EinzelCDs/<Komponist>-<Album>/<Komponist>-<Werk>/<Kurz>-<Werk>-<NN>-<Satz>.wav
+#   <root>/Boxen/<Komponist>-<BOX>/<Komponist>-<BOX>._CD<n>/<Komponist>-<Werk>/<Kurz>-<Werk>-<NN>-<Satz>.wav
+# Gleiche Parameter und gleicher Seed ergeben auf jedem Rechner dasselbe Archiv.
+
+# --- Imports ---
+import io, math, random, struct, wave
+from dataclasses import dataclass
+from pathlib import Path
+
+try:
+    from PIL import Image # optional: echte JPEG-Cover statt Platzhalter-Bytes
+except ImportError:
+    Image = None
+
+# --- Parameter ---
+@dataclass
+class ArchiveSpec:
+    singles: int = 10           # Einzel-CDs
+    boxes: int = 3              # Boxen
+    discs: int = 4              # CDs pro Box
+    works: int = 3              # Werke pro CD
+    tracks: int = 4             # Sätze pro Werk
+    seconds: float = 0.5        # Länge jeder WAV
+    sample_rate: int = 44100
+    edge_cases: bool = True     # Namen mit "--", "Op.", "Nº", Großschreibung, Umlauten, ohne Satznummer
+    covers: bool = True         # booklet/booklet-b.jpg pro Album
+    seed: int = 1
+
+    @property
+    def wav_count(self) -> int:
+        return (self.singles + self.boxes * self.discs) * self.works * self.tracks
+
+# --- Namen ---
+COMPOSERS = [
+    ("Bach,Johann_Sebastian", "Bach"),
+    ("Beethoven,Ludwig_van", "Beethoven"),
+    ("Brahms,Johannes", "Brahms"),
+    ("Dvořák,Antonín", "Dvořák"),
+    ("Schubert,Franz", "Schubert"),
+    ("Mozart,Wolfgang_Amadeus", "Mozart"),
+]
+WORKS = ["Sonate_für_Klavier_Nr._{n}", "Streichquartett_Nr._{n}", "Sinfonie_Nr._{n}", "Suite_Nr._{n}"]
+MOVEMENTS = ["Allegro", "Andante_con_moto", "Menuetto", "Presto", "Adagio_ma_non_troppo", "Finale"]
+
+# Varianten, die die Normalisierung besonders fordern; werden reihum eingestreut
+EDGE_WORKS = [
+    "Klaviertrio_Op._{n}",
+    "Sonate_op.{n}_Nº_2",
+    "FANTASIE_IN_F-MOLL_OP.{n}",
+    "Lieder_--_Zyklus_Nr._{n}",
+    "Variationen_über_ein_Thema_Nº{n}",
+]
+EDGE_ALBUMS = ["GESAMTAUFNAHME_Vol._{n}", "Werke_--_Live_{n}", "Kammermusik_op._{n}"]
+
+def work_name(rng: random.Random, n: int, edge: bool) -> str:
+    pattern = rng.choice(EDGE_WORKS) if edge else rng.choice(WORKS)
+    return pattern.format(n=n)
+
+def album_name(rng: random.Random, n: int, edge: bool) -> str:
+    return rng.choice(EDGE_ALBUMS).format(n=n) if edge else f"Album_{n}"
+
+# --- Dateien ---
+def wav_bytes(seconds: float, sample_rate: int) -> bytes:
+    # Stereo-Sinus (16 Bit); gleicher Inhalt für alle Dateien, damit die Erzeugung schnell bleibt
+    frames = int(sample_rate * seconds)
+    samples = b"".join(struct.pack("<hh", int(3000 * math.sin(i / 20)), int(2000 * math.sin(i / 7))) for i in range(min(frames, sample_rate)))
+    data = (samples * (frames // max(1, sample_rate) + 1))[:frames * 4]
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(data)
+    return buf.getvalue()
+
+def cover_bytes(seed: int) -> bytes:
+    if Image is None:
+        return b"\xff\xd8\xff\xe0" + bytes(16 * 1024) + b"\xff\xd9" # Platzhalter; wird nur eingelesen
+    buf = io.BytesIO()
+    Image.new("RGB", (600, 600), ((seed * 37) % 256, (seed * 91) % 256, 120)).save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+def write_disc(disc_dir: Path, composer: tuple[str, str], rng: random.Random, spec: ArchiveSpec,
+               audio: bytes, counter: list[int]) -> None:
+    comp_dir, comp_short = composer
+    for w in range(1, spec.works + 1):
+        counter[0] += 1
+        edge = spec.edge_cases and counter[0] % 3 == 0
+        work = work_name(rng, counter[0], edge)
+        work_dir = disc_dir / f"{comp_dir}-{work}"
+        work_dir.mkdir(parents=True, exist_ok=True)
+        for t in range(1, spec.tracks + 1):
+            movement = MOVEMENTS[(t - 1) % len(MOVEMENTS)]
+            if edge and t == 1:
+                movement = movement.upper()
+            if spec.edge_cases and spec.tracks > 1 and counter[0] % 5 == 0 and t == spec.tracks:
+                name = f"{comp_short}-{movement}_{t}.wav" # Einzelstück ohne Satznummer
+            else:
+                name = f"{comp_short}-{work}-{t:02d}-{movement}.wav"
+            (work_dir / name).write_bytes(audio)
+
+def write_cover(album_dir: Path, seed: int) -> None:
+    booklet = album_dir / "booklet"
+    booklet.mkdir(parents=True, exist_ok=True)
+    (booklet / "booklet-b.jpg").write_bytes(cover_bytes(seed))
+
+def generate_archive(root: Path, spec: ArchiveSpec) -> int:
+    # Legt das Archiv unter root an und gibt die Anzahl der WAV-Dateien zurück
+    rng = random.Random(spec.seed)
+    audio = wav_bytes(spec.seconds, spec.sample_rate)
+    counter = [0] # fortlaufende Werknummer (eindeutige Ordnernamen)
+
+    for i in range(1, spec.singles + 1):
+        composer = COMPOSERS[i % len(COMPOSERS)]
+        album = album_name(rng, i, spec.edge_cases and i % 4 == 0)
+        album_dir = root / "EinzelCDs" / f"{composer[0]}-{album}"
+        write_disc(album_dir, composer, rng, spec, audio, counter)
+        if spec.covers:
+            write_cover(album_dir, i)
+
+    for b in range(1, spec.boxes + 1):
+        composer = COMPOSERS[b % len(COMPOSERS)]
+        edge = spec.edge_cases and b % 2 == 0
+        box = album_name(rng, b, edge).upper()
+        box_dir = root / "Boxen" / f"{composer[0]}-{box}"
+        for d in range(1, spec.discs + 1):
+            disc = f"{box}_Teil_{d}" if edge and d % 2 else box # abweichender Disc-Titel -> boxset-Tag
+            write_disc(box_dir / f"{composer[0]}-{disc}._CD{d}", composer, rng, spec, audio, counter)
+        if spec.covers:
+            write_cover(box_dir, 1000 + b)
+
+    return spec.wav_count
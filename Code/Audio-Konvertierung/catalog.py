@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Katalog aus dem Digitalisierungs-Logbuch für wav2flac:
+# LogbuchConverter.py --catalog <Datei> schreibt eine indizierte SQLite-Tabelle (eine Zeile pro CD-Nummer) mit
+# Interpreten, Datum und Kommentar. wav2flac sucht darin pro Album über Komponist und Medientitel
+# (normalisierte Schlüssel, normalization.match_key); jedes Album wird nur einmal abgefragt, danach kommt das Ergebnis aus dem Speicher.
+
+# --- Imports ---
+import sqlite3, threading
+from pathlib import Path
+from normalization import match_key # gleiche Schlüssel wie LogbuchConverter (wav2flac trägt Code/ in sys.path ein)
+
+# --- Katalog ---
+FIELDS = ("cd_number", "interpreter", "date", "comment")
+
+class Catalog:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"Katalog nicht gefunden: {self.path}")
+        # Nur lesend; eine Verbindung für alle Threads (Zugriff über _lock)
+        self._con = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._cache = {}          # (Komponist, Titel, Disc) -> Eintrag oder None
+        self.unmatched = []       # WAVs ohne Katalogeintrag (Bericht am Ende des Laufs)
+
+    def close(self) -> None:
+        self._con.close()
+
+    def _rows(self, where: str, params: tuple) -> list[dict]:
+        sql = f"SELECT {', '.join(FIELDS)} FROM catalog WHERE {where} ORDER BY pos"
+        with self._lock:
+            return [dict(zip(FIELDS, row)) for row in self._con.execute(sql, params)]
+
+    def lookup(self, composer: str, titles: list[str], discnumber: str = "") -> dict | None:
+        # Eintrag für ein Album: zuerst Komponist + Titel (Album, dann Box-Titel), sonst ein eindeutiger Titel allein
+        # Mehrere Zeilen für denselben Titel (Box mit einer Zeile pro CD): n-te Zeile für CD n
+        composer_key = match_key(composer)
+        title_keys = tuple(k for k in dict.fromkeys(match_key(t) for t in titles if t) if k)
+        key = (composer_key, title_keys, discnumber)
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+
+        rows = []
+        for title_key in title_keys:
+            rows = self._rows("composer_key = ? AND title_key = ?", (composer_key, title_key))
+            if rows:
+                break
+        else:
+            for title_key in title_keys:
+                rows = self._rows("title_key = ?", (title_key,))
+                if len(rows) == 1:
+                    break
+                rows = []
+
+        entry = None
+        if rows:
+            disc = int(discnumber) if discnumber.isdigit() else 0
+            entry = rows[disc - 1] if 0 < disc <= len(rows) else rows[0]
+        with self._lock:
+            self._cache[key] = entry
+        return entry
+
+    def report_unmatched(self, wav: Path) -> None:
+        with self._lock:
+            self.unmatched.append(wav)
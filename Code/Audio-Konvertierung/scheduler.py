@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Stufen-Scheduler für wav2flac:
+# Jede Stufe (z. B. Lesen, Kodieren, Schreiben) hat einen eigenen, unabhängig dimensionierten Thread-Pool.
+# Jobs werden pro Stufe nach Größe abgearbeitet (größte zuerst), gleichzeitige Lesezugriffe pro Gerät
+# lassen sich begrenzen.
+
+# --- Imports ---
+import itertools, queue, threading
+from dataclasses import dataclass
+from typing import Callable
+
+# --- Stufen ---
+@dataclass
+class Stage:
+    name: str
+    func: Callable        # func(job) -> Name der nächsten Stufe oder None (fertig)
+    workers: int
+    per_device: int = 0   # > 0: höchstens so viele gleichzeitige Jobs pro Quellgerät (job.device)
+
+class ByteBudget:
+    # Begrenzt die Datenmenge, die zwischen zwei Stufen im Speicher liegt (auch: Seiten in Arbeit in jpg2pdf)
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size: int, block: bool = True) -> bool:
+        # block=False: sofort False statt warten, wenn das Budget erschöpft ist
+        with self._cond:
+            # Ein einzelner Job größer als das Budget darf laufen, wenn sonst nichts belegt ist
+            fits = lambda: self.used == 0 or self.used + size <= self.limit
+            if block:
+                self._cond.wait_for(fits)
+            elif not fits():
+                return False
+            self.used += size
+            return True
+
+    def release(self, size: int) -> None:
+        with self._cond:
+            self.used -= size
+            self._cond.notify_all()
+
+# --- Scheduler ---
+class StageScheduler:
+    def __init__(self, stages: list[Stage], on_done: Callable):
+        self.stages = {stage.name: stage for stage in stages}
+        self.first = stages[0].name
+        self.on_done = on_done    # on_done(job) wird im Worker-Thread aufgerufen
+        self._queues = {stage.name: queue.PriorityQueue() for stage in stages}
+        self._seq = itertools.count() # gleiche Größe -> Reihenfolge der Einreichung
+        self._device_locks = {}
+        self._device_lock = threading.Lock()
+        self._threads = []
+
+        for stage in stages:
+            for i in range(max(1, stage.workers)):
+                t = threading.Thread(target=self._worker, args=(stage,), name=f"{stage.name}-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, job, stage: str | None = None) -> None:
+        # Größte Dateien zuerst: ein langer Opern-Track soll nicht am Ende des Laufs allein übrig bleiben
+        self._queues[stage or self.first].put((-job.size, next(self._seq), job))
+
+    def close(self) -> None:
+        # Beendet die Worker; erst aufrufen, wenn alle eingereichten Jobs fertig gemeldet wurden
+        for name, stage in self.stages.items():
+            for _ in range(max(1, stage.workers)):
+                self._queues[name].put((float("inf"), next(self._seq), None))
+
+    def _device_slot(self, stage: Stage, device) -> threading.Semaphore:
+        with self._device_lock:
+            key = (stage.name, device)
+            if key not in self._device_locks:
+                self._device_locks[key] = threading.Semaphore(stage.per_device)
+            return self._device_locks[key]
+
+    def _worker(self, stage: Stage) -> None:
+        q = self._queues[stage.name]
+        while True:
+            _, _, job = q.get()
+            if job is None: # Schlusszeichen von close()
+                return
+            try:
+                if stage.per_device:
+                    with self._device_slot(stage, job.device):
+                        nxt = stage.func(job)
+                else:
+                    nxt = stage.func(job)
+            except Exception as e:
+                job.error = str(e)
+                nxt = None
+            if nxt:
+                self.submit(job, nxt)
+            else:
+                self.on_done(job)
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Bit-genaue Prüfung FLAC <-> WAV ohne erneutes Dekodieren:
+# Der Encoder legt im STREAMINFO-Block die MD5-Summe der unkomprimierten Samples ab. Dieselbe Summe lässt sich
+# direkt über den PCM-Daten der WAV bilden (data-Chunk, per mmap eingeblendet, ohne Kopie). Stimmen beide
+# überein, enthält die FLAC exakt das Audio der WAV.
+# Zusätzlich wird der letzte FLAC-Frame geprüft (Sample-Position + CRC-16), um abgeschnittene Dateien zu erkennen.
+
+# --- Imports ---
+import hashlib, mmap, struct
+from dataclasses import dataclass
+from pathlib import Path
+
+# Ergebnis-Status
+OK = "ok"
+MISMATCH = "mismatch"         # MD5 oder Audioformat weichen ab
+NO_MD5 = "no-md5"             # Encoder hat keine MD5 hinterlegt (z. B. Abbruch vor dem Abschluss)
+TRUNCATED = "truncated"       # WAV oder FLAC unvollständig
+LENGTH = "length"             # Anzahl der Samples weicht ab
+UNSUPPORTED = "unsupported"   # Format ohne direkt vergleichbare PCM-Daten (Float, 32-Bit-Container ...)
+MISSING = "missing"           # FLAC fehlt
+ERROR = "error"               # Datei nicht lesbar / ungültig
+
+HASH_CHUNK = 8 << 20 # 8 MB je MD5-Aufruf (Slices eines memoryview, keine Kopien)
+
+# --- WAV ---
+@dataclass
+class PcmInfo:
+    offset: int         # Beginn des data-Chunks
+    size: int           # tatsächlich vorhandene PCM-Bytes
+    channels: int
+    bits: int
+    block_align: int
+    truncated: bool     # data-Chunk kürzer als im Header angegeben
+
+    @property
+    def frames(self) -> int:
+        return self.size // self.block_align if self.block_align else 0
+
+def wav_pcm(buf) -> PcmInfo:
+    # Sucht fmt- und data-Chunk in einer WAV (bytes, mmap oder memoryview)
+    if len(buf) < 12 or buf[0:4] != b"RIFF" or buf[8:12] != b"WAVE":
+        raise ValueError("keine RIFF/WAVE-Datei")
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(buf):
+        chunk_id = bytes(buf[pos:pos + 4])
+        size = struct.unpack_from("<I", buf, pos + 4)[0]
+        start = pos + 8
+        if chunk_id == b"fmt ":
+            tag, channels, _, _, block_align, bits = struct.unpack_from("<HHIIHH", buf, start)
+            if tag == 0xFFFE and size >= 26: # WAVE_FORMAT_EXTENSIBLE: Format steht im SubFormat-GUID
+                valid_bits = struct.unpack_from("<H", buf, start + 18)[0]
+                tag = struct.unpack_from("<H", buf, start + 24)[0]
+                if valid_bits and valid_bits != bits:
+                    raise NotImplementedError(f"{valid_bits} Bit in {bits}-Bit-Containern")
+            if tag != 1:
+                raise NotImplementedError(f"kein Integer-PCM (Format 0x{tag:04x})")
+            fmt = (channels, bits, block_align)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("data-Chunk vor fmt-Chunk")
+            available = len(buf) - start
+            channels, bits, block_align = fmt
+            return PcmInfo(start, min(size, available), channels, bits, block_align, truncated=size > available)
+        pos = start + size + (size & 1) # Chunks sind auf gerade Längen aufgefüllt
+    raise ValueError("kein data-Chunk gefunden")
+
+SIGN_FLIP = bytes(b ^ 0x80 for b in range(256)) # vorzeichenlos <-> vorzeichenbehaftet (8 Bit)
+
+def pcm_md5(buf, info: PcmInfo | None = None, flac_bits: int | None = None) -> str:
+    # MD5 über die Samples, wie FLAC sie bildet: vorzeichenbehaftet, Little Endian, (flac_bits + 7) // 8 Bytes pro Sample
+    info = info or wav_pcm(buf)
+    flac_bits = flac_bits or info.bits
+    if info.bits > 24:
+        raise NotImplementedError(f"{info.bits}-Bit-PCM")
+    if flac_bits != info.bits and (info.bits, flac_bits) != (8, 16):
+        raise ValueError(f"{info.bits}-Bit-WAV und {flac_bits}-Bit-FLAC nicht vergleichbar")
+    view = memoryview(buf)[info.offset:info.offset + info.frames * info.block_align]
+    h = hashlib.md5()
+    for i in range(0, len(view), HASH_CHUNK):
+        chunk = view[i:i + HASH_CHUNK]
+        if info.bits == 8: # 8-Bit-WAV ist vorzeichenlos -> Vorzeichenbit kippen (hier ist eine Kopie nötig)
+            chunk = bytes(chunk).translate(SIGN_FLIP)
+            if flac_bits == 16: # ffmpeg kodiert 8 Bit als 16 Bit (Sample << 8)
+                wide = bytearray(len(chunk) * 2)
+                wide[1::2] = chunk
+                chunk = wide
+        h.update(chunk)
+    view.release()
+    return h.hexdigest()
+
+# --- FLAC ---
+@dataclass
+class StreamInfo:
+    min_block: int
+    max_block: int
+    max_frame: int
+    sample_rate: int
+    channels: int
+    bits: int
+    total_samples: int
+    md5: str            # "" wenn nicht gesetzt
+    audio_offset: int | None # Beginn des ersten Frames (None: Puffer endet in den Metadaten)
+
+def read_streaminfo(buf) -> StreamInfo:
+    if buf[0:4] != b"fLaC":
+        raise ValueError("keine FLAC-Datei")
+    header = buf[4]
+    if header & 0x7F != 0 or struct.unpack(">I", b"\0" + bytes(buf[5:8]))[0] != 34:
+        raise ValueError("STREAMINFO fehlt")
+    min_block, max_block = struct.unpack_from(">HH", buf, 8)
+    max_frame = int.from_bytes(buf[15:18], "big")
+    packed = int.from_bytes(buf[18:26], "big")
+    md5 = bytes(buf[26:42])
+
+    # Übrige Metadatenblöcke überspringen
+    pos = 42
+    last = header & 0x80
+    while not last and pos + 4 <= len(buf):
+        last = buf[pos] & 0x80
+        pos += 4 + int.from_bytes(buf[pos + 1:pos + 4], "big")
+
+    return StreamInfo(
+        min_block, max_block, max_frame,
+        sample_rate=packed >> 44,
+        channels=((packed >> 41) & 0x7) + 1,
+        bits=((packed >> 36) & 0x1F) + 1,
+        total_samples=packed & 0xFFFFFFFFF,
+        md5=md5.hex() if any(md5) else "",
+        audio_offset=pos if last else None,
+    )
+
+def _crc_table(poly: int, width: int) -> list[int]:
+    top = 1 << (width - 1)
+    mask = (1 << width) - 1
+    table = []
+    for byte in range(256):
+        crc = byte << (width - 8)
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & mask if crc & top else (crc << 1) & mask
+        table.append(crc)
+    return table
+
+CRC8 = _crc_table(0x07, 8)
+CRC16 = _crc_table(0x8005, 16)
+
+def crc8(data) -> int:
+    crc = 0
+    for b in data:
+        crc = CRC8[crc ^ b]
+    return crc
+
+def crc16(data) -> int:
+    crc = 0
+    for b in data:
+        crc = ((crc << 8) & 0xFFFF) ^ CRC16[(crc >> 8) ^ b]
+    return crc
+
+BLOCK_SIZES = {1: 192, **{n: 576 << (n - 2) for n in range(2, 6)}, **{n: 256 << (n - 8) for n in range(8, 16)}}
+
+def frame_header(buf, pos: int) -> tuple[int, int, int] | None:
+    # Liest einen Frame-Header ab pos; (Frame-/Samplenummer, Blockgröße, variable Blockgröße?) oder None
+    if pos + 6 > len(buf) or buf[pos] != 0xFF or buf[pos + 1] & 0xFE != 0xF8:
+        return None
+    variable = buf[pos + 1] & 0x01
+    bs_code, sr_code = buf[pos + 2] >> 4, buf[pos + 2] & 0x0F
+    ch_code, ss_code = buf[pos + 3] >> 4, (buf[pos + 3] >> 1) & 0x07
+    if bs_code == 0 or sr_code == 15 or ch_code > 10 or ss_code == 3 or buf[pos + 3] & 0x01:
+        return None
+
+    # Frame- bzw. Samplenummer (UTF-8-artig kodiert)
+    p = pos + 4
+    first = buf[p]
+    extra = 0
+    while extra < 7 and first & (0x80 >> extra):
+        extra += 1
+    if extra == 1 or extra > 7:
+        return None
+    number = first & (0x7F >> extra) if extra else first
+    count = extra - 1 if extra else 0
+    if p + 1 + count > len(buf):
+        return None
+    for b in buf[p + 1:p + 1 + count]:
+        if b & 0xC0 != 0x80:
+            return None
+        number = (number << 6) | (b & 0x3F)
+    p += 1 + count
+
+    if bs_code == 6:
+        block = buf[p] + 1; p += 1
+    elif bs_code == 7:
+        block = int.from_bytes(buf[p:p + 2], "big") + 1; p += 2
+    else:
+        block = BLOCK_SIZES[bs_code]
+    p += {12: 1, 13: 2, 14: 2}.get(sr_code, 0)
+
+    if p >= len(buf) or crc8(buf[pos:p]) != buf[p]:
+        return None
+    return number, block, variable
+
+def tail_start(size: int, si: StreamInfo) -> int:
+    # Beginn des gelesenen Dateiendes: höchstens ein Frame (ungünstigster Fall) vor dem Ende
+    worst = si.max_frame or si.max_block * si.channels * ((si.bits + 7) // 8) + 64
+    return max(si.audio_offset, size - worst - 64)
+
+def complete_tail(f, size: int, si: StreamInfo) -> bool:
+    # Prüft, ob die Datei mit einem vollständigen Frame endet, der genau beim letzten Sample aufhört
+    start = tail_start(size, si)
+    f.seek(start)
+    tail = f.read(size - start)
+    if len(tail) < 8:
+        return False
+    expected_crc = int.from_bytes(tail[-2:], "big")
+    pos = len(tail)
+    while (pos := tail.rfind(b"\xff", 0, pos)) >= 0:
+        parsed = frame_header(tail, pos)
+        if parsed:
+            number, block, variable = parsed
+            first_sample = number if variable else number * si.max_block
+            if first_sample + block == si.total_samples and crc16(tail[pos:-2]) == expected_crc:
+                return True
+    return False
+
+# --- Prüfung ---
+def check_flac(flac: Path, digest, frames: int, channels: int, bits: int, stats: dict | None = None) -> tuple[str, str]:
+    # Vergleicht eine FLAC mit den Eckdaten der Quelle; digest(flac_bits) liefert die MD5 der Quell-Samples
+    # (erst aufgerufen, wenn Format und Länge passen). Rückgabe (Status, Details)
+    # stats: erhält unter "read" die gelesenen Bytes (Kopf und Dateiende, nicht die ganze FLAC)
+    stats = {} if stats is None else stats
+    try:
+        size = flac.stat().st_size
+        with open(flac, "rb") as f:
+            head = f.read(64 * 1024)
+            si = read_streaminfo(head)
+            while si.audio_offset is None: # große Metadaten (Cover) -> weiterlesen
+                more = f.read(len(head))
+                if not more:
+                    return TRUNCATED, "Metadaten abgeschnitten"
+                head += more
+                si = read_streaminfo(head)
+            stats["read"] = len(head)
+            if si.audio_offset >= size:
+                return TRUNCATED, "keine Audiodaten"
+            if si.channels != channels or si.bits not in (bits, 16 if bits == 8 else bits):
+                return MISMATCH, f"Format {si.channels} Kanäle/{si.bits} Bit statt {channels}/{bits}"
+            if not si.md5:
+                return NO_MD5, "STREAMINFO ohne MD5"
+            if si.total_samples != frames:
+                return LENGTH, f"{si.total_samples} statt {frames} Samples"
+            stats["read"] += size - max(len(head), tail_start(size, si)) # kleine Dateien: Ende schon im Kopf
+            if not complete_tail(f, size, si):
+                return TRUNCATED, "letzter Frame unvollständig"
+    except FileNotFoundError:
+        return MISSING, "FLAC fehlt"
+    except (OSError, ValueError, IndexError) as e:
+        return ERROR, f"FLAC: {e}"
+    md5 = digest(si.bits)
+    if si.md5 != md5:
+        return MISMATCH, f"MD5 {si.md5} statt {md5}"
+    return OK, ""
+
+def source_digest(buf, flac: Path) -> tuple[str, int, int, int]:
+    # Soll-Werte einer frisch kodierten FLAC aus dem WAV-Inhalt im Speicher: (MD5, Samples, Kanäle, Bit)
+    info = wav_pcm(buf)
+    with open(flac, "rb") as f:
+        flac_bits = read_streaminfo(f.read(42)).bits
+    return pcm_md5(buf, info, flac_bits), info.frames, info.channels, info.bits
+
+def verify_buffer(buf, flac: Path) -> tuple[str, str]:
+    # WAV-Inhalt (bytes oder mmap) mit einer FLAC vergleichen; (Status, Details)
+    try:
+        info = wav_pcm(buf)
+        if info.truncated:
+            return TRUNCATED, "WAV-data-Chunk kürzer als angegeben"
+        return check_flac(flac, lambda flac_bits: pcm_md5(buf, info, flac_bits), info.frames, info.channels, info.bits)
+    except NotImplementedError as e:
+        return UNSUPPORTED, str(e)
+    except (ValueError, struct.error) as e:
+        return ERROR, f"WAV: {e}"
+
+def verify_pair(wav: Path, flac: Path) -> tuple[str, str]:
+    # WAV per mmap einblenden (keine Kopie im Speicher) und mit der MD5 der FLAC vergleichen
+    if not flac.exists():
+        return MISSING, "FLAC fehlt"
+    try:
+        with open(wav, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return verify_buffer(mm, flac)
+    except (OSError, ValueError) as e: # ValueError: leere Datei lässt sich nicht einblenden
+        return ERROR, f"WAV: {e}"
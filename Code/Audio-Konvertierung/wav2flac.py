@@ -2,14 +2,35 @@
 # -*- coding: utf-8 -*-
 
 # --- Imports ---
-import os, re, unicodedata, subprocess, sys
+import os, re, subprocess, sys, json, hashlib, struct, wave, threading, queue, io, time, argparse
 from tkinter import filedialog
+from functools import lru_cache, partial
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 from collections import defaultdict
+from dataclasses import dataclass
 from pathlib import Path
-from mutagen.flac import FLAC, Picture
-from datetime import datetime
+from mutagen.flac import FLAC, Picture, VCFLACDict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # normalization.py liegt in Code/
+from normalization import PLACEHOLDER, nfc, norm_text, smart_titlecase, booklet_basename
+from instrumentation import Metrics, timed
+import instrumentation
+from scheduler import Stage, StageScheduler, ByteBudget
+from work_queue import FileQueue
+from catalog import Catalog
+import verify
+
+try: # Optional: In-Process-Encoder über libFLAC (pip install pyflac)
+    import numpy as np
+    import pyflac
+except ImportError:
+    pyflac = None
+
+try: # Optional: verkleinertes Cover statt des Original-Scans (pip install Pillow)
+    from PIL import Image
+except ImportError:
+    Image = None
 
 # --- Utilities ---
 def ask_dry_run() -> bool: # Abfrage, ob Dry-Run
@@ -30,6 +51,34 @@ def ask_terminal_mode() -> bool: # Abfrage, ob im Terminal oder mit GUI
             return False
         print("Bitte 'y' oder 'n' eingeben.")
 
+def ask_content_hash() -> bool: # Abfrage, ob bei geänderter mtime zusätzlich der Inhalt geprüft wird
+    while True:
+        ans = input("Inhalts-Hash bei geänderter Änderungszeit prüfen? [y/N]: ").strip().lower()
+        if ans in ("y", "yes", "j", "ja"):
+            return True
+        if ans in ("n", "no", ""):
+            return False
+        print("Bitte 'y' oder 'n' eingeben.")
+
+def ask_encoder() -> str: # Abfrage des Encoder-Backends
+    available = [name for name in ENCODERS if encoder_available(name)]
+    while True:
+        ans = input(f"Encoder wählen [{'/'.join(available)}] (Enter = ffmpeg): ").strip().lower()
+        if ans == "":
+            return "ffmpeg"
+        if ans in available:
+            return ans
+        print(f"Bitte einen von {', '.join(available)} eingeben.")
+
+def ask_resume() -> bool: # Abfrage, ob ein abgebrochener Lauf fortgesetzt wird
+    while True:
+        ans = input("Abgebrochenen Lauf fortsetzen (bereits fertige Tracks überspringen)? [Y/n]: ").strip().lower()
+        if ans in ("y", "yes", "j", "ja", ""):
+            return True
+        if ans in ("n", "no"):
+            return False
+        print("Bitte 'y' oder 'n' eingeben.")
+
 def choose_directory(prompt: str, terminal: bool = False) -> Path:
     if terminal:
         while True:
@@ -50,47 +99,6 @@ def choose_directory(prompt: str, terminal: bool = False) -> Path:
             sys.exit(1)
         return Path(path)
 
-def nfc(s: str) -> str: # Unicode-Normalisierung (NFC) für Umlaute auf macOS
-    return unicodedata.normalize("NFC", s or "")
-
-def norm_text(s: str) -> str:  # Normalisierung für Titel, Alben und Werke
-     # Opus vereinheitlichen
-    s = re.sub(r"\b(?:[oO][pP](?:us)?)(?:\.?\s*)(?=\d)", "op. ", s)
-
-    # Nummer vereinheitlichen
-    s = s.replace("Nº", "No")
-    s = re.sub(r"\b(?:no|nr)\.?\s*(\d+)(?=\D|$)", r"Nr. \1", s, flags=re.IGNORECASE)
-
-    # Volume vereinheitlichen → "Vol. n"
-    s = re.sub(r"\b(?:vol(?:ume)?)\.?\s*([0-9IVXLCDM]+)\b", r"Vol. \1", s, flags=re.IGNORECASE)
-
-    return s
-
-def smart_titlecase(s: str) -> str:
-    # Wandelt komplett großgeschriebene Strings in Title Case um
-    if not s or not s.isupper():
-        return s
-
-    # Sonderzeichen für Trennung
-    special_cases = ["+", ",", "§§§", "_", "."]
-
-    def fix_word(word: str) -> str:
-        w = word.capitalize()
-
-        # Apostrophe: d'Arc → d'Arc, O'Neill → O'Neill
-        w = re.sub(r"([DdOo])'([A-Za-z])",
-                   lambda m: m.group(1).lower() + "'" + m.group(2).upper(),
-                   w)
-        
-        # Alle definierten Sonderzeichen prüfen
-        for sep in special_cases:
-            if sep in word:
-                return sep.join(fix_word(p) for p in word.split(sep))
-
-        return w
-
-    return " ".join(fix_word(w) for w in s.split())
-
 def norm_sym(s: str) -> str:
     s = s.replace("_", " ")  # Unterstriche zu Leerzeichen
     s = s.replace("§§§", "-") # Platzhalter zu Bindestrich für Namen wie Jean-Féry
@@ -109,25 +117,27 @@ def norm_name(s: str) -> str:
     return s
 
 # --- Classifier ---
-def classify_path(wav_path: Path) -> str: # Klassifikation des Pfads: "single", "box" oder "unknown" auch mit Abweichungen im Ordnernamen
-    # Alle Ordnernamen in Kleinbuchstaben erfassen
-    parts = [p.name.lower() for p in wav_path.parents]
+SINGLE_KEYWORDS = ["einzelcd", "einzel-cd", "einzelcds", "einzel-cds", "singlecd", "single-cd"]
+BOX_KEYWORDS = ["box", "boxen", "cd-box", "cdbox", "boxset", "box-set"]
 
-    # Schlüsselwörter definieren
-    single_keywords = ["einzelcd", "einzel-cd", "einzelcds", "einzel-cds", "singlecd", "single-cd"]
-    box_keywords = ["box", "boxen", "cd-box", "cdbox", "boxset", "box-set"]
+@lru_cache(maxsize=None)
+def classify_dir(directory: Path) -> tuple[bool, bool]: # (Einzel-CD gefunden, Box gefunden) für Ordner und alle Elternordner
+    # Ordnername in Kleinbuchstaben, Bindestriche & Sonderzeichen entfernen
+    normalized = re.sub(r"[^a-z0-9]", "", directory.name.lower())
 
-    found_single = False
-    found_box = False
+    found_single = any(key in normalized for key in SINGLE_KEYWORDS)
+    found_box = any(key in normalized for key in BOX_KEYWORDS)
 
-    # Jeden Ordnernamen auf diese Muster prüfen
-    for name in parts:
-        normalized = re.sub(r"[^a-z0-9]", "", name) # Bindestriche & Sonderzeichen entfernen
+    # Elternordner einmal klassifizieren und für alle Geschwister wiederverwenden
+    if directory.parent != directory:
+        parent_single, parent_box = classify_dir(directory.parent)
+        found_single = found_single or parent_single
+        found_box = found_box or parent_box
 
-        if any(key in normalized for key in single_keywords):
-            found_single = True
-        if any(key in normalized for key in box_keywords):
-            found_box = True
+    return found_single, found_box
+
+def classify_path(wav_path: Path) -> str: # Klassifikation des Pfads: "single", "box" oder "unknown" auch mit Abweichungen im Ordnernamen
+    found_single, found_box = classify_dir(wav_path.parent)
 
     if found_single:
         return "single"
@@ -136,26 +146,79 @@ def classify_path(wav_path: Path) -> str: # Klassifikation des Pfads: "single",
     else:
         return "unknown"    
 
-# --- Parser ---
-def parse_single(wav_path: Path) -> dict:
-    placeholder = "§§§"  # Platzhalter für doppelten Bindestrich
+# --- Verzeichnis-Resolver ---
+# Medien-, Disc- und Werkordner werden pro Name nur einmal geparst; pro Datei bleibt nur der Dateiname.
+# Titel: Unterstriche zu Leerzeichen, dann norm_text (dieselben Regeln wie die Booklet-PDF-Namen aus jpg2pdf)
+BOOKLET_URL = "http://medien.hfm.eu/booklets/" # Basis-URL der Booklet-PDFs (nginx)
+
+@lru_cache(maxsize=None)
+def has_booklet(album_dir: Path) -> bool:
+    # Booklet-URL nur, wenn der booklet-Ordner des Albums Seiten enthält (wie jpg2pdf.booklet_images)
+    # Gilt für wav2flac allein und für album_pipeline.py: abwechselnde Läufe schreiben dieselben Tags
+    try:
+        with os.scandir(album_dir / "booklet") as it:
+            return any(os.path.splitext(e.name)[1].lower() in (".jpg", ".jpeg") and e.is_file()
+                       and not e.name.startswith("._") for e in it)
+    except OSError:
+        return False
 
-    # Pfade mit Platzhalter
-    work_dir  = Path(str(wav_path.parent).replace("--", placeholder))
-    media_dir = Path(str(work_dir.parent).replace("--", placeholder))
+@lru_cache(maxsize=None)
+def resolve_single_media(media_name: str) -> tuple[str, str]: # Medientitel-Ordner -> (Album, Booklet-URL)
+    # Booklet-URL aus dem kompletten Medienordnernamen (gleicher Name wie das PDF aus jpg2pdf)
+    bookleturl = f"{BOOKLET_URL}{booklet_basename(media_name)}.pdf"
+    media_name = media_name.replace("--", PLACEHOLDER)
 
     # Album aus dem Medientitel-Ordner
-    m_album = re.match(r"^(?P<comp>[^-]+?)\s*-\s*(?P<album>.+)$", media_dir.name) # Trennt Komponist und Album
-    album  = norm_text(nfc(m_album.group("album"))) if m_album else "Unknown Album" # Weist Album zu, wenn nicht gefunden "Unknown Album"
-    allcomposers = smart_titlecase(nfc(m_album.group("comp"))) if m_album else "Unknown Artist" # Komponist für Booklet-URL aus dem Medienverzeichnis
+    m_album = re.match(r"^(?P<comp>[^-]+?)\s*-\s*(?P<album>.+)$", media_name) # Trennt Komponist und Album
+    album  = norm_text(norm_sym(nfc(m_album.group("album")))) if m_album else "Unknown Album" # Weist Album zu, wenn nicht gefunden "Unknown Album"
+
+    return album, bookleturl
+
+@lru_cache(maxsize=None)
+def resolve_box_disc(box_name: str, disc_name: str) -> tuple[str, str, str, str]: # Box- und Disc-Ordner -> (Album, Box-Set, Discnummer, Booklet-URL)
+    # Booklet-URL aus dem Box-Ordnernamen (das Booklet liegt in der Box)
+    bookleturl = f"{BOOKLET_URL}{booklet_basename(box_name)}.pdf"
+    box_name = box_name.replace("--", PLACEHOLDER)
+    disc_name = disc_name.replace("--", PLACEHOLDER)
+
+    # Box-Titel aus dem Box-Ordner
+    m_box = re.match(r"^(?P<comp>[^-]+?)\s*-\s*(?P<box>.+)$", box_name)
+    boxtitle = norm_text(norm_sym(nfc(m_box.group("box")))) if m_box else "Unknown Album"
+
+    # Disc-Titel aus dem Disc-Ordner
+    m_disc = re.match(r"^(?P<comp>[^-]+?)\s*-\s*(?P<title>.+?)(?:\._CD(?P<discnum>\d{1,2}))?$", disc_name)
+    disctitle = norm_text(norm_sym(nfc(m_disc.group("title")))) if m_disc else "Unknown Album" # Weist Disc-Titel zu, wenn nicht gefunden "Unknown Album"
+    discnumber = m_disc.group("discnum") if m_disc and m_disc.group("discnum") else "" # Weist Discnummer zu, wenn nicht gefunden leer
+
+    if disctitle == boxtitle:
+        # Titel identisch (nur _CDn dran)
+        album = boxtitle
+        boxset = ""
+    else:
+        # Titel weicht ab
+        album = disctitle
+        boxset = boxtitle
+
+    return album, boxset, discnumber, bookleturl
+
+@lru_cache(maxsize=None)
+def resolve_work(work_name: str, kind: str) -> tuple[str, str]: # Werk-Ordner -> (Werk, Komponist)
+    work_name = work_name.replace("--", PLACEHOLDER)
 
     # Werktitel und Komponist aus dem Werk-Ordner
-    m_work = re.match(r"^(?P<comp>[^-]+?)\s*-\s*(?P<work>.+)$", work_dir.name) # Trennt Komponist und Werk
-    work = norm_text(nfc(m_work.group("work"))) if m_work else "" # Weist Werk zu, wenn nicht gefunden leer
-    composer = smart_titlecase(nfc(m_work.group("comp"))) if m_work else "Unknown Artist" # Komponist für Metadaten aus Werkverzeichnis
+    m_work = re.match(r"^(?P<comp>[^-]+?)\s*-\s*(?P<work>.+)$", work_name) # Trennt Komponist und Werk
+    work = norm_text(norm_sym(nfc(m_work.group("work")))) if m_work else "" # Weist Werk zu, wenn nicht gefunden leer
+    if kind == "single":
+        composer = smart_titlecase(nfc(m_work.group("comp"))) if m_work else "Unknown Artist" # Komponist für Metadaten aus Werkverzeichnis
+    else:
+        composer = norm_name(nfc(m_work.group("comp"))) if m_work else "Unknown Artist"
+
+    return work, norm_name(composer)
 
+# --- Parser ---
+def parse_filename(wav_name: str) -> tuple[str, str]: # Dateiname -> (Titel, Satznummer)
     # Titel und Satznummer aus dem Dateinamen
-    fname = str(wav_path.name).replace("--", placeholder)
+    fname = wav_name.replace("--", PLACEHOLDER)
     m_num = re.match(r"^(?P<comp>[^-]+?)-(?P<work>.+?)-(?P<num>\d{1,3})-(?P<title>.+?)\.wav$", fname, re.I)
     m_non = re.match(r"^(?P<comp>[^-]+?)-(?P<title>.+?)\.wav$", fname, re.I)
 
@@ -170,20 +233,16 @@ def parse_single(wav_path: Path) -> dict:
         movementnumber = ""   # leer
         print(f"[WARNING] Unbekanntes Muster: {fname}")
 
-    title = norm_text(nfc(title_raw))
-
-    # Booklet-URL aus dem kompletten Medienordnernamen bauen
-    folder_name = f"{allcomposers}-{album}"
-    folder_name = folder_name.replace(placeholder, "--")
+    title = norm_text(norm_sym(nfc(title_raw)))
+    return title, movementnumber
 
-    # URL erzeugen
-    bookleturl = f"http://medien.hfm.eu/booklets/{folder_name}.pdf"
+def parse_single(wav_path: Path) -> dict:
+    work_dir = wav_path.parent       # Komponist,Vorname-Werk
+    media_dir = work_dir.parent      # Komponist,Vorname-Medientitel
 
-    # Normalisierung
-    composer = norm_name(composer)
-    album = norm_sym(album)
-    work = norm_sym(work)
-    title = norm_sym(title)
+    album, bookleturl = resolve_single_media(media_dir.name)
+    work, composer = resolve_work(work_dir.name, "single")
+    title, movementnumber = parse_filename(wav_path.name)
 
     return {
         "artist":         composer, # Komponist als Interpret, da fehlende Info, aber Pflichtangabe
@@ -196,74 +255,18 @@ def parse_single(wav_path: Path) -> dict:
         "movementnumber": movementnumber, 
         "discnumber":     "",
         "conductor":      "", # Daten (noch) nicht verfügbar
-        "bookleturl":     bookleturl, # später auf subtitle geschrieben, 
+        "bookleturl":     bookleturl if has_booklet(media_dir) else "", # später auf subtitle geschrieben
         # tracknumber wird separat vergeben
     }
 
 def parse_box(wav_path: Path) -> dict:
-    placeholder = "§§§"  # Platzhalter für doppelten Bindestrich
-
-    # Pfade mit Platzhalter
-    work_dir = Path(str(wav_path.parent).replace("--", placeholder)) # Komponist,Vorname-Werk
-    disc_dir = Path(str(work_dir.parent).replace("--", placeholder)) # Komponist,Vorname-Medientitel_CDNummer
-    box_dir = Path(str(disc_dir.parent).replace("--", placeholder)) # Komponist,Vorname-BoxTitel
-
-    # Box-Titel aus dem Box-Ordner
-    m_box = re.match(r"^(?P<comp>[^-]+?)\s*-\s*(?P<box>.+)$", box_dir.name)
-    boxtitle = norm_text(nfc(m_box.group("box"))) if m_box else "Unknown Album"
-    allcomposers = smart_titlecase(nfc(m_box.group("comp"))) if m_box else "Unknown Artist" # Komponist für Booklet-URL aus dem Medienverzeichnis
-
-    # Disc-Titel aus dem Disc-Ordner
-    m_disc = re.match(r"^(?P<comp>[^-]+?)\s*-\s*(?P<title>.+?)(?:\._CD(?P<discnum>\d{1,2}))?$", disc_dir.name)
-    disctitle = norm_text(nfc(m_disc.group("title"))) if m_disc else "Unknown Album" # Weist Disc-Titel zu, wenn nicht gefunden "Unknown Album"
-    discnumber = m_disc.group("discnum") if m_disc and m_disc.group("discnum") else "" # Weist Discnummer zu, wenn nicht gefunden leer
-    
-
-    # Werktitel aus dem Werk-Ordner
-    m_work = re.match(r"^(?P<comp>[^-]+?)\s*-\s*(?P<work>.+)$", work_dir.name) # Trennt Komponist und Werk
-    work = norm_text(nfc(m_work.group("work"))) if m_work else "" # Weist Werk zu, wenn nicht gefunden leer
-    composer = norm_name(nfc(m_work.group("comp"))) if m_work else "Unknown Artist" # Komponist für Metadaten aus Werkverzeichnis
-
-    # Titel aus Dateiname
-    fname = str(wav_path.name).replace("--", placeholder)
-    m_num = re.match(r"^(?P<comp>[^-]+?)-(?P<work>.+?)-(?P<num>\d{1,3})-(?P<title>.+?)\.wav$", fname, re.I)
-    m_non = re.match(r"^(?P<comp>[^-]+?)-(?P<title>.+?)\.wav$", fname, re.I)
-
-    if m_num:
-        title_raw = m_num.group("title")
-        movementnumber = m_num.group("num").lstrip("0") # Satznummer ohne führende Nullen
-    elif m_non:
-        title_raw = m_non.group("title")
-        movementnumber = "" # Wenn keine Satznummer, dann leer
-    else: # Fallback
-        title_raw = Path(fname).stem # Dateiname ohne Endung
-        movementnumber = ""   # leer
-        print(f"[WARNING] Unbekanntes Muster: {fname}")
+    work_dir = wav_path.parent       # Komponist,Vorname-Werk
+    disc_dir = work_dir.parent       # Komponist,Vorname-Medientitel_CDNummer
+    box_dir = disc_dir.parent        # Komponist,Vorname-BoxTitel
 
-    title = norm_text(nfc(title_raw))
-
-    if disctitle == boxtitle:
-        # Titel identisch (nur _CDn dran)
-        album = boxtitle
-        boxset = ""
-    else:
-        # Titel weicht ab
-        album = disctitle
-        boxset = boxtitle
-        
-    # Booklet-URL aus dem kompletten Medienordnernamen bauen
-    folder_name = f"{allcomposers}-{boxtitle}"
-    folder_name = folder_name.replace(placeholder, "--")
-
-    # URL erzeugen
-    bookleturl = f"http://medien.hfm.eu/booklets/{folder_name}.pdf"
-
-    # Normalisierung
-    composer = norm_name(composer)
-    boxset = norm_sym(boxset)
-    album = norm_sym(album)
-    work = norm_sym(work)
-    title = norm_sym(title)
+    album, boxset, discnumber, bookleturl = resolve_box_disc(box_dir.name, disc_dir.name)
+    work, composer = resolve_work(work_dir.name, "box")
+    title, movementnumber = parse_filename(wav_path.name)
 
     return {
         "artist":         composer, # Komponist als Interpret, da fehlende Info, aber Pflichtangabe
@@ -277,7 +280,7 @@ def parse_box(wav_path: Path) -> dict:
         "discnumber":     discnumber,
         "boxset":         boxset, # bei abweichenden Titeln
         "conductor":      "", # Daten (noch) nicht verfügbar
-        "bookleturl":     bookleturl, # später auf subtitle geschrieben,
+        "bookleturl":     bookleturl if has_booklet(box_dir) else "", # später auf subtitle geschrieben
         # tracknumber wird separat vergeben
     }
 
@@ -315,10 +318,52 @@ def assign_tracknumbers(wav_paths: list[Path]) -> dict[Path, str]: # Weist WAV-D
     return trackmap
 
 # --- WAV-Finder ---
+def iter_containers(root: Path, booklets: dict[Path, Path] | None = None, metrics: Metrics | None = None):
+    # Durchläuft root per os.scandir und liefert (Container, WAVs), sobald ein Container vollständig gelistet ist.
+    # Container = Ordner zwei Ebenen über der WAV (wie in assign_tracknumbers); booklet-Ordner und Dotfiles
+    # werden ohne zusätzliche stat-Aufrufe übersprungen.
+    # booklets: sammelt dabei Ordner -> enthaltener booklet-Ordner (gemeinsamer Lauf mit jpg2pdf, ohne zweiten Scan)
+    # metrics: Listing jedes Ordners als Stufe "discover" messen
+    root = Path(root)
+    buckets = defaultdict(list)
+
+    def walk(directory: Path):
+        subdirs = []
+        with timed(metrics, "discover", directory):
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError as e:
+                print(f"[WARNING] Ordner nicht lesbar: {directory} ({e})")
+                return
+
+            for entry in entries:
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name.lower() != "booklet":
+                        subdirs.append(Path(entry.path))
+                    elif booklets is not None:
+                        booklets[directory] = Path(entry.path)
+                elif entry.name.lower().endswith(".wav") and entry.is_file():
+                    buckets[directory.parent].append(Path(entry.path))
+
+        for sub in subdirs:
+            yield from walk(sub)
+
+        # Alle WAVs mit diesem Ordner als Container liegen in seinen Unterordnern -> jetzt vollständig
+        if directory in buckets:
+            yield directory, buckets.pop(directory)
+
+    yield from walk(root)
+
+    # WAVs direkt in root (Container liegt außerhalb des Scans)
+    for container, wavs in buckets.items():
+        yield container, wavs
+
 def find_wavs(root: Path) -> list[Path]:
     # Findet alle .wav-Dateien rekursiv unter root
-    root = Path(root)
-    return [p for p in root.rglob("*") if p.is_file() and p.suffix.lower() == ".wav" and not p.name.startswith(".")]
+    return [w for _, wavs in iter_containers(root) for w in wavs]
 
 # --- Output-Pfade ---
 def out_flac_path(in_wav: Path, in_root: Path, out_root: Path) -> Path:
@@ -326,33 +371,273 @@ def out_flac_path(in_wav: Path, in_root: Path, out_root: Path) -> Path:
     rel = in_wav.relative_to(in_root)
     return (out_root / rel).with_suffix(".flac")
 
+TEMP_SUFFIX = ".part" # unfertige Ausgabe: .<name>.flac.part im Zielordner (gleiches Dateisystem -> atomares rename)
+
+def temp_flac_path(out_flac: Path) -> Path:
+    return out_flac.with_name(f".{out_flac.name}{TEMP_SUFFIX}")
+
+def clean_temp_files(root: Path) -> int:
+    # Entfernt liegengebliebene temporäre FLACs (abgebrochener Lauf); Rückgabe: Anzahl
+    removed = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.startswith(".") and name.endswith(".flac" + TEMP_SUFFIX):
+                Path(dirpath, name).unlink(missing_ok=True)
+                removed += 1
+    return removed
+
+# --- Konvertierungs-Manifest ---
+MANIFEST_NAME = ".wav2flac-manifest.json" # Liegt im Ausgabe-Ordner neben der Bibliothek
+
+def load_manifest(out_root: Path) -> dict[str, dict]:
+    # Lädt das Manifest (relativer WAV-Pfad -> Fingerprint, Tags, FLAC-Pfad); fehlt es, ist es leer
+    path = out_root / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Manifest nicht lesbar, alle Dateien werden neu konvertiert: {e}")
+        return {}
+    return data.get("files", {})
+
+def save_manifest(out_root: Path, manifest: dict[str, dict]) -> None:
+    # Erst in temporäre Datei schreiben, dann atomar ersetzen (kein halbes Manifest bei Abbruch)
+    out_root.mkdir(parents=True, exist_ok=True)
+    path = out_root / MANIFEST_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"version": 1, "files": manifest}, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+
+# --- Fortschritts-Journal ---
+# Jeder fertige Track wird sofort angehängt (eine JSON-Zeile, fsync); das Manifest wird erst am Ende geschrieben.
+# Nach einem Absturz überträgt --resume das Journal ins Manifest, bereits fertige Tracks werden übersprungen.
+JOURNAL_NAME = ".wav2flac-journal.jsonl"
+_journal_lock = threading.Lock()
+
+def open_journal(out_root: Path, name: str = JOURNAL_NAME, keep: bool = True):
+    out_root.mkdir(parents=True, exist_ok=True)
+    return open(out_root / name, "a" if keep else "w", encoding="utf-8")
+
+def journal_files(out_root: Path) -> list[Path]:
+    # Interaktiver Lauf: .wav2flac-journal.jsonl; Worker: .wav2flac-journal-<Worker>.jsonl
+    return sorted(out_root.glob(".wav2flac-journal*.jsonl")) if out_root.is_dir() else []
+
+def record_done(journal, key: str, entry: dict) -> None:
+    line = json.dumps({"key": key, **entry}, ensure_ascii=False) + "\n"
+    with _journal_lock:
+        journal.write(line)
+        journal.flush()
+        os.fsync(journal.fileno()) # übersteht auch einen Stromausfall
+
+def replay_journals(out_root: Path, manifest: dict[str, dict]) -> int:
+    # Journal-Einträge ins Manifest übernehmen; eine halb geschriebene letzte Zeile wird ignoriert
+    count = 0
+    for path in journal_files(out_root):
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            manifest[entry.pop("key")] = entry
+            count += 1
+    return count
+
+def clear_journals(out_root: Path) -> None:
+    # Erst aufrufen, wenn das Manifest alle Einträge enthält
+    for path in journal_files(out_root):
+        path.unlink(missing_ok=True)
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    # SHA-256 über den Dateiinhalt (blockweise, damit große WAVs nicht komplett im Speicher landen)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+def source_unchanged(wav: Path, entry: dict | None, use_hash: bool = False) -> tuple[bool, dict]:
+    # Vergleicht die WAV mit dem Manifest-Eintrag; liefert (unverändert?, aktueller Fingerprint)
+    st = wav.stat()
+    fingerprint = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    if not entry or entry.get("size") != st.st_size:
+        if use_hash:
+            fingerprint["sha256"] = file_hash(wav)
+        return False, fingerprint
+
+    if entry.get("mtime_ns") == st.st_mtime_ns:
+        if "sha256" in entry:
+            fingerprint["sha256"] = entry["sha256"]
+        return True, fingerprint
+
+    # Gleiche Größe, andere Änderungszeit (z. B. nach Kopieren): nur mit Hash entscheidbar
+    if use_hash and entry.get("sha256"):
+        fingerprint["sha256"] = file_hash(wav)
+        return fingerprint["sha256"] == entry["sha256"], fingerprint
+    return False, fingerprint
+
 # --- ffmpeg-Konvertierung ---
-def convert_wav_to_flac(in_wav: Path, out_flac: Path, compression_level: int = 5, dry_run: bool = False) -> None:
+def convert_wav_to_flac(in_wav: Path, out_flac: Path, compression_level: int = 5, dry_run: bool = False,
+                        data: bytes | None = None) -> None:
     out_flac.parent.mkdir(parents=True, exist_ok=True)
     if dry_run:
         return
     cmd = [
         "ffmpeg", "-y",
-        "-i", str(in_wav),
+        "-i", "pipe:0" if data is not None else str(in_wav), # bereits gelesene WAV-Daten per stdin
         "-map_metadata", "-1", # Keine Metadaten von der Quelle übernehmen
         "-compression_level", str(compression_level),
+        "-f", "flac", # Format explizit, da in eine temporäre Datei (.part) geschrieben wird
         str(out_flac),
     ]
 
     try:
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+        subprocess.run(cmd, check=True, input=data, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
     except subprocess.CalledProcessError as e:
         raise RuntimeError(f"ffmpeg-Konvertierung fehlgeschlagen: {in_wav} -> {out_flac}") from e
 
+# --- libFLAC-Kodierung (In-Process) ---
+def flac_block(code: int, data: bytes, is_last: bool = False) -> bytes:
+    # Metadatenblock: 1 Byte (Last-Flag + Typ), 3 Byte Länge, danach die Nutzdaten
+    return bytes([(0x80 if is_last else 0) | code]) + struct.pack(">I", len(data))[1:] + data
+
+def metadata_blocks(tags: dict, picture: Picture | None) -> list[tuple[int, bytes]]:
+    # VORBIS_COMMENT (Typ 4), PICTURE (Typ 6) und PADDING (Typ 1) für den Header der FLAC-Datei
+    comments = VCFLACDict()
+    for key, val in vorbis_comments(tags).items():
+        comments[key] = [val]
+    blocks = [(4, comments.write(framing=False))]
+    if picture:
+        blocks.append((6, picture.write()))
+    blocks.append((1, bytes(FLAC_PADDING)))
+    return blocks
+
+def convert_wav_to_flac_libflac(in_wav: Path, out_flac: Path, blocks: list[tuple[int, bytes]], compression_level: int = 5,
+                                data: bytes | None = None) -> None:
+    # Kodiert 16-Bit-PCM direkt im Prozess; STREAMINFO, Tags und Cover entstehen im selben Schreibdurchgang
+    source = io.BytesIO(data) if data is not None else str(in_wav)
+    with wave.open(source, "rb") as w, open(out_flac, "wb") as f:
+        channels = w.getnchannels()
+        header = bytearray()     # Header von libFLAC ("fLaC" + STREAMINFO + Standard-VORBIS_COMMENT)
+        state = {"audio": False, "delta": 0}
+
+        def write_cb(buf: bytes, num_bytes: int, num_samples: int, current_frame: int) -> None:
+            if not state["audio"] and num_samples == 0:
+                header.extend(buf) # Header sammeln, bis der erste Audio-Frame kommt
+                return
+            if not state["audio"]:
+                if header[:4] != b"fLaC" or header[4] & 0x7F != 0:
+                    raise RuntimeError(f"Unerwarteter libFLAC-Header: {out_flac}")
+                # STREAMINFO übernehmen (Last-Flag löschen), eigene Blöcke anhängen
+                f.write(b"fLaC")
+                f.write(bytes([header[4] & 0x7F]) + header[5:42])
+                for i, (code, data) in enumerate(blocks):
+                    f.write(flac_block(code, data, is_last=(i == len(blocks) - 1)))
+                state["delta"] = f.tell() - len(header)
+                state["audio"] = True
+            f.write(buf)
+
+        # libFLAC springt am Ende zurück, um MD5 und Sampleanzahl in STREAMINFO einzutragen.
+        # Positionen hinter STREAMINFO sind um die eigenen Blöcke verschoben.
+        def seek_cb(offset: int) -> None:
+            f.seek(offset if offset < 42 else offset + state["delta"])
+
+        def tell_cb() -> int:
+            return f.tell() - state["delta"] if state["audio"] else len(header)
+
+        encoder = pyflac.StreamEncoder(
+            sample_rate=w.getframerate(),
+            write_callback=write_cb,
+            seek_callback=seek_cb,
+            tell_callback=tell_cb,
+            compression_level=compression_level,
+        )
+        while data := w.readframes(1 << 16):
+            encoder.process(np.frombuffer(data, dtype="<i2").reshape(-1, channels))
+        if not encoder.finish():
+            raise RuntimeError(f"libFLAC-Kodierung fehlgeschlagen: {in_wav} -> {out_flac}")
+
+# --- Encoder-Backends ---
+# Jedes Backend: (in_wav, out_flac, tags, picture, compression_level, dry_run, data) -> bool
+# data: bereits gelesene WAV-Bytes (Lese-Stufe) oder None (Backend liest selbst).
+# Rückgabe True, wenn Tags und Cover bereits in der FLAC stehen; sonst schreibt die Schreib-Stufe sie per mutagen.
+def encode_ffmpeg(in_wav: Path, out_flac: Path, tags: dict, picture: Picture | None,
+                  compression_level: int = 5, dry_run: bool = False, data: bytes | None = None) -> bool:
+    convert_wav_to_flac(in_wav, out_flac, compression_level=compression_level, dry_run=dry_run, data=data)
+    return False
+
+def encode_libflac(in_wav: Path, out_flac: Path, tags: dict, picture: Picture | None,
+                   compression_level: int = 5, dry_run: bool = False, data: bytes | None = None) -> bool:
+    out_flac.parent.mkdir(parents=True, exist_ok=True)
+    if dry_run:
+        return True
+    try:
+        with wave.open(io.BytesIO(data) if data is not None else str(in_wav), "rb") as w:
+            supported = w.getsampwidth() == 2
+    except wave.Error:
+        supported = False # z. B. WAVE_FORMAT_EXTENSIBLE
+    if not supported:
+        # Nicht-16-Bit oder Sonderformat -> ffmpeg übernimmt
+        return encode_ffmpeg(in_wav, out_flac, tags, picture, compression_level=compression_level, data=data)
+
+    try:
+        convert_wav_to_flac_libflac(in_wav, out_flac, metadata_blocks(tags, picture), compression_level=compression_level, data=data)
+    except pyflac.EncoderProcessException as e:
+        raise RuntimeError(f"libFLAC-Kodierung fehlgeschlagen: {in_wav} -> {out_flac}") from e
+    return True
+
+ENCODERS = {
+    "ffmpeg":  encode_ffmpeg,
+    "libflac": encode_libflac,
+}
+
+def encoder_available(name: str) -> bool:
+    if name == "libflac":
+        return pyflac is not None
+    return name in ENCODERS
+
 # --- Tags schreiben (FLAC/Vorbis-Kommentare) ---
-def write_flac_tags(flac_file: Path, tags: dict, dry_run: bool = False) -> None:
+TAG_KEYS = ["artist", "albumartist", "composer", "album", "title", "tracknumber", "discnumber",
+            "work", "movement", "movementnumber", "boxset", "bookleturl", "subtitle"]
+
+FLAC_PADDING = 16 * 1024 # Reserve im Header, damit spätere Tag-Änderungen die Audiodaten nicht verschieben
+
+def keep_padding(info) -> int:
+    # Vorhandene Reserve beibehalten (Header wird an Ort und Stelle geschrieben); reicht sie nicht, neu anlegen
+    return info.padding if info.padding >= 0 else FLAC_PADDING
+
+def write_flac_tags(flac_file: Path, tags: dict, picture: Picture | None = None, dry_run: bool = False,
+                    remove_picture: bool = False) -> None:
+    # Tags und (optional) Cover in einem einzigen Lade-/Speichervorgang schreiben
+    # remove_picture: Album hat kein Cover mehr -> eingebettetes Bild entfernen
     if dry_run:
         return
     audio = FLAC(str(flac_file))
 
+    # Eigene Tags vorher entfernen, damit beim Neu-Taggen keine veralteten Werte stehen bleiben
+    for key in TAG_KEYS:
+        if key in audio:
+            del audio[key]
+
+    for key, val in vorbis_comments(tags).items():
+        audio[key] = [val]
+
+    # Ohne Cover (z. B. beim Neu-Taggen) bleibt ein vorhandenes Bild erhalten, außer es wurde entfernt
+    if picture or remove_picture:
+        audio.clear_pictures()
+    if picture:
+        audio.add_picture(picture)
+
+    audio.save(padding=keep_padding)
+
+def vorbis_comments(tags: dict) -> dict[str, str]:
+    # Abbildung der geparsten Tags auf Vorbis-Kommentare (leere Werte werden ausgelassen)
+    comments = {}
+
     def setif(key, val):
         if val is not None and val != "":
-            audio[key] = [str(val)]
+            comments[key] = str(val)
 
     # Standard
     setif("artist",         tags.get("artist"))
@@ -362,7 +647,7 @@ def write_flac_tags(flac_file: Path, tags: dict, dry_run: bool = False) -> None:
     setif("title",          tags.get("title"))
     setif("tracknumber",    tags.get("tracknumber"))
     setif("discnumber",     tags.get("discnumber"))
-    # setif("date",           tags.get("date"))        # Daten nicht verfügbar
+    setif("date",           tags.get("date"))          # aus dem Logbuch-Katalog (Digitalisierungsdatum)
     # setif("genre",          tags.get("genre"))       # Daten nicht verfügbar
 
     # Zusatz
@@ -373,22 +658,59 @@ def write_flac_tags(flac_file: Path, tags: dict, dry_run: bool = False) -> None:
     setif("bookleturl",     tags.get("bookleturl"))
     setif("subtitle",       tags.get("bookleturl"))    # Workaround für booklet: bookleturl auf subtitle schreiben (werden nur so unter "get info" angezeigt)
     # setif(conductor",       tags.get("conductor"))   # Daten nicht verfügbar
-    # setif("comment",        tags.get("comment"))     # Optional für Anmerkungen
+    setif("comment",        tags.get("comment"))       # aus dem Logbuch-Katalog
 
-    audio.save()
+    return comments
 
-# --- Cover einbetten ---
-def embed_cover(flac_file: Path, source_wav: Path, dry_run: bool = False) -> None:
+# --- Logbuch-Katalog ---
+def apply_catalog(tags: dict, catalog: Catalog, wav: Path) -> bool:
+    # Interpreten, Datum und Kommentar aus dem Logbuch ergänzen; False, wenn das Album nicht im Katalog steht
+    entry = catalog.lookup(tags.get("composer", ""), [tags.get("album", ""), tags.get("boxset", "")],
+                           tags.get("discnumber", ""))
+    if entry is None:
+        catalog.report_unmatched(wav)
+        return False
+    if entry["interpreter"]:
+        tags["artist"] = entry["interpreter"] # Interpreten statt Komponist (albumartist bleibt der Komponist)
+    if entry["date"]:
+        tags["date"] = entry["date"]
+    if entry["comment"]:
+        tags["comment"] = entry["comment"]
+    return True
+
+def print_unmatched(catalog: Catalog, in_root: Path, prefix: str = "") -> None:
+    # Tracks ohne Katalogeintrag, zusammengefasst nach Album-Ordner
+    if not catalog.unmatched:
+        return
+    albums = defaultdict(int)
+    for wav in catalog.unmatched:
+        albums[wav.parent.parent.relative_to(in_root).as_posix()] += 1
+    print(f"\n{prefix}Ohne Katalogeintrag: {len(catalog.unmatched)} Tracks in {len(albums)} Alben")
+    for album, n in sorted(albums.items())[:50]:
+        print(f"  - {album} ({n} Tracks)")
+    if len(albums) > 50:
+        print(f"  ... und {len(albums)-50} weitere.")
+
+# --- Cover ---
+COVER_CACHE_SIZE = 32 # Alben, deren Cover gleichzeitig im Speicher gehalten werden
+COVER_MAX_PX = 1000   # längste Kante des eingebetteten Covers (0: Original-Scan unverändert einbetten)
+COVER_QUALITY = 85    # JPEG-Qualität des verkleinerten Covers
+COVER_DIR = ".wav2flac-covers" # Cache der verkleinerten Cover im Ausgabe-Ordner
+COVER_MIME = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"} # ohne Pillow: MIME aus der Endung
+_cover_lock = threading.Lock()
+
+def cover_container(source_wav: Path) -> Path | None:
     # Container bestimmen (eine Ebene über dem Werk-Ordner)
     kind = classify_path(source_wav)
     if kind == "single":
-        container = source_wav.parents[1] # Werkordner
+        return source_wav.parents[1] # Werkordner
     elif kind == "box":
-        container = source_wav.parents[2] # Box-Werk-Ordner
-    elif kind == "unknown":
-        print(f"[COVER] Kein Medientyp erkannt: {source_wav}")
-        return False
+        return source_wav.parents[2] # Box-Werk-Ordner
+    print(f"[COVER] Kein Medientyp erkannt: {source_wav}")
+    return None
 
+@lru_cache(maxsize=COVER_CACHE_SIZE)
+def find_cover(container: Path) -> Path | None:
     # Kandidaten für Coverbilder
     candidates = [
         container / "booklet" / "booklet-b.jpg",
@@ -407,65 +729,574 @@ def embed_cover(flac_file: Path, source_wav: Path, dry_run: bool = False) -> Non
     # Kandidat wählen
     img_path = next((p for p in candidates if p.exists()), None)
     if not img_path:
-        print(f"[COVER] Kein Cover gefunden für Album:\n  {container}\n  Quelle: {source_wav}")
-        return
-
-    if dry_run:
-        return
-
-    # MIME aus Endung bestimmen
-    ext = img_path.suffix.lower()
-    if ext in (".jpg", ".jpeg"):
-        mime = "image/jpeg"
+        print(f"[COVER] Kein Cover gefunden für Album:\n  {container}")
+        return None
+    return img_path
+
+@lru_cache(maxsize=COVER_CACHE_SIZE)
+def cover_key(img_path: Path) -> str:
+    # Fingerprint von Scan und Einstellungen: ändert sich einer davon, entsteht ein neues Cover
+    st = img_path.stat()
+    if not COVER_MAX_PX or Image is None:
+        src = f"{img_path.resolve()}|{st.st_size}|{st.st_mtime_ns}|original"
+    else:
+        src = f"{img_path.resolve()}|{st.st_size}|{st.st_mtime_ns}|{COVER_MAX_PX}|{COVER_QUALITY}"
+    return hashlib.sha1(src.encode("utf-8")).hexdigest()[:20]
+
+def cover_derivative(img_path: Path, cache_dir: Path) -> Path:
+    # Verkleinertes Cover (längste Kante COVER_MAX_PX, Baseline-JPEG) einmal erzeugen und auf Platte ablegen
+    cached = cache_dir / f"{cover_key(img_path)}.jpg"
+    if cached.exists():
+        return cached
+    with Image.open(img_path) as img:
+        if img.format == "JPEG" and img.mode in ("RGB", "L") and max(img.size) <= COVER_MAX_PX:
+            return img_path # schon klein genug: Original ohne erneute Kompression
+        img.draft("RGB", (COVER_MAX_PX, COVER_MAX_PX)) # JPEG: Verkleinerung schon beim Dekodieren
+        cover = img.convert("RGB")
+    cover.thumbnail((COVER_MAX_PX, COVER_MAX_PX), Image.LANCZOS)
+
+    # Atomar anlegen (parallele Worker-Prozesse können dasselbe Cover erzeugen)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_name(f".{cached.name}.{os.getpid()}.{threading.get_ident()}.part")
+    cover.save(tmp, "JPEG", quality=COVER_QUALITY, optimize=True)
+    os.replace(tmp, cached)
+    return cached
+
+@lru_cache(maxsize=COVER_CACHE_SIZE)
+def load_picture(img_path: Path, cache_dir: Path | None = None) -> Picture:
+    # Mit cache_dir (und Pillow) wird das verkleinerte Cover eingebettet, sonst der Scan selbst
+    if cache_dir is not None and COVER_MAX_PX and Image is not None:
+        img_path = cover_derivative(img_path, cache_dir)
 
-    audio = FLAC(str(flac_file))
     pic = Picture()
     pic.type = 3  # Front cover
-    pic.mime = mime
     pic.desc = "Cover"
 
     with open(img_path, "rb") as f:
         pic.data = f.read()
 
-    audio.add_picture(pic)
-    audio.save()
+    # MIME aus der Endung; mit Pillow aus dem tatsächlichen Bildformat (z. B. unverändert übernommenes PNG)
+    pic.mime = COVER_MIME.get(img_path.suffix.lower(), "image/jpeg")
+    if Image is not None:
+        with Image.open(io.BytesIO(pic.data)) as img: # liest nur den Header
+            pic.width, pic.height = img.size
+            pic.depth = 8 * len(img.getbands())
+            pic.mime = Image.MIME.get(img.format, pic.mime)
+    return pic
+
+def cover_source(source_wav: Path) -> Path | None:
+    # Scan, aus dem das Cover des Albums entsteht (pro Container nur einmal gesucht)
+    container = cover_container(source_wav)
+    if container is None:
+        return None
+    with _cover_lock:
+        return find_cover(container)
+
+def resolve_cover(source_wav: Path, cache_dir: Path | None = None, dry_run: bool = False) -> Picture | None:
+    # Cover pro Album nur einmal suchen, verkleinern und lesen; alle Tracks teilen sich dasselbe Picture-Objekt
+    img_path = cover_source(source_wav)
+    if not img_path or dry_run:
+        return None
+    with _cover_lock: # verhindert, dass parallele Tracks desselben Albums das Bild mehrfach lesen
+        return load_picture(img_path, cache_dir)
+
+# --- Verarbeitung in Stufen (Lesen -> Kodieren -> Schreiben) ---
+READ_WORKERS = 4            # Threads der Lese-Stufe
+READS_PER_DEVICE = 2        # gleichzeitige Lesezugriffe pro Quellgerät (HDD/NAS: 1–2, SSD: mehr)
+WRITE_WORKERS = 2           # Threads für Tags, Cover und Manifest
+VERIFY_WORKERS = 2          # Threads für den MD5-Abgleich der fertigen FLACs
+BUFFER_BYTES = 2 * 1024**3  # gelesene, noch nicht kodierte WAV-Daten im Speicher (max.)
+
+@dataclass
+class RunConfig:
+    in_root: Path
+    out_root: Path
+    manifest: dict[str, dict]
+    dry_run: bool = False
+    use_hash: bool = False
+    encoder: str = "ffmpeg"
+    budget: ByteBudget | None = None # None: keine Begrenzung (sequenzielle Verarbeitung)
+    verify: bool = False             # fertige FLACs gegen die MD5 der WAV-Samples prüfen
+    journal: io.TextIOBase | None = None # Fortschritts-Journal (None: keines)
+    catalog: Catalog | None = None       # Logbuch-Katalog für Interpreten, Datum, Kommentar (None: keiner)
+    metrics: Metrics | None = None       # Laufzeit-Messung pro Stufe und Datei (None: aus)
+
+@dataclass
+class TrackJob:
+    wav: Path
+    trackmap: dict[Path, str]
+    size: int = 0                 # Dateigröße (Reihenfolge: größte zuerst)
+    device: int = 0               # st_dev der Quelle (Begrenzung der Lesezugriffe)
+    status: str = ""              # "converted" | "retagged" | "unchanged" | "failed"
+    error: str | None = None
+    tags: dict | None = None
+    out_flac: Path | None = None
+    tmp_flac: Path | None = None  # Kodierung und Tags landen zuerst hier, dann rename auf out_flac
+    key: str = ""
+    fingerprint: dict | None = None
+    picture: Picture | None = None
+    cover: str | None = None      # Fingerprint des Cover-Scans (Manifest: Cover geändert -> neu taggen)
+    data: bytes | None = None     # WAV-Inhalt zwischen Lese- und Kodier-Stufe
+    has_metadata: bool = False
+    expected: tuple | None = None # (MD5, Samples, Kanäle, Bit) der Quelle für die Prüf-Stufe
+
+def read_stage(job: TrackJob, cfg: RunConfig) -> str | None:
+    # Metadaten bestimmen, mit dem Manifest abgleichen und die WAV einlesen
+    with timed(cfg.metrics, "parse", job.wav):
+        job.tags = parse_path(job.wav)  # wählt intern single/box
+    if job.tags is None:
+        raise RuntimeError("Parser gab None zurück")
+
+    tn = job.trackmap.get(job.wav)
+    if not tn:
+        raise RuntimeError("Keine Tracknummer ermittelt")
+
+    job.tags["tracknumber"] = tn
+    if cfg.catalog is not None:
+        with timed(cfg.metrics, "catalog", job.wav):
+            apply_catalog(job.tags, cfg.catalog, job.wav)
+
+    # Zielpfad
+    job.out_flac = out_flac_path(job.wav, in_root=cfg.in_root, out_root=cfg.out_root)
+
+    # Abgleich mit dem Manifest
+    job.key = job.wav.relative_to(cfg.in_root).as_posix()
+    entry = cfg.manifest.get(job.key)
+    unchanged, job.fingerprint = source_unchanged(job.wav, entry, use_hash=cfg.use_hash)
+
+    cover_scan = cover_source(job.wav)
+    job.cover = cover_key(cover_scan) if cover_scan else None
+    cover_dir = cfg.out_root / COVER_DIR
+
+    if unchanged and job.out_flac.exists():
+        cover_changed = entry.get("cover") != job.cover
+        if entry.get("tags") == job.tags and not cover_changed:
+            job.status = "unchanged"
+            return None
+        # Audio unverändert, nur Metadaten (und ggf. das Cover) neu schreiben
+        job.status = "retagged"
+        if cover_changed:
+            with timed(cfg.metrics, "cover", job.wav):
+                job.picture = resolve_cover(job.wav, cover_dir, dry_run=cfg.dry_run)
+        return "write"
+
+    job.status = "converted"
+    with timed(cfg.metrics, "cover", job.wav):
+        job.picture = resolve_cover(job.wav, cover_dir, dry_run=cfg.dry_run)
+    if not cfg.dry_run:
+        job.tmp_flac = temp_flac_path(job.out_flac)
+        if cfg.budget:
+            cfg.budget.acquire(job.size)
+        try:
+            with timed(cfg.metrics, "read", job.wav, read=job.size):
+                job.data = job.wav.read_bytes()
+        except Exception:
+            if cfg.budget:
+                cfg.budget.release(job.size)
+            raise
+    return "encode"
+
+def encode_stage(job: TrackJob, cfg: RunConfig) -> str | None:
+    # Konvertieren (je nach Backend inklusive Tags und Cover)
+    try:
+        target = job.tmp_flac or job.out_flac
+        # Bytes nur bei Plattenzugriff: die Daten liegen schon im Speicher (read), die FLAC zählt finish
+        with timed(cfg.metrics, "encode", job.wav, read=job.size if job.data is None and not cfg.dry_run else 0):
+            job.has_metadata = ENCODERS[cfg.encoder](job.wav, target, job.tags, job.picture,
+                                                     compression_level=5, dry_run=cfg.dry_run, data=job.data)
+        if cfg.verify and job.data is not None:
+            # Soll-MD5 aus den Samples bilden, solange sie noch im Speicher liegen (kein zweites Lesen der WAV)
+            try:
+                with timed(cfg.metrics, "digest", job.wav):
+                    job.expected = verify.source_digest(job.data, job.tmp_flac)
+            except NotImplementedError:
+                job.expected = None # Format ohne vergleichbare PCM-Daten, bleibt ungeprüft
+            except (ValueError, struct.error) as e:
+                # Ungewöhnlicher WAV-Header (data vor fmt, abgeschnitten ...): Kodierung gelungen, nur nicht prüfbar
+                job.expected = None
+                print(f"[WARNING] Prüfung nicht möglich ({verify.ERROR}), FLAC bleibt ungeprüft: {job.wav}: WAV: {e}")
+    finally:
+        if job.data is not None:
+            job.data = None
+            if cfg.budget:
+                cfg.budget.release(job.size)
+    return "write"
+
+def write_stage(job: TrackJob, cfg: RunConfig) -> str | None:
+    if job.status == "retagged":
+        with timed(cfg.metrics, "tag", job.wav):
+            write_flac_tags(job.out_flac, job.tags, job.picture, dry_run=cfg.dry_run, remove_picture=job.cover is None)
+    elif not job.has_metadata:
+        # Tags und Cover in einem Speichervorgang schreiben
+        with timed(cfg.metrics, "tag", job.wav):
+            write_flac_tags(job.tmp_flac or job.out_flac, job.tags, job.picture, dry_run=cfg.dry_run)
+
+    if job.expected:
+        return "verify"
+    finish_output(job, cfg)
+    return None
+
+def verify_stage(job: TrackJob, cfg: RunConfig) -> str | None:
+    # Fertige FLAC (nach dem Taggen) gegen die Soll-MD5 prüfen: STREAMINFO, Länge und letzter Frame
+    md5, frames, channels, bits = job.expected
+    io_stats = {}
+    with timed(cfg.metrics, "verify", job.wav) as span:
+        status, detail = verify.check_flac(job.tmp_flac, lambda _: md5, frames, channels, bits, stats=io_stats)
+        span.read = io_stats.get("read", 0) # nur Kopf und Dateiende der FLAC
+    if status != verify.OK:
+        raise RuntimeError(f"Prüfung fehlgeschlagen ({status}): {detail}")
+    finish_output(job, cfg, md5=md5)
+    return None
+
+def finish_output(job: TrackJob, cfg: RunConfig, md5: str | None = None) -> None:
+    # Temporäre Datei atomar an ihren Platz bringen; erst danach gilt der Track als fertig (Manifest + Journal)
+    if cfg.dry_run:
+        return
+    if job.tmp_flac is not None:
+        # Fertige FLAC einmal als geschrieben zählen (Kodieren und Taggen schreiben in dieselbe Datei)
+        with timed(cfg.metrics, "finish", job.wav) as span:
+            os.replace(job.tmp_flac, job.out_flac)
+            span.written = job.out_flac.stat().st_size
+        job.tmp_flac = None
+    entry = {**job.fingerprint, "flac": job.out_flac.relative_to(cfg.out_root).as_posix(), "tags": job.tags}
+    if job.cover:
+        entry["cover"] = job.cover
+    previous = cfg.manifest.get(job.key) or {}
+    if md5 or (job.status == "retagged" and previous.get("md5")): # beim Neu-Taggen bleibt die Audio-MD5 gültig
+        entry["md5"] = md5 or previous["md5"]
+    cfg.manifest[job.key] = entry
+    if cfg.journal is not None:
+        record_done(cfg.journal, job.key, entry)
+
+def discard_output(job: TrackJob) -> None:
+    # Nach einem Fehler: halbfertige temporäre Datei entfernen (die alte FLAC bleibt unangetastet)
+    if job.tmp_flac is not None:
+        job.tmp_flac.unlink(missing_ok=True)
+        job.tmp_flac = None
+
+STAGES = {"read": read_stage, "encode": encode_stage, "write": write_stage, "verify": verify_stage}
+
+def build_scheduler(cfg: RunConfig, encode_workers: int, on_done, extra: tuple[Stage, ...] = ()) -> StageScheduler:
+    # Lesen (pro Gerät begrenzt), Kodieren (pro CPU-Kern), Schreiben, Prüfen
+    # extra: weitere Stufen im selben Scheduler (z. B. Booklet-PDFs im gemeinsamen Lauf); Einreichen mit submit(job, name)
+    return StageScheduler([
+        Stage("read", partial(read_stage, cfg=cfg), READ_WORKERS, per_device=READS_PER_DEVICE),
+        Stage("encode", partial(encode_stage, cfg=cfg), encode_workers),
+        Stage("write", partial(write_stage, cfg=cfg), WRITE_WORKERS),
+        Stage("verify", partial(verify_stage, cfg=cfg), VERIFY_WORKERS),
+        *extra,
+    ], on_done=on_done)
+
+def submit_container(scheduler: StageScheduler, wavs: list[Path]) -> None:
+    # Tracknummern pro Container, sobald er vollständig gelistet ist
+    trackmap = assign_tracknumbers(wavs)
+    for w in wavs:
+        st = w.stat()
+        scheduler.submit(TrackJob(w, trackmap, size=st.st_size, device=st.st_dev))
 
 # --- Hauptverarbeitung einer Datei ---
-def process_one(wav: Path, in_root: Path, out_root: Path, trackmap: dict[Path, str], dry_run: bool = False) -> tuple[Path, str | None]:
+def process_one(wav: Path, in_root: Path, out_root: Path, trackmap: dict[Path, str], manifest: dict[str, dict],
+                dry_run: bool = False, use_hash: bool = False, encoder: str = "ffmpeg",
+                verify_flac: bool = False) -> tuple[Path, str, str | None]:
+    # Alle Stufen nacheinander für eine Datei (ohne Scheduler)
+    # Rückgabe: (WAV, Status "converted" | "retagged" | "unchanged" | "failed", Fehlertext)
+    cfg = RunConfig(in_root, out_root, manifest, dry_run=dry_run, use_hash=use_hash, encoder=encoder, verify=verify_flac)
+    job = TrackJob(wav, trackmap)
     try:
-        tags = parse_path(wav)  # wählt intern single/box
-        if tags is None:
-            return (wav, "Parser gab None zurück")
-
-        tn = trackmap.get(wav)
-        if not tn:
-            return (wav, "Keine Tracknummer ermittelt")
-
-        tags["tracknumber"] = tn
-
-        # Zielpfad
-        out_flac = out_flac_path(wav, in_root=in_root, out_root=out_root)
-
-        # Konvertieren
-        convert_wav_to_flac(wav, out_flac, compression_level=5, dry_run=dry_run)
-
-        # Tags schreiben
-        write_flac_tags(out_flac, tags, dry_run=dry_run)
-
-        # Cover einbetten
-        embed_cover(out_flac, wav, dry_run=dry_run)
-
-        return (wav, None)
+        stage = "read"
+        while stage:
+            stage = STAGES[stage](job, cfg)
+        return (wav, job.status, None)
     except Exception as e:
-        return (wav, str(e))
+        discard_output(job)
+        return (wav, "failed", str(e))
+
+# --- Konvertierung eines Eingabebaums ---
+def convert_tree(cfg: RunConfig, encode_workers: int, bar=None) -> tuple[dict[str, int], list[tuple[Path, str]], int]:
+    # WAV-Dateien suchen; jeder Container wird sofort eingereiht, während der Scan weiterläuft
+    # Rückgabe: (Anzahl pro Status, Fehlerliste, Anzahl gefundener WAVs)
+    errors = []
+    counts = defaultdict(int)
+    submitted = 0
+    finished = 0
+    done = queue.SimpleQueue() # fertige Jobs (vom Scheduler gemeldet)
+
+    def collect(job: TrackJob) -> None:
+        nonlocal finished
+        if job.error:
+            job.status = "failed"
+            discard_output(job)
+            errors.append((job.wav, job.error))
+        counts[job.status] += 1
+        finished += 1
+        if bar is not None:
+            bar.update(1)
+
+    scheduler = build_scheduler(cfg, encode_workers, on_done=done.put)
+    try:
+        for container, container_wavs in iter_containers(cfg.in_root, metrics=cfg.metrics):
+            submit_container(scheduler, container_wavs)
+            submitted += len(container_wavs)
+            if bar is not None:
+                bar.total = submitted
+                bar.refresh()
+
+            # Bereits fertige Dateien einsammeln, ohne den Scan aufzuhalten
+            while not done.empty():
+                collect(done.get())
+
+        while finished < submitted:
+            collect(done.get())
+    finally:
+        scheduler.close()
+    return counts, errors, submitted
+
+# --- Worker-Modus (verteilte Queue) ---
+POLL_SECONDS = 5 # Wartezeit, wenn gerade kein Job frei ist
+
+def scan_into_queue(q: FileQueue, input_root: Path, stop: threading.Event, held: set[str]) -> None:
+    # Genau ein Worker legt die Jobs an (ein Job pro Container); fällt er aus, übernimmt ein anderer nach Lease-Ablauf
+    while not q.scan_done() and not stop.is_set():
+        if not q.try_lease("scan"):
+            stop.wait(POLL_SECONDS)
+            continue
+        held.add("scan")
+        try:
+            for container, wavs in iter_containers(input_root):
+                q.enqueue(os.path.relpath(container, input_root),
+                          {"wavs": [w.relative_to(input_root).as_posix() for w in wavs]})
+            q.mark_scan_done()
+        finally:
+            held.discard("scan")
+            q.release("scan")
+
+def convert_container(scheduler: StageScheduler, done: queue.SimpleQueue, cfg: RunConfig, wavs: list[Path]) -> dict:
+    # Alle Tracks eines Containers durch den Scheduler schicken und auf ihr Ende warten
+    keys = [w.relative_to(cfg.in_root).as_posix() for w in wavs]
+    base = cfg.manifest
+    cfg.manifest = {k: base[k] for k in keys if k in base} # eigener Ausschnitt, wird im Ergebnis abgelegt
+    submit_container(scheduler, wavs)
+
+    counts = defaultdict(int)
+    errors = []
+    for _ in wavs:
+        job = done.get()
+        if job.error:
+            job.status = "failed"
+            discard_output(job)
+            errors.append([job.wav.relative_to(cfg.in_root).as_posix(), job.error])
+        counts[job.status] += 1
+
+    result = {"manifest": cfg.manifest, "counts": dict(counts), "errors": errors}
+    cfg.manifest = base
+    return result
+
+def run_worker(args) -> int:
+    # Nicht-interaktiver Worker: Container aus der gemeinsamen Queue holen, konvertieren, als erledigt markieren
+    input_root = args.input.expanduser()
+    output_root = args.output.expanduser() / input_root.name
+    # Ist die letzte Generation abgeschlossen, eröffnet FileQueue eine neue: ein später Worker scannt das Archiv
+    # erneut (neue oder geänderte Container werden konvertiert, unveränderte Tracks über das Manifest übersprungen)
+    q = FileQueue(args.queue or output_root / ".wav2flac-queue", worker_id=args.worker_id, lease_seconds=args.lease)
+    print(f"[{q.worker_id}] Eingabe: {input_root}\n[{q.worker_id}] Ausgabe: {output_root}\n[{q.worker_id}] Queue: {q.root}")
+
+    # Journale abgebrochener Worker übernehmen: deren fertige Tracks werden nicht erneut kodiert
+    manifest = load_manifest(output_root)
+    replayed = replay_journals(output_root, manifest)
+    if replayed:
+        print(f"[{q.worker_id}] Journal: {replayed} fertige Tracks aus abgebrochenen Läufen übernommen.")
+    journal = open_journal(output_root, name=f".wav2flac-journal-{q.worker_id}.jsonl")
+    cfg = RunConfig(input_root, output_root, manifest, use_hash=args.hash, encoder=args.encoder,
+                    budget=ByteBudget(BUFFER_BYTES), verify=not args.no_verify, journal=journal,
+                    catalog=Catalog(args.catalog.expanduser()) if args.catalog else None,
+                    metrics=instrumentation.from_args(f"wav2flac-{q.worker_id}", args))
+    done = queue.SimpleQueue()
+    scheduler = build_scheduler(cfg, args.workers, on_done=done.put)
+
+    # Heartbeat für die eigenen Leases, damit lange Container nicht als verwaist gelten
+    held = set()
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(max(1, args.lease // 3)):
+            for jid in list(held):
+                q.renew(jid)
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+    threading.Thread(target=scan_into_queue, args=(q, input_root, stop, held), daemon=True).start()
+
+    failed = 0
+    try:
+        while True:
+            claimed = q.claim()
+            if claimed is None:
+                if q.all_done():
+                    break
+                time.sleep(POLL_SECONDS)
+                continue
+
+            jid, payload = claimed
+            held.add(jid)
+            try:
+                # Container gehört jetzt diesem Worker -> Reste eines abgebrochenen Vorgängers entfernen
+                if payload["name"] != os.curdir:
+                    clean_temp_files(output_root / payload["name"])
+                wavs = [input_root / rel for rel in payload["wavs"]]
+                result = convert_container(scheduler, done, cfg, wavs)
+            finally:
+                held.discard(jid)
+            q.complete(jid, result)
+
+            c = result["counts"]
+            failed += c.get("failed", 0)
+            print(f"[{q.worker_id}] {payload['name']}: konvertiert {c.get('converted', 0)}, neu getaggt {c.get('retagged', 0)}, "
+                  f"unverändert {c.get('unchanged', 0)}, fehlgeschlagen {c.get('failed', 0)}")
+            for rel, err in result["errors"]:
+                print(f"  - {rel}: {err}")
+    finally:
+        stop.set()
+        scheduler.close()
+        journal.close()
+        if cfg.catalog is not None:
+            print_unmatched(cfg.catalog, input_root, prefix=f"[{q.worker_id}] ")
+            cfg.catalog.close()
+        instrumentation.report(cfg.metrics, args)
+
+    # Der Worker, der als letzter fertig wird, führt die Manifest-Ausschnitte aller Container zusammen
+    def merge(results):
+        manifest = load_manifest(output_root)
+        for result in results:
+            manifest.update(result["manifest"])
+        save_manifest(output_root, manifest)
+        clear_journals(output_root) # alles steht jetzt im Manifest
+
+    if q.finalize(merge):
+        print(f"[{q.worker_id}] Alle Container erledigt, Manifest zusammengeführt.")
+    return 2 if failed else 0
+
+# --- Prüf-Modus (bestehende Bibliothek) ---
+VERIFY_JOURNAL = ".wav2flac-verify.jsonl" # Prüfergebnisse, eine Zeile pro Datei (Wiederaufnahme nach Abbruch)
+
+def load_verify_journal(path: Path) -> dict[str, dict]:
+    # Letzter Eintrag pro Datei gewinnt; eine halb geschriebene letzte Zeile (Abbruch) wird ignoriert
+    entries = {}
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[entry["key"]] = entry
+    return entries
+
+def verify_fingerprint(wav: Path, flac: Path) -> dict | None:
+    # Größe und Änderungszeit beider Dateien; ändert sich eine davon, wird neu geprüft
+    try:
+        ws, fs = wav.stat(), flac.stat()
+    except FileNotFoundError:
+        return None
+    return {"wav": [ws.st_size, ws.st_mtime_ns], "flac": [fs.st_size, fs.st_mtime_ns]}
+
+def run_verify(args) -> int:
+    # Alle WAVs unter --input mit ihren FLACs in der Bibliothek vergleichen (parallel, wiederaufnehmbar)
+    input_root = args.input.expanduser()
+    output_root = args.output.expanduser() / input_root.name
+    output_root.mkdir(parents=True, exist_ok=True)
+    journal_path = output_root / VERIFY_JOURNAL
+    journal = load_verify_journal(journal_path)
+    print(f"Eingabe: {input_root}\nBibliothek: {output_root}\nJournal: {len(journal)} Einträge")
+
+    counts = defaultdict(int)
+    problems = []
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as ex:
+        futures = {}
+        for _, wavs in iter_containers(input_root):
+            for wav in wavs:
+                key = wav.relative_to(input_root).as_posix()
+                flac = out_flac_path(wav, in_root=input_root, out_root=output_root)
+                fingerprint = verify_fingerprint(wav, flac)
+                prev = journal.get(key)
+                if fingerprint and prev and prev["status"] == verify.OK and prev["fingerprint"] == fingerprint:
+                    counts[verify.OK] += 1 # bereits geprüft und seitdem unverändert
+                    skipped += 1
+                    continue
+                futures[ex.submit(verify.verify_pair, wav, flac)] = (key, fingerprint)
+
+        if not futures and not skipped:
+            print("Keine WAV-Dateien gefunden.", file=sys.stderr)
+            return 1
+
+        with open(journal_path, "a", encoding="utf-8") as jf:
+            for fut in tqdm(as_completed(futures), total=len(futures), desc="Prüfe"):
+                key, fingerprint = futures[fut]
+                status, detail = fut.result()
+                counts[status] += 1
+                if status != verify.OK:
+                    problems.append((key, status, detail))
+                entry = {"key": key, "status": status, "detail": detail, "fingerprint": fingerprint}
+                journal[key] = entry
+                jf.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                jf.flush() # jede fertige Prüfung übersteht einen Abbruch
+
+    # Journal verdichten (ein Eintrag pro Datei)
+    tmp = journal_path.with_name(journal_path.name + ".tmp")
+    tmp.write_text("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in journal.values()), encoding="utf-8")
+    os.replace(tmp, journal_path)
+
+    print(f"\nGeprüft: {sum(counts.values())} (davon {skipped} aus dem Journal), "
+          + ", ".join(f"{status}: {n}" for status, n in sorted(counts.items())))
+    if problems:
+        print("\nAbweichungen - WAVs nicht löschen:")
+        for key, status, detail in sorted(problems)[:100]:
+            print(f"  - [{status}] {key}: {detail}")
+        if len(problems) > 100:
+            print(f"  ... und {len(problems)-100} weitere.")
+        return 2
+    print("\nAlle FLACs stimmen bit-genau mit ihren WAVs überein.")
+    return 0
+
+# --- Argumente ---
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="WAV → FLAC Konverter (ohne Argumente: interaktiver Modus)")
+    parser.add_argument("--worker", action="store_true", help="Nicht-interaktiver Worker für eine gemeinsame Job-Queue")
+    parser.add_argument("--verify", action="store_true", help="Bestehende FLACs per STREAMINFO-MD5 gegen die WAVs prüfen")
+    parser.add_argument("--input", type=Path, help="Gemeinsamer Eingabe-Ordner mit WAV-Dateien")
+    parser.add_argument("--output", type=Path, help="Gemeinsamer Ausgabe-Ordner (Bibliothek liegt in <output>/<Eingabename>)")
+    parser.add_argument("--queue", type=Path, help="Queue-Verzeichnis (Standard: <Bibliothek>/.wav2flac-queue)")
+    parser.add_argument("--lease", type=int, default=600, help="Sekunden ohne Heartbeat, bis ein Job als verwaist gilt")
+    parser.add_argument("--worker-id", help="Name dieses Workers (Standard: <Hostname>-<PID>)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Kodier-Threads pro Worker")
+    parser.add_argument("--encoder", choices=list(ENCODERS), default="ffmpeg", help="Encoder-Backend")
+    parser.add_argument("--hash", action="store_true", help="Inhalts-Hash bei geänderter Änderungszeit prüfen")
+    parser.add_argument("--no-verify", action="store_true", help="Worker: fertige FLACs nicht per MD5 prüfen")
+    parser.add_argument("--resume", action="store_true", help="Interaktiv: abgebrochenen Lauf ohne Rückfrage fortsetzen")
+    parser.add_argument("--catalog", type=Path, help="Logbuch-Katalog (LogbuchConverter.py --catalog) für Interpreten, Datum, Kommentar")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.worker and args.verify:
+        parser.error("--worker und --verify schließen sich aus")
+    if (args.worker or args.verify) and not (args.input and args.output):
+        parser.error(f"{'--worker' if args.worker else '--verify'} benötigt --input und --output")
+    if args.worker and not encoder_available(args.encoder):
+        parser.error(f"Encoder '{args.encoder}' ist nicht verfügbar")
+    if args.catalog and not args.catalog.expanduser().exists():
+        parser.error(f"Katalog nicht gefunden: {args.catalog}")
+    return args
 
 # --- Main ---    
 def main():
+    args = parse_args()
+    if args.worker:
+        sys.exit(run_worker(args))
+    if args.verify:
+        sys.exit(run_verify(args))
+
     print("\n=== Konverter Optionen ===")
     
-    # Anzahl der parallel laufenden Prozesse abhängig vom Operating System setzen
+    # Anzahl der parallel laufenden Kodierungen abhängig vom Operating System setzen
     workers = os.cpu_count() or 4   # Fallback: 4
-    print(f"Threads automatisch auf {workers} gesetzt (Anzahl CPU-Kerne).")
+    print(f"Kodier-Threads automatisch auf {workers} gesetzt (Anzahl CPU-Kerne).")
 
     # Terminal-Modus abfragen
     terminal = ask_terminal_mode()
@@ -473,37 +1304,69 @@ def main():
     # Dry-Run abfragen
     dry_run = ask_dry_run()
 
+    # Inhalts-Hash abfragen
+    use_hash = ask_content_hash()
+
+    # Encoder abfragen
+    encoder = ask_encoder()
+
     # Ordner auswählen (je nach Modus)
     input_root = choose_directory("Wähle den Eingabe-Ordner mit WAV-Dateien", terminal=terminal)
     output_root = choose_directory("Wähle den Ausgabe-Ordner für FLAC-Dateien", terminal=terminal)
 
-    # Ausgabeordner mit Timestamp
-    run_ts = datetime.now().strftime("%Y-%m-%d_%H-%M")
-    inputfoldeername = os.path.basename(input_root)
-    inputfoldeername = inputfoldeername + "-to-" + run_ts
-    output_root = output_root / inputfoldeername
+    # Stabiler Ausgabeordner (gleicher Name bei jedem Lauf, damit das Manifest greift)
+    output_root = output_root / input_root.name
     print(f"Ausgabe-Ordner: {output_root}")
 
-    # WAV-Dateien finden
-    wavs = find_wavs(input_root)
-    if not wavs:
+    # Manifest des letzten Laufs laden
+    manifest = load_manifest(output_root)
+    print(f"Manifest: {len(manifest)} bekannte Dateien.")
+
+    # Abgebrochener Lauf? (Journal vorhanden)
+    resume = False
+    if not dry_run and journal_files(output_root):
+        resume = args.resume or ask_resume()
+        if resume:
+            print(f"Journal: {replay_journals(output_root, manifest)} fertige Tracks übernommen.")
+        else:
+            clear_journals(output_root)
+        removed = clean_temp_files(output_root)
+        if removed:
+            print(f"{removed} unfertige temporäre Dateien entfernt.")
+
+    # Stufen-Scheduler: Lesen (pro Gerät begrenzt), Kodieren (pro CPU-Kern), Schreiben
+    print(f"Stufen: Lesen {READ_WORKERS} (max. {READS_PER_DEVICE} pro Gerät), Kodieren {workers}, Schreiben {WRITE_WORKERS}, "
+          f"Prüfen {VERIFY_WORKERS} (MD5-Abgleich).")
+    cfg = RunConfig(input_root, output_root, manifest, dry_run=dry_run, use_hash=use_hash, encoder=encoder,
+                    budget=ByteBudget(BUFFER_BYTES), verify=True,
+                    journal=None if dry_run else open_journal(output_root, keep=resume),
+                    catalog=Catalog(args.catalog.expanduser()) if args.catalog else None,
+                    metrics=instrumentation.from_args("wav2flac", args))
+    if cfg.catalog is not None:
+        print(f"Katalog: {cfg.catalog.path}")
+
+    try:
+        with tqdm(total=0, desc="Konvertiere") as bar:
+            counts, errors, submitted = convert_tree(cfg, workers, bar=bar)
+    finally:
+        # Manifest auch bei Abbruch (Strg-C) sichern; danach ist das Journal überflüssig.
+        # Bei einem harten Abbruch (Stromausfall) bleibt das Journal stehen -> nächster Lauf mit --resume
+        if cfg.journal is not None:
+            cfg.journal.close()
+            if manifest:
+                save_manifest(output_root, manifest)
+            clear_journals(output_root)
+
+    if not submitted:
         print("Keine WAV-Dateien gefunden.", file=sys.stderr)
         sys.exit(1)
 
-    # Tracknummern zuweisen
-    trackmap = assign_tracknumbers(wavs)
-
-    # Verarbeitung mit Fortschrittsanzeige
-    errors = []
-    with ThreadPoolExecutor(max_workers=workers) as ex:
-        futures = {
-            ex.submit(process_one, w, input_root, output_root, trackmap, dry_run): w
-            for w in wavs
-        }
-        for fut in tqdm(as_completed(futures), total=len(futures), desc="Konvertiere"):
-            wav, err = fut.result()
-            if err:
-                errors.append((wav, err))
+    print(f"\nKonvertiert: {counts['converted']}, neu getaggt: {counts['retagged']}, "
+          f"unverändert: {counts['unchanged']}, fehlgeschlagen: {counts['failed']}")
+    if cfg.catalog is not None:
+        print_unmatched(cfg.catalog, input_root)
+        cfg.catalog.close()
+    instrumentation.report(cfg.metrics, args)
 
     # Zusammenfassung
     if errors:
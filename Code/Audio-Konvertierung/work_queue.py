@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Dateibasierte Job-Queue für verteilte wav2flac-Läufe:
+# Mehrere Worker-Prozesse (auf einem oder mehreren Rechnern mit demselben Mount) teilen sich ein
+# Queue-Verzeichnis. Jobs werden per Lease-Datei beansprucht; läuft eine Lease ab (Worker abgestürzt,
+# Rechner schläft), darf ein anderer Worker den Job übernehmen.
+#
+# Jeder Scan des Archivs bildet eine Generation (gen-000001, gen-000002, …). Ist die neueste Generation
+# abgeschlossen, eröffnet der nächste startende Worker eine neue; so werden neue oder geänderte Container in
+# einem gewachsenen Archiv beim nächsten Lauf erfasst (unveränderte Tracks überspringt das Manifest).
+#
+# Aufbau einer Generation:
+#   jobs/<id>.json     Job-Beschreibung (einmalig angelegt, nie verändert)
+#   leases/<id>.lease  Aktuelle Beanspruchung; Ablauf über die Änderungszeit (Heartbeat per utime)
+#   done/<id>.json     Ergebnis eines abgeschlossenen Jobs
+#   scan.done          Die Suche nach Jobs ist abgeschlossen
+#   complete           Alle Jobs erledigt und Ergebnisse zusammengeführt
+#   Sonder-Leases "scan" (Jobs anlegen) und "merge" (Ergebnisse zusammenführen) laufen genauso ab.
+#
+# Voraussetzung bei mehreren Rechnern: Uhren per NTP synchron (Lease-Ablauf über mtime).
+
+# --- Imports ---
+import os, json, time, shutil, socket, hashlib
+from pathlib import Path
+
+def job_id(name: str) -> str:
+    # Stabile, dateinamentaugliche ID (gleicher Container -> gleiche ID auf allen Rechnern)
+    return hashlib.sha1(name.encode("utf-8")).hexdigest()[:20]
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def write_exclusive(path: Path, payload: dict) -> bool:
+    # Legt path atomar an (vollständiger Inhalt oder gar nicht); False, wenn path schon existiert
+    tmp = path.with_name(f".{path.name}.{default_worker_id()}.tmp")
+    tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    try:
+        os.link(tmp, path) # schlägt fehl, wenn path existiert (auch auf NFS atomar)
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        tmp.unlink(missing_ok=True)
+
+# --- Generationen ---
+GENERATION_PREFIX = "gen-"
+
+def generations(base: Path) -> list[int]:
+    numbers = [name[len(GENERATION_PREFIX):] for name in os.listdir(base) if name.startswith(GENERATION_PREFIX)]
+    return sorted(int(n) for n in numbers if n.isdigit())
+
+def generation_dir(base: Path, number: int) -> Path:
+    return base / f"{GENERATION_PREFIX}{number:06d}"
+
+def open_generation(base: Path) -> Path:
+    # Laufende Generation verwenden; ist die neueste abgeschlossen (oder gibt es keine), die nächste eröffnen
+    base.mkdir(parents=True, exist_ok=True)
+    gens = generations(base)
+    latest = gens[-1] if gens else 0
+    if latest and not (generation_dir(base, latest) / "complete").exists():
+        return generation_dir(base, latest)
+    new = generation_dir(base, latest + 1)
+    try:
+        new.mkdir() # atomar: nur ein Worker eröffnet die neue Generation
+    except FileExistsError:
+        return new
+    for old in gens: # abgeschlossene Generationen werden nicht mehr gebraucht (Ergebnisse stehen im Manifest)
+        shutil.rmtree(generation_dir(base, old), ignore_errors=True)
+    return new
+
+# --- Queue ---
+class FileQueue:
+    def __init__(self, root: Path, worker_id: str | None = None, lease_seconds: int = 600):
+        self.base = Path(root)
+        self.root = open_generation(self.base) # Verzeichnis der aktuellen Generation
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.jobs_dir = self.root / "jobs"
+        self.leases_dir = self.root / "leases"
+        self.done_dir = self.root / "done"
+        for d in (self.jobs_dir, self.leases_dir, self.done_dir):
+            d.mkdir(parents=True, exist_ok=True)
+
+    # --- Jobs anlegen ---
+    def enqueue(self, name: str, payload: dict) -> bool:
+        # Idempotent: mehrere Worker dürfen denselben Job anlegen, nur der erste gewinnt
+        return write_exclusive(self.jobs_dir / f"{job_id(name)}.json", {"name": name, **payload})
+
+    def mark_scan_done(self) -> None:
+        (self.root / "scan.done").touch()
+
+    def scan_done(self) -> bool:
+        return (self.root / "scan.done").exists()
+
+    def is_complete(self) -> bool:
+        return (self.root / "complete").exists()
+
+    # --- Leases ---
+    def _lease_path(self, jid: str) -> Path:
+        return self.leases_dir / f"{jid}.lease"
+
+    def try_lease(self, jid: str) -> bool:
+        # Neue Lease anlegen oder eine abgelaufene übernehmen
+        lease = self._lease_path(jid)
+        if write_exclusive(lease, {"worker": self.worker_id, "since": time.time()}):
+            return True
+        try:
+            age = time.time() - lease.stat().st_mtime
+        except FileNotFoundError:
+            return write_exclusive(lease, {"worker": self.worker_id, "since": time.time()})
+        if age <= self.lease_seconds:
+            return False
+
+        # Abgelaufen: per rename entfernen - das gelingt nur genau einem Worker
+        stale = lease.with_name(f"{lease.name}.stale.{self.worker_id}")
+        try:
+            os.rename(lease, stale)
+        except FileNotFoundError:
+            return False
+        if time.time() - stale.stat().st_mtime <= self.lease_seconds:
+            # Zwischen stat und rename hat ein anderer Worker die Lease neu angelegt -> zurückgeben
+            try:
+                os.link(stale, lease)
+            except FileExistsError:
+                pass
+            stale.unlink(missing_ok=True)
+            return False
+        stale.unlink(missing_ok=True)
+        return write_exclusive(lease, {"worker": self.worker_id, "since": time.time()})
+
+    def renew(self, jid: str) -> None:
+        # Heartbeat: Änderungszeit der eigenen Lease auffrischen
+        try:
+            os.utime(self._lease_path(jid))
+        except FileNotFoundError:
+            pass
+
+    def release(self, jid: str) -> None:
+        self._lease_path(jid).unlink(missing_ok=True)
+
+    # --- Abarbeiten ---
+    def is_done(self, jid: str) -> bool:
+        return (self.done_dir / f"{jid}.json").exists()
+
+    def pending(self) -> list[str]:
+        # IDs ohne Ergebnis (unabhängig davon, ob gerade beansprucht); zwei Listings statt stat pro Job
+        jobs = {name[:-5] for name in os.listdir(self.jobs_dir) if name.endswith(".json")}
+        done = {name[:-5] for name in os.listdir(self.done_dir) if name.endswith(".json")}
+        return sorted(jobs - done)
+
+    def claim(self) -> tuple[str, dict] | None:
+        # Ersten freien Job beanspruchen; None, wenn gerade nichts frei ist
+        for jid in self.pending():
+            if not self.try_lease(jid):
+                continue
+            if self.is_done(jid): # zwischenzeitlich von einem anderen Worker abgeschlossen
+                self.release(jid)
+                continue
+            payload = json.loads((self.jobs_dir / f"{jid}.json").read_text(encoding="utf-8"))
+            return jid, payload
+        return None
+
+    def complete(self, jid: str, result: dict) -> None:
+        write_exclusive(self.done_dir / f"{jid}.json", {"worker": self.worker_id, **result})
+        self.release(jid)
+
+    def all_done(self) -> bool:
+        return self.scan_done() and not self.pending()
+
+    def results(self):
+        for p in sorted(self.done_dir.glob("*.json")):
+            yield json.loads(p.read_text(encoding="utf-8"))
+
+    def finalize(self, merge) -> bool:
+        # Genau ein Worker führt die Ergebnisse zusammen (merge(results)) und markiert die Queue als fertig
+        if not self.all_done() or self.is_complete():
+            return False
+        if not self.try_lease("merge"):
+            return False
+        merge(self.results())
+        (self.root / "complete").touch()
+        self.release("merge")
+        return True
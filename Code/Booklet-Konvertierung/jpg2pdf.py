@@ -2,13 +2,24 @@
 # -*- coding: utf-8 -*-
 
 # --- Imports ---
-import os, sys, re, unicodedata, tkinter as tk
+import os, sys, re, io, json, shutil, argparse, hashlib, threading, tkinter as tk
 from tkinter import filedialog
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
 from pathlib import Path
 from PIL import Image
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from pdf_writer import PdfWriter, passthrough_info, linearize_backend, linearize, check_linearized
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
 from tqdm import tqdm
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1])) # normalization.py liegt in Code/
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Audio-Konvertierung")) # scheduler.py (ByteBudget)
+from normalization import booklet_basename
+from instrumentation import Metrics, timed
+import instrumentation
+from scheduler import ByteBudget
+
 # --- Utilities ---
 def ask_terminal_mode() -> bool:
     while True:
@@ -19,6 +30,33 @@ def ask_terminal_mode() -> bool:
             return False
         print("Bitte 'y' oder 'n' eingeben.")
 
+def ask_derivatives() -> bool:
+    while True:
+        ans = input("Zusätzlich Bildschirm-PDF und Vorschaubilder erzeugen? [y/N]: ").strip().lower()
+        if ans in ("y", "yes", "j", "ja"):
+            return True
+        if ans in ("n", "no", ""):
+            return False
+        print("Bitte 'y' oder 'n' eingeben.")
+
+def ask_linearize() -> bool: # Abfrage, ob PDFs für die Anzeige im Browser linearisiert werden
+    while True:
+        ans = input("PDFs linearisieren (schnelle Web-Anzeige, benötigt pikepdf oder qpdf)? [y/N]: ").strip().lower()
+        if ans in ("y", "yes", "j", "ja"):
+            return True
+        if ans in ("n", "no", ""):
+            return False
+        print("Bitte 'y' oder 'n' eingeben.")
+
+def ask_content_hash() -> bool: # Abfrage, ob Seiten zusätzlich per Inhalt verglichen werden
+    while True:
+        ans = input("Inhalts-Hash der Seiten bei geänderter Änderungszeit prüfen? [y/N]: ").strip().lower()
+        if ans in ("y", "yes", "j", "ja"):
+            return True
+        if ans in ("n", "no", ""):
+            return False
+        print("Bitte 'y' oder 'n' eingeben.")
+
 def choose_directory(prompt: str, terminal: bool = False) -> Path:
     if terminal:
         while True:
@@ -40,50 +78,6 @@ def choose_directory(prompt: str, terminal: bool = False) -> Path:
             sys.exit(1)
         return Path(path)
 
-def nfc(s: str) -> str:
-    return unicodedata.normalize("NFC", s or "")
-
-def norm_text(s: str) -> str:  # Normalisierung für Titel, Alben und Werke
-    s = s.replace("_", " ")  # Unterstriche zu Leerzeichen
-    s = s.replace("--", "—")  # Doppelter Bindestrich zu einfachem Bindestrich
-    
-    # Opus vereinheitlichen
-    s = re.sub(r"\b(?:[oO][pP](?:us)?)(?:\.?\s*)(?=\d)", "op. ", s)
-
-    # Nummer vereinheitlichen
-    s = s.replace("Nº", "No")
-    s = re.sub(r"\b(?:no|nr)\.?\s*(\d+)(?=\D|$)", r"Nr. \1", s, flags=re.IGNORECASE)
-
-    # Volume vereinheitlichen → "Vol. n"
-    s = re.sub(r"\b(?:vol(?:ume)?)\.?\s*([0-9IVXLCDM]+)\b", r"Vol. \1", s, flags=re.IGNORECASE)
-
-    return s
-
-def smart_titlecase(s: str) -> str:
-    # Wandelt komplett großgeschriebene Strings in Title Case um
-    if not s or not s.isupper():
-        return s
-
-    # Sonderzeichen für Trennung
-    special_cases = ["+", ",", "§§§", "_", "."]
-
-    def fix_word(word: str) -> str:
-        w = word.capitalize()
-
-        # Apostrophe: d'Arc → d'Arc, O'Neill → O'Neill
-        w = re.sub(r"([DdOo])'([A-Za-z])",
-                   lambda m: m.group(1).lower() + "'" + m.group(2).upper(),
-                   w)
-
-        # Alle definierten Sonderzeichen prüfen
-        for sep in special_cases:
-            if sep in word:
-                return sep.join(fix_word(p) for p in word.split(sep))
-
-        return w
-
-    return " ".join(fix_word(w) for w in s.split())
-    
 def sort_booklet_files(files: list[Path]) -> list[Path]:
     def sort_key(p: Path):
         name = p.stem.lower()  # Dateiname ohne Endung
@@ -106,67 +100,401 @@ def sort_booklet_files(files: list[Path]) -> list[Path]:
     return sorted(files, key=sort_key)
 
 # --- Booklet Finder ---
-def find_booklet_folders(base: Path):
-    for folder in base.rglob("*"):
-        if folder.is_dir():
-            jpegs = []
-            for ext in ("*.jpg", "*.jpeg", "*.JPG", "*.JPEG"):
-                jpegs.extend(folder.glob(ext))
-            # Filter: keine macOS "._"-Dateien
-            jpegs = [f for f in jpegs if not f.name.startswith("._")]
-            if jpegs:
-                yield folder, sort_booklet_files(jpegs)
+JPEG_EXTS = (".jpg", ".jpeg")
+AUDIO_EXTS = (".wav", ".flac", ".aif", ".aiff", ".mp3")
+
+def find_booklet_folders(base: Path, skip_hidden: bool = True, skip_appledouble: bool = True,
+                         prune_audio: bool = True, skip_dirs: tuple[str, ...] = ()):
+    # Ein os.scandir pro Ordner: Dateien werden beim Listen sortiert (JPEG/Audio/Unterordner, Endung ohne
+    # Groß-/Kleinschreibung), Booklet-Ordner werden sofort geliefert (PDF-Erstellung startet vor Ende der Suche)
+    #   skip_hidden:      Ordner mit führendem Punkt (.Trash, .Spotlight-V100 ...) überspringen
+    #   skip_appledouble: macOS-Begleitdateien "._*" ignorieren
+    #   prune_audio:      unter Ordnern mit Audio, aber ohne JPEGs (Werkordner) nicht weitersuchen
+    #   skip_dirs:        weitere Ordnernamen, die übersprungen werden (z. B. "_thumbs"-Ausgaben)
+    stack = [base]
+    while stack:
+        folder = stack.pop()
+        jpegs, subdirs, has_audio = [], [], False
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    name = entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if (skip_hidden and name.startswith(".")) or name in skip_dirs:
+                            continue
+                        subdirs.append(name)
+                        continue
+                    if skip_appledouble and name.startswith("._"):
+                        continue
+                    ext = os.path.splitext(name)[1].lower()
+                    if ext in JPEG_EXTS:
+                        jpegs.append(folder / name)
+                    elif ext in AUDIO_EXTS:
+                        has_audio = True
+        except OSError as e:
+            print(f"[WARNING] Ordner nicht lesbar: {folder}: {e}")
+            continue
+
+        if jpegs and folder != base:
+            yield folder, sort_booklet_files(jpegs)
+        if prune_audio and has_audio and not jpegs:
+            continue
+        # Rückwärts auf den Stapel -> Unterordner werden alphabetisch abgearbeitet
+        stack.extend(folder / name for name in sorted(subdirs, reverse=True))
+
+SORT_WINDOW = 64 # so viele gefundene Booklets werden vor dem Einreichen nach Größe sortiert
+
+def page_stats(images: list[Path]) -> list[os.stat_result] | None:
+    # Ein stat pro Seite; dient der Sortierung und dem Fingerprint (None: Seite nicht lesbar, build_pdf meldet den Fehler)
+    try:
+        return [p.stat() for p in images]
+    except OSError:
+        return None
+
+def largest_first(booklets, window: int = SORT_WINDOW):
+    # (Ordner, Seiten, stat-Ergebnisse) in Suchreihenfolge, je <window> Booklets größte zuerst
+    # Ein großes Booklet soll nicht am Ende allein übrig bleiben; ohne vorher den ganzen Baum zu sammeln
+    batch = []
+    def flush():
+        batch.sort(key=lambda b: sum(st.st_size for st in b[2] or ()), reverse=True)
+        yield from batch
+        batch.clear()
+    for folder, images in booklets:
+        batch.append((folder, images, page_stats(images)))
+        if len(batch) >= window:
+            yield from flush()
+    yield from flush()
+
+def booklet_images(folder: Path, skip_appledouble: bool = True) -> list[Path]:
+    # JPEG-Seiten eines bekannten Booklet-Ordners in Seitenreihenfolge (ein os.scandir, z. B. aus album_pipeline.py)
+    with os.scandir(folder) as it:
+        jpegs = [folder / e.name for e in it
+                 if os.path.splitext(e.name)[1].lower() in JPEG_EXTS and e.is_file()
+                 and not (skip_appledouble and e.name.startswith("._"))]
+    return sort_booklet_files(jpegs)
 
 # --- PDF Builder ---
-def build_pdf(folder: Path, images: list[Path], out_dir: Path):
-    # Der direkte Elternordner von "booklet" ist immer der Namensgeber
-    base_dir = folder.parent
-    raw_name = nfc(base_dir.name)
-    placeholder = "§§§" # Platzhalter für doppelten Bindestrich (falls im Namen wie "Jean--Féry")
-    safe = raw_name.replace("--", placeholder)
-
-    # Trennen in Komponist und Medientitel
-    if "-" in safe:
-        comp_raw, title_raw = safe.split("-", 1)
-    else:
-        comp_raw, title_raw = safe, ""
-
-    # Normalisierung
-    comp  = smart_titlecase(comp_raw) if comp_raw else ""
-    title = norm_text(title_raw) if title_raw else ""
-
-    # Wieder zusammensetzen
-    base_name = f"{comp}-{title}"
-    base_name = base_name.replace(placeholder, "--")
-
-    # Leerzeichen in Unterstriche wandeln, PDF-Endung anhängen
-    pdf_name = f"{base_name.replace(' ', '_')}.pdf"
-    out_path = out_dir / pdf_name
-
-    # Warnung, wenn PDF schon existiert
-    if out_path.exists():
-        print(f"[WARNING] Überspringe {out_path}, Datei existiert bereits.")
+PASSTHROUGH = True       # JPEGs unverändert einbetten; False: jede Seite mit Pillow neu kodieren
+FALLBACK_QUALITY = 90    # JPEG-Qualität für neu kodierte Seiten (progressiv, CMYK, defekt)
+
+def reencode_page(img_path: Path) -> tuple[bytes, int, int, str]:
+    # Fallback: Seite mit Pillow dekodieren und als Baseline-JPEG (RGB) neu kodieren
+    with Image.open(img_path) as img:
+        rgb = img.convert("RGB")
+    buf = io.BytesIO()
+    rgb.save(buf, "JPEG", quality=FALLBACK_QUALITY)
+    return buf.getvalue(), rgb.width, rgb.height, "DeviceRGB"
+
+def passthrough_page(img_path: Path) -> tuple[bytes, int, int, str] | None:
+    # JPEG unverändert übernehmen; None, wenn die Seite neu kodiert werden muss
+    if not PASSTHROUGH:
+        return None
+    data = img_path.read_bytes()
+    info = passthrough_info(data) # liest nur den Header
+    return (data, *info) if info else None
+
+def reencode_task(index: int, img_path: Path) -> tuple[bytes, int, int, str]:
+    # Aufgabe für den Prozess-Pool (muss auf Modulebene liegen, damit sie sich pickeln lässt)
+    return reencode_page(img_path)
+
+# --- Ableitungen für die Bildschirmansicht ---
+SCREEN_MAX_PX = 1600     # längste Kante der Seiten im Bildschirm-PDF
+SCREEN_QUALITY = 70
+THUMB_MAX_PX = 256       # längste Kante der Vorschaubilder
+THUMB_QUALITY = 75
+
+def encode_jpeg(img: Image.Image, quality: int) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+def screen_page(img_path: Path, thumb_path: Path | None = None) -> tuple[bytes, int, int, str, tuple[int, int]]:
+    # Seite einmal verkleinert dekodieren und daraus Bildschirm-Seite und Vorschaubild erzeugen
+    with Image.open(img_path) as img:
+        page_size = img.size # Seitengröße wie im Archiv-PDF (1 Pixel des Scans = 1 pt)
+        img.draft("RGB", (SCREEN_MAX_PX, SCREEN_MAX_PX)) # JPEG: Verkleinerung schon beim Dekodieren (1/2, 1/4, 1/8)
+        page = img.convert("RGB")
+    page.thumbnail((SCREEN_MAX_PX, SCREEN_MAX_PX))
+    if thumb_path is not None:
+        thumb = page.copy()
+        thumb.thumbnail((THUMB_MAX_PX, THUMB_MAX_PX))
+        thumb.save(thumb_path, "JPEG", quality=THUMB_QUALITY)
+    return encode_jpeg(page, SCREEN_QUALITY), page.width, page.height, "DeviceRGB", page_size
+
+def screen_task(thumbs_dir: Path, index: int, img_path: Path):
+    # Aufgabe für den Prozess-Pool: Bildschirm-Seite und Vorschaubild <index>.jpg
+    return screen_page(img_path, thumbs_dir / f"{index:03d}.jpg")
+
+# --- Seitenweise Parallelisierung großer Booklets ---
+SPLIT_PAGES = 24         # Booklets ab so vielen Seiten werden seitenweise auf den Prozess-Pool verteilt
+PAGE_MEMORY_MB = 512     # Speicherbudget pro Prozess-Worker für Seiten in Arbeit (dekodierte Pixel, fertige JPEG-Daten)
+
+@dataclass
+class PagePool:
+    executor: ProcessPoolExecutor
+    budget: ByteBudget # Seiten in Arbeit über alle Booklets (dekodierte Pixel bzw. fertige JPEG-Daten)
+
+def decoded_size(img_path: Path) -> int:
+    # Speicherbedarf der dekodierten Seite (RGB); Pillow liest dafür nur den Header
+    with Image.open(img_path) as img:
+        width, height = img.size
+    return width * height * 3
+
+def iter_pages(images: list[Path], quick, heavy, pool: PagePool | None = None):
+    # Liefert (Bildpfad, Seite oder Exception) in der Reihenfolge von images
+    # quick(img_path): schneller Weg im Thread (None: Seite muss dekodiert werden)
+    # heavy(index, img_path): Dekodieren/Kodieren; bei großen Booklets im Prozess-Pool (kein GIL-Engpass)
+    if pool is None or len(images) < SPLIT_PAGES:
+        for index, img_path in enumerate(images, start=1):
+            try:
+                page = quick(img_path) if quick else None
+                yield img_path, page if page is not None else heavy(index, img_path)
+            except Exception as e:
+                yield img_path, e
         return
 
-    # Bilder laden
-    pil_images = []
-    for img_path in images:
+    window = deque() # (Bildpfad, Future oder fertige Seite, belegtes Budget) in Seitenreihenfolge
+
+    def take():
+        img_path, item, cost = window.popleft()
         try:
-            img = Image.open(img_path).convert("RGB")
-            pil_images.append(img)
+            page = item.result() if isinstance(item, Future) else item
         except Exception as e:
-            print(f"[WARNING] Konnte {img_path} nicht laden: {e}")
+            page = e
+        finally:
+            pool.budget.release(cost)
+        return img_path, page
 
-    if not pil_images:
-        print(f"[WARNING] Keine gültigen Bilder in {folder}")
-        return
+    try:
+        for index, img_path in enumerate(images, start=1):
+            try:
+                page = quick(img_path) if quick else None
+                cost = len(page[0]) if page is not None else decoded_size(img_path)
+            except Exception as e:
+                page, cost = e, 0
+            # Budget erschöpft: erst fertige Seiten der Reihe nach abgeben, dann ggf. auf andere Booklets warten
+            while window and not pool.budget.acquire(cost, block=False):
+                yield take()
+            if not window:
+                pool.budget.acquire(cost)
+            item = page if page is not None else pool.executor.submit(heavy, index, img_path)
+            window.append((img_path, item, cost))
+        while window:
+            yield take()
+    finally:
+        # Abbruch beim Schreiben: offene Seiten verwerfen und ihr Budget freigeben
+        for _, item, cost in window:
+            if isinstance(item, Future):
+                item.cancel()
+            pool.budget.release(cost)
+
+# --- Namen ---
+def booklet_name(folder: Path) -> str:
+    # Basisname aller Ausgaben eines Booklets, z. B. "Bach,Johann_Sebastian-Weihnachtsoratorium"
+    # Der direkte Elternordner von "booklet" ist immer der Namensgeber; wav2flac baut die Booklet-URL nach denselben Regeln
+    return booklet_basename(folder.parent.name)
+
+def write_pdf(out_path: Path, pages_iter, linearized: bool = False) -> int:
+    # Seiten einzeln in eine temporäre Datei schreiben (nie ein halbes PDF unter dem endgültigen Namen)
+    # pages_iter: iter_pages(...) -> (Bildpfad, (JPEG-Daten, Breite, Höhe, Farbraum[, Seitengröße]) oder Exception)
+    # linearized: zusätzlich linearisieren (schnelle Web-Anzeige); Rückgabe: Anzahl Seiten
+    tmp_path = out_path.with_name(f".{out_path.name}.part")
+    lin_path = out_path.with_name(f".{out_path.name}.lin.part")
+    pages = 0
+    try:
+        with PdfWriter(tmp_path) as pdf:
+            for img_path, page in pages_iter:
+                if isinstance(page, Exception):
+                    print(f"[WARNING] Konnte {img_path} nicht laden: {page}")
+                    continue
+                pdf.add_jpeg_page(*page)
+                pages += 1
+        if pages and linearized:
+            linearize(tmp_path, lin_path)
+            os.replace(lin_path, tmp_path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        lin_path.unlink(missing_ok=True)
+        raise
+    finally:
+        pages_iter.close()
+
+    if pages:
+        os.replace(tmp_path, out_path)
+    else:
+        tmp_path.unlink(missing_ok=True)
+    return pages
+
+# --- Index (Fingerprints der erzeugten Booklets) ---
+INDEX_NAME = ".jpg2pdf-index.json" # Liegt im Ausgabe-Ordner neben den PDFs
+
+def load_index(out_dir: Path) -> dict[str, dict]:
+    # PDF-Basisname -> {"source", "pages", "derivatives"}; fehlt der Index, ist er leer
+    path = out_dir / INDEX_NAME
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Index nicht lesbar, alle Booklets werden neu erstellt: {e}")
+        return {}
+    return data.get("booklets", {})
+
+def save_index(out_dir: Path, index: dict[str, dict]) -> None:
+    # Erst in temporäre Datei schreiben, dann atomar ersetzen
+    path = out_dir / INDEX_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({"version": 1, "booklets": index}, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp, path)
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            h.update(chunk)
+    return h.hexdigest()
+
+def booklet_fingerprint(images: list[Path], use_hash: bool = False, stats: list[os.stat_result] | None = None) -> list[list]:
+    # Geordnete Seitenliste: [Name, Größe, Änderungszeit(, SHA-256)] - neue, fehlende oder umsortierte Seiten ändern sie
+    # stats: bereits ermittelte stat-Ergebnisse der Seiten (z. B. aus largest_first), sonst ein stat pro Seite
+    pages = []
+    for p, st in zip(images, stats or map(Path.stat, images)):
+        page = [p.name, st.st_size, st.st_mtime_ns]
+        if use_hash:
+            page.append(file_hash(p))
+        pages.append(page)
+    return pages
+
+def same_pages(old: list[list], new: list[list]) -> bool:
+    # Gleiche Seiten in gleicher Reihenfolge; abweichende Änderungszeit zählt nicht, wenn beide Hashes gleich sind
+    if len(old) != len(new):
+        return False
+    for a, b in zip(old, new):
+        if a[:2] != b[:2]:
+            return False
+        if a[2] != b[2] and not (len(a) > 3 and len(b) > 3 and a[3] == b[3]):
+            return False
+    return True
+
+# --- Erstellung ---
+@dataclass
+class BuildConfig:
+    out_dir: Path
+    derivatives: bool = False
+    use_hash: bool = False
+    linearize: bool = False
+    index: dict[str, dict] = field(default_factory=dict)
+    seen: dict[str, Path] = field(default_factory=dict) # in diesem Lauf vergebene Namen -> Booklet-Ordner
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    pool: PagePool | None = None # Prozess-Pool für die Seiten großer Booklets
+    metrics: Metrics | None = None # Laufzeit-Messung pro Stufe und Booklet (None: aus)
+
+def build_pdf(folder: Path, images: list[Path], cfg: BuildConfig, stats: list[os.stat_result] | None = None) -> str:
+    # Erstellt PDF (und Ableitungen) nur, wenn sich die Seiten seit dem letzten Lauf geändert haben
+    # stats: stat-Ergebnisse der Seiten, falls schon ermittelt (siehe booklet_fingerprint)
+    # Rückgabe: "built" | "unchanged" | "adopted" | "duplicate" | "empty"
+    base_name = booklet_name(folder)
+    with cfg.lock:
+        owner = cfg.seen.setdefault(base_name, folder)
+        entry = cfg.index.get(base_name)
+    if owner != folder:
+        print(f"[WARNING] Überspringe {folder}: gleicher PDF-Name wie {owner}")
+        return "duplicate"
+
+    out_path = cfg.out_dir / f"{base_name}.pdf"
+    screen_path = cfg.out_dir / f"{base_name}_screen.pdf"
+    with timed(cfg.metrics, "fingerprint", folder) as span:
+        pages = booklet_fingerprint(images, use_hash=cfg.use_hash, stats=stats)
+        if cfg.use_hash:
+            span.read = sum(p[1] for p in pages)
+    status = "unchanged"
+
+    # PDF aus der Zeit vor dem Index: übernehmen, wenn es jünger ist als alle Seiten
+    if entry is None and out_path.exists() and out_path.stat().st_mtime_ns >= max(p[2] for p in pages):
+        entry = {"source": str(folder), "pages": pages, "derivatives": screen_path.exists()}
+        status = "adopted"
+
+    # Neu erstellen bei geänderten Seiten oder wenn ein linearisiertes PDF gewünscht, aber noch nicht vorhanden ist
+    if (entry is None or not out_path.exists() or not same_pages(entry["pages"], pages)
+            or (cfg.linearize and not entry.get("linearized"))):
+        with timed(cfg.metrics, "pdf-build", folder, read=sum(p[1] for p in pages)) as span:
+            written = write_pdf(out_path, iter_pages(images, passthrough_page, reencode_task, cfg.pool), cfg.linearize)
+            if written:
+                span.written = out_path.stat().st_size
+        if not written:
+            print(f"[WARNING] Keine gültigen Bilder in {folder}")
+            return "empty"
+        entry = {"source": str(folder), "pages": pages, "derivatives": False, "linearized": cfg.linearize}
+        status = "built"
+
+    if cfg.derivatives and not (entry.get("derivatives") and screen_path.exists()):
+        with timed(cfg.metrics, "derivatives", folder, read=sum(p[1] for p in pages)) as span:
+            build_derivatives(images, cfg.out_dir, base_name, cfg.pool, cfg.linearize)
+            span.written = screen_path.stat().st_size
+        entry["derivatives"] = True
+
+    with cfg.lock:
+        cfg.index[base_name] = entry
+    return status
+
+def build_derivatives(images: list[Path], out_dir: Path, base_name: str, pool: PagePool | None = None,
+                      linearized: bool = False):
+    # Bildschirm-PDF (<Name>_screen.pdf) und Vorschaubilder (<Name>_thumbs/001.jpg ...) aus einer Dekodierung pro Seite
+    screen_path = out_dir / f"{base_name}_screen.pdf"
+    thumbs_dir = out_dir / f"{base_name}_thumbs"
+
+    # Vorschaubilder erst in einen temporären Ordner, der am Ende den alten ersetzt
+    tmp_thumbs = thumbs_dir.with_name(f".{thumbs_dir.name}.part")
+    shutil.rmtree(tmp_thumbs, ignore_errors=True)
+    tmp_thumbs.mkdir()
+
+    try:
+        write_pdf(screen_path, iter_pages(images, None, partial(screen_task, tmp_thumbs), pool), linearized)
+    except BaseException:
+        shutil.rmtree(tmp_thumbs, ignore_errors=True)
+        raise
+    shutil.rmtree(thumbs_dir, ignore_errors=True)
+    os.replace(tmp_thumbs, thumbs_dir)
+
+def orphaned_pdfs(cfg: BuildConfig) -> list[str]:
+    # PDFs im Ausgabe-Ordner, zu denen in diesem Lauf kein Booklet-Ordner gefunden wurde
+    names = set(cfg.index)
+    names.update(p.stem for p in cfg.out_dir.glob("*.pdf") if not p.stem.endswith("_screen"))
+    return sorted(name for name in names if name not in cfg.seen)
+
+# --- Prüfmodus ---
+def check_pdfs(root: Path) -> int:
+    # Prüft alle PDFs unter root auf gültige Linearisierung; Rückgabe: Anzahl fehlerhafter PDFs
+    if linearize_backend() is None:
+        print("Prüfung benötigt pikepdf oder qpdf.", file=sys.stderr)
+        sys.exit(1)
+    pdfs = sorted(p for p in root.rglob("*.pdf") if not p.name.startswith("."))
+    bad = []
+    for pdf in tqdm(pdfs, desc="Prüfe PDFs"):
+        try:
+            ok, msg = check_linearized(pdf)
+        except Exception as e:
+            ok, msg = False, str(e)
+        if not ok:
+            bad.append((pdf, msg))
 
-    # PDF speichern
-    first, *rest = pil_images
-    first.save(out_path, save_all=True, append_images=rest)
+    print(f"\n{len(pdfs) - len(bad)} von {len(pdfs)} PDFs korrekt linearisiert.")
+    for pdf, msg in bad[:50]:
+        print(f"  - {pdf.relative_to(root)}: {msg.splitlines()[0] if msg else ''}")
+    if len(bad) > 50:
+        print(f"  ... und {len(bad)-50} weitere.")
+    return len(bad)
 
 # --- Main ---
 def main():
+    parser = argparse.ArgumentParser(description="Booklet-PDF Generator")
+    parser.add_argument("--check", type=Path, metavar="ORDNER",
+                        help="Nur prüfen: sind alle PDFs unter ORDNER korrekt linearisiert?")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(2 if check_pdfs(args.check) else 0)
+
     print("\n=== Booklet-PDF Generator ===")
 
     # Anzahl Threads automatisch bestimmen
@@ -176,29 +504,73 @@ def main():
     # Terminal/GUI Auswahl
     terminal = ask_terminal_mode()
 
+    # Bildschirm-PDF und Vorschaubilder
+    derivatives = ask_derivatives()
+
+    # Inhalts-Hash abfragen
+    use_hash = ask_content_hash()
+
+    # Linearisierung abfragen
+    linearized = ask_linearize()
+    if linearized and linearize_backend() is None:
+        print("Linearisierung benötigt pikepdf (pip install pikepdf) oder qpdf.", file=sys.stderr)
+        sys.exit(1)
+
     # Input & Output Ordner auswählen
     base = choose_directory("Basis-Ordner wählen (Input)", terminal)
     out_dir = choose_directory("Ziel-Ordner wählen (Output)", terminal)
 
-    # Alle Booklet-Folder finden
-    tasks = list(find_booklet_folders(base))
-    if not tasks:
-        print("Keine Booklet-Ordner mit JPEGs gefunden.", file=sys.stderr)
-        sys.exit(1)
+    # Index des letzten Laufs laden
+    cfg = BuildConfig(out_dir, derivatives=derivatives, use_hash=use_hash, linearize=linearized,
+                      index=load_index(out_dir), metrics=instrumentation.from_args("jpg2pdf", args))
+    print(f"Index: {len(cfg.index)} bekannte Booklets.")
+
+    # Booklet-Ordner suchen; liegt der Ausgabe-Ordner im Basis-Ordner, wird er nicht durchsucht
+    skip_dirs = (out_dir.name,) if base in out_dir.parents else ()
 
     errors = []
-    # Multithreading + Fortschrittsanzeige
-    with ThreadPoolExecutor(max_workers=workers) as ex:
-        futures = {
-            ex.submit(build_pdf, folder, images, out_dir): folder
-            for folder, images in tasks
-        }
-        for fut in tqdm(as_completed(futures), total=len(futures), desc="Erstelle PDFs"):
-            folder = futures[fut]
-            try:
-                fut.result()
-            except Exception as e:
-                errors.append((folder, str(e)))
+    counts = defaultdict(int)
+    # Threads pro Booklet (Lesen, PDF schreiben) + Prozess-Pool für die Seiten großer Booklets + Fortschrittsanzeige
+    with ProcessPoolExecutor(max_workers=workers) as procs, ThreadPoolExecutor(max_workers=workers) as ex, \
+            tqdm(total=0, desc="Erstelle PDFs") as bar:
+        cfg.pool = PagePool(procs, ByteBudget(PAGE_MEMORY_MB * 1024 * 1024 * workers))
+        futures = {}
+        # Einreichen während der Suche (je SORT_WINDOW Booklets größte zuerst): die ersten PDFs entstehen,
+        # während der Rest des Baums noch durchsucht wird; die Seitengrößen werden dabei nur einmal ermittelt
+        with timed(cfg.metrics, "discover", base):
+            for folder, images, stats in largest_first(find_booklet_folders(base, skip_dirs=skip_dirs)):
+                fut = ex.submit(build_pdf, folder, images, cfg, stats)
+                fut.add_done_callback(lambda _: bar.update(1))
+                futures[fut] = folder
+                bar.total += 1
+                bar.refresh()
+        if not futures:
+            print("Keine Booklet-Ordner mit JPEGs gefunden.", file=sys.stderr)
+            sys.exit(1)
+
+        try:
+            for fut in as_completed(futures):
+                folder = futures[fut]
+                try:
+                    counts[fut.result()] += 1
+                except Exception as e:
+                    errors.append((folder, str(e)))
+        finally:
+            # Index auch bei Abbruch sichern, damit fertige Booklets beim nächsten Lauf unverändert bleiben
+            with cfg.lock:
+                save_index(out_dir, cfg.index)
+
+    # Bericht
+    print(f"\nNeu erstellt: {counts['built']}, unverändert: {counts['unchanged']}, "
+          f"übernommen: {counts['adopted']}, doppelt benannt: {counts['duplicate']}, ohne Bilder: {counts['empty']}")
+    orphans = orphaned_pdfs(cfg)
+    if orphans:
+        print(f"\nVerwaiste PDFs (kein Booklet-Ordner unter {base} gefunden):")
+        for name in orphans[:50]:
+            print(f"  - {name}.pdf")
+        if len(orphans) > 50:
+            print(f"  ... und {len(orphans)-50} weitere.")
+    instrumentation.report(cfg.metrics, args)
 
     # Zusammenfassung
     if errors:
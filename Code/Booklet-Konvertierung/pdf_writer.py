@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Minimaler PDF-Writer für Booklets: bettet JPEG-Daten unverändert als DCTDecode-Bild ein
+# (keine Dekodierung, kein erneutes Kodieren, kein Qualitätsverlust).
+# Seiten werden einzeln in die Datei geschrieben; im Speicher liegt immer nur die aktuelle Seite.
+# Optional linearisiert ("Fast Web View") per pikepdf oder qpdf.
+
+# --- Imports ---
+import io, shutil, struct, subprocess
+from pathlib import Path
+
+try: # optional: Python-Bindung von qpdf; sonst das qpdf-Kommandozeilenprogramm
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+# --- JPEG-Header ---
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+COLORSPACES = {1: "DeviceGray", 3: "DeviceRGB"}
+
+def jpeg_info(data: bytes) -> tuple[int, int, int, int]:
+    # Liest nur die Marker bis zum SOF-Segment: (Breite, Höhe, Komponenten, SOF-Marker)
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("kein JPEG (SOI fehlt)")
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            raise ValueError(f"ungültiger Marker an Position {pos}")
+        marker = data[pos + 1]
+        if marker == 0xFF: # Füllbytes
+            pos += 1
+            continue
+        if marker in (0x01, *range(0xD0, 0xD8)): # Marker ohne Länge
+            pos += 2
+            continue
+        length = struct.unpack_from(">H", data, pos + 2)[0]
+        if marker in SOF_MARKERS:
+            bits, height, width, components = struct.unpack_from(">BHHB", data, pos + 4)
+            if bits != 8:
+                raise ValueError(f"{bits} Bit pro Komponente")
+            return width, height, components, marker
+        if marker == 0xDA: # Bilddaten ohne vorheriges SOF
+            break
+        pos += 2 + length
+    raise ValueError("kein SOF-Segment gefunden")
+
+def passthrough_info(data: bytes) -> tuple[int, int, str] | None:
+    # (Breite, Höhe, Farbraum), wenn das JPEG unverändert eingebettet werden kann; sonst None
+    # Nur Baseline/Extended (SOF0/SOF1) mit Graustufen oder RGB und vollständigem Dateiende (EOI)
+    try:
+        width, height, components, marker = jpeg_info(data)
+    except (ValueError, struct.error):
+        return None
+    if marker not in (0xC0, 0xC1) or components not in COLORSPACES or not width or not height:
+        return None # progressiv, CMYK, arithmetisch kodiert ...
+    if not data.rstrip(b"\0\r\n ").endswith(b"\xff\xd9"):
+        return None # abgeschnitten
+    return width, height, COLORSPACES[components]
+
+# --- PDF ---
+class PdfWriter:
+    # Objekt 1: Katalog, Objekt 2: Seitenbaum (beide erst am Ende geschrieben, wenn alle Seiten bekannt sind)
+    def __init__(self, path: Path):
+        self.f = open(path, "wb")
+        self.offsets = {}
+        self.next_id = 3
+        self.pages = []
+        self.f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.f.close()
+
+    def _begin(self, num: int | None = None) -> int:
+        if num is None:
+            num = self.next_id
+            self.next_id += 1
+        self.offsets[num] = self.f.tell()
+        self.f.write(f"{num} 0 obj\n".encode())
+        return num
+
+    def _object(self, body: str, num: int | None = None) -> int:
+        num = self._begin(num)
+        self.f.write(body.encode() + b"\nendobj\n")
+        return num
+
+    def _stream(self, entries: str, data: bytes) -> int:
+        num = self._begin()
+        self.f.write(f"<< {entries} /Length {len(data)} >>\nstream\n".encode())
+        self.f.write(data)
+        self.f.write(b"\nendstream\nendobj\n")
+        return num
+
+    def add_jpeg_page(self, data: bytes, width: int, height: int, colorspace: str,
+                      page_size: tuple[int, int] | None = None) -> None:
+        # Eine Seite in Bildgröße (1 Pixel = 1 pt, wie bisher mit Pillow) oder in page_size (pt), Bild seitenfüllend
+        page_w, page_h = page_size or (width, height)
+        image = self._stream(f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                             f"/ColorSpace /{colorspace} /BitsPerComponent 8 /Filter /DCTDecode", data)
+        content = self._stream("", f"q {page_w} 0 0 {page_h} 0 0 cm /Im0 Do Q".encode())
+        page = self._object(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_w} {page_h}] "
+                            f"/Resources << /XObject << /Im0 {image} 0 R >> >> /Contents {content} 0 R >>")
+        self.pages.append(page)
+
+    def close(self) -> None:
+        kids = " ".join(f"{p} 0 R" for p in self.pages)
+        self._object(f"<< /Type /Pages /Kids [{kids}] /Count {len(self.pages)} >>", num=2)
+        self._object("<< /Type /Catalog /Pages 2 0 R >>", num=1)
+
+        # Querverweistabelle
+        xref = self.f.tell()
+        count = self.next_id
+        lines = [f"xref\n0 {count}\n", "0000000000 65535 f \n"]
+        lines += [f"{self.offsets[n]:010d} 00000 n \n" for n in range(1, count)]
+        lines.append(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n")
+        self.f.write("".join(lines).encode())
+        self.f.close()
+
+# --- Linearisierung ---
+def linearize_backend() -> str | None:
+    # "pikepdf", "qpdf" oder None (keines verfügbar)
+    if pikepdf is not None:
+        return "pikepdf"
+    if shutil.which("qpdf"):
+        return "qpdf"
+    return None
+
+def linearize(src: Path, dst: Path) -> None:
+    # Schreibt src linearisiert nach dst: Hint-Tabellen und alle Objekte der ersten Seite am Dateianfang,
+    # damit der Browser Seite 1 per HTTP-Range-Request zeigen kann, während der Rest nachlädt
+    backend = linearize_backend()
+    if backend == "pikepdf":
+        with pikepdf.open(src) as pdf:
+            pdf.save(dst, linearize=True)
+    elif backend == "qpdf":
+        try:
+            subprocess.run(["qpdf", "--linearize", str(src), str(dst)], check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            if e.returncode != 3: # 3: nur Warnungen, Datei wurde geschrieben
+                raise RuntimeError(f"qpdf: {e.stderr.strip()}") from e
+    else:
+        raise RuntimeError("Linearisierung benötigt pikepdf oder qpdf")
+
+def check_linearized(path: Path) -> tuple[bool, str]:
+    # (ok, Meldung): linearisiert und Hint-Tabellen/Objektreihenfolge passen zum Inhalt
+    backend = linearize_backend()
+    if backend == "pikepdf":
+        with pikepdf.open(path) as pdf:
+            if not pdf.is_linearized:
+                return False, "nicht linearisiert"
+            report = io.StringIO()
+            ok = pdf.check_linearization(stream=report)
+            return ok, report.getvalue().strip() or "ok"
+    if backend == "qpdf":
+        res = subprocess.run(["qpdf", "--check-linearization", str(path)], capture_output=True, text=True)
+        msg = (res.stdout + res.stderr).strip()
+        if "not linearized" in msg:
+            return False, "nicht linearisiert"
+        return res.returncode == 0, msg or "ok"
+    raise RuntimeError("Prüfung benötigt pikepdf oder qpdf")
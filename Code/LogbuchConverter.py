@@ -1,109 +1,316 @@
-import re, unicodedata, pandas as pd
+import os, re, sqlite3, argparse, importlib.util, pandas as pd
+import normalization
+from normalization import match_key
 from tkinter import Tk, filedialog
 from pathlib import Path
 
 # --- Utilities ---
 
-def nfc(s: str) -> str:  # Unicode normalization
-    return unicodedata.normalize("NFC", s or "")
-
-def norm_name(s: str) -> str:  # Normalize person names
-    s = nfc(s)
-    s = s.replace("_", " ")
-    s = re.sub(r",\s*(\S)", r", \1", s)  # enforce space after comma
-    return s.strip()
-
-def norm_text(s: str) -> str:  # Normalize general text (titles, albums, etc.)
-    s = nfc(s)
-    # s = s.replace("_", " ")
-    # s = s.replace("--", "—")
-    s = re.sub(r"\b[oO][pP]\.?\s*", "op. ", s)
-    s = s.replace("Nº", "No")
-    s = re.sub(r"\b(?:no|nr)\.?\s*(\d+)(?=\D|$)", r"Nr. \1", s, flags=re.IGNORECASE)
-    return s.strip()
-
 def natural_sort_key(s: str):
     # Split string into numeric and non-numeric parts for natural sorting
     return [int(text) if text.isdigit() else text.lower() for text in re.split(r"(\d+)", s or "")]
 
-# --- Data parsing ---
+# --- Normalization (whole columns at once) ---
 
-def parse_column_b(value):
-    # Parse column B into Composer, Mediatitle, Interpreter(s)
-    if pd.isna(value):
-        return "", "", ""
+def norm_name_col(col: pd.Series) -> pd.Series:  # Normalize person names: NFC, "_" -> " ", space after comma
+    col = col.str.normalize("NFC").str.replace("_", " ", regex=False)
+    col = col.str.replace(r",\s*(\S)", r", \1", regex=True)
+    return col.str.strip()
 
-    # Split only on the FIRST dash (minus or en dash, spaces optional)
-    parts = re.split(r"\s*[-–]\s*", value, maxsplit=1)
+def norm_text_col(col: pd.Series) -> pd.Series:  # Normalize titles, albums, comments with the shared rules (normalization.py)
+    # Underscores stay as they are; only folder names (wav2flac, jpg2pdf) use them for spaces
+    col = col.str.normalize("NFC")
+    for pattern, repl in normalization.TEXT_RULES:
+        col = col.str.replace(pattern, repl, regex=True)
+    return col.str.strip()
 
-    composer = norm_name(parts[0]) if parts else ""
-    mediatitle, interpreters = "", ""
+def natural_sort_col(col: pd.Series) -> pd.Series:
+    # Precomputed sort key: rank of each distinct value under natural_sort_key (computed once per value)
+    ranks, rank, last = {}, -1, None
+    for value, key in sorted(((v, natural_sort_key(v)) for v in col.dropna().unique()), key=lambda vk: vk[1]):
+        if key != last:
+            rank, last = rank + 1, key
+        ranks[value] = rank
+    return col.map(ranks)
 
-    if len(parts) > 1:
-        rest = parts[1]
-        # Split at the *last* ". " to separate mediatitle from interpreters
-        if ". " in rest:
-            last_dot = rest.rfind(". ")
-            mediatitle = rest[:last_dot]
-            interpreters = rest[last_dot + 2 :]
-        else:
-            mediatitle = rest
+# --- Data parsing ---
 
-    return norm_name(composer), norm_text(mediatitle), norm_name(interpreters)
+def parse_column_b_col(col: pd.Series) -> tuple[pd.Series, pd.Series, pd.Series]:
+    # Parse column B into (Composer, Mediatitle, Interpreter)
+    values = col.astype(object).where(col.notna(), "").map(str)
 
-def convert_date(date_series):
+    # First dash (minus or en dash, spaces optional); without a dash everything is the composer
+    parts = values.str.extract(r"^(.*?)\s*[-–]\s*(.*)$", flags=re.DOTALL)
+    composer = parts[0].where(parts[0].notna(), values)
+    rest = parts[1].fillna("")
+
+    # Last ". " separates mediatitle from interpreters
+    split = rest.str.extract(r"^(.*)\. (.*)$", flags=re.DOTALL)
+    mediatitle = split[0].where(split[0].notna(), rest)
+    interpreters = split[1].fillna("")
+
+    return norm_name_col(composer), norm_text_col(mediatitle), norm_name_col(interpreters)
+
+def convert_date(date_series, start=None, fill=True):
     # Convert dd.mm.yy to yyyy-mm-dd, forward-fill missing values
-    def fix_date(d):
-        if pd.isna(d):
-            return pd.NaT
-        return pd.to_datetime(d, format="%d.%m.%y", errors="coerce")
-    converted = date_series.apply(fix_date)
-    return converted.ffill().dt.strftime("%Y-%m-%d")
-
-def load_and_transform(file_path):
-    df = pd.read_excel(file_path)
-
-    results = []
-    for _, row in df.iterrows():
-        cd_number = str(row.iloc[0]).strip()
-        composer, mediatitle, interpreters = parse_column_b(row.iloc[1])
-        comment = norm_text(str(row.iloc[4])) if len(row) > 4 else ""
-        date = row.iloc[5] if len(row) > 5 else None
-
-        results.append({
-            "CD Number": cd_number,
-            "Composer": composer,
-            "Mediatitle": mediatitle,
-            "Interpreter": interpreters,
-            "Place": "",
-            "Status": "",
-            "Date": date,
-            "Comment": comment
-        })
-
-    df_out = pd.DataFrame(results)
-    df_out["Date"] = convert_date(df_out["Date"])
+    # start: date to fill leading gaps with (last date of the previous chunk); fill=False: leave gaps empty
+    converted = pd.to_datetime(date_series, format="%d.%m.%y", errors="coerce")
+    if fill:
+        converted = converted.ffill()
+    if start is not None:
+        converted = converted.fillna(start)
+    return converted.dt.strftime("%Y-%m-%d")
+
+def to_str_col(col: pd.Series) -> pd.Series:  # str() of every cell, missing values become "nan"/"None" as with str()
+    return col.astype(object).map(str)
+
+def transform(df: pd.DataFrame, start_date=None, fill_dates=True) -> pd.DataFrame:
+    # Convert the raw logbook sheet (columns by position) into the output layout
+    index = pd.RangeIndex(len(df))
+    composer, mediatitle, interpreters = parse_column_b_col(df.iloc[:, 1].reset_index(drop=True))
+
+    df_out = pd.DataFrame({
+        "CD Number": to_str_col(df.iloc[:, 0].reset_index(drop=True)).str.strip(),
+        "Composer": composer,
+        "Mediatitle": mediatitle,
+        "Interpreter": interpreters,
+        "Place": "",
+        "Status": "",
+        "Date": df.iloc[:, 5].reset_index(drop=True) if df.shape[1] > 5 else pd.Series(None, index=index, dtype=object),
+        "Comment": norm_text_col(to_str_col(df.iloc[:, 4].reset_index(drop=True))) if df.shape[1] > 4 else "",
+    }, index=index)
+    df_out["Date"] = convert_date(df_out["Date"], start_date, fill=fill_dates)
     return df_out
 
+# --- Reading ---
+
+ENGINES = ("auto", "calamine", "openpyxl")
+
+def resolve_engine(engine: str) -> str:
+    # "auto": Rust-backed calamine if installed (pip install python-calamine), otherwise openpyxl
+    if engine == "auto":
+        return "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+    if engine == "calamine" and not importlib.util.find_spec("python_calamine"):
+        raise SystemExit("Engine 'calamine' requires python-calamine (pip install python-calamine).")
+    return engine
+
+def excel_cell(value):
+    # Same per-cell conversion as pd.read_excel: empty -> NaN, integral floats -> int
+    if value is None:
+        return float("nan")
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def iter_sheet_chunks(file_path, chunk_rows: int):
+    # Stream the first sheet with openpyxl in read-only mode, chunk_rows rows at a time
+    # Cells keep their own type (no column-wide upcast as in read_excel, e.g. CD numbers stay 12, not 12.0)
+    from openpyxl import load_workbook
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        chunk = []
+        for row in rows:
+            if any(cell is not None for cell in row):
+                chunk.append(tuple(excel_cell(c) for c in row))
+            if len(chunk) >= chunk_rows:
+                yield pd.DataFrame(chunk, columns=header, dtype=object)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header, dtype=object)
+    finally:
+        wb.close()
+
+def read_chunks(file_path, engine: str = "auto", chunk_rows: int = 0):
+    # chunk_rows > 0: stream the sheet in chunks (openpyxl read-only) to bound memory for very large logbooks
+    if chunk_rows <= 0 or Path(file_path).suffix.lower() != ".xlsx":
+        yield pd.read_excel(file_path, engine=resolve_engine(engine))
+    else:
+        yield from iter_sheet_chunks(file_path, chunk_rows)
+
+def load_and_transform(file_path, engine: str = "auto", chunk_rows: int = 0):
+    parts, start = [], None
+    for chunk in read_chunks(file_path, engine, chunk_rows):
+        part = transform(chunk, start)
+        dates = part["Date"].dropna()
+        if len(dates):
+            start = pd.Timestamp(dates.iloc[-1])  # forward-fill continues across chunk borders
+        parts.append(part)
+    if not parts:
+        return transform(pd.DataFrame(columns=range(6)))
+    return pd.concat(parts, ignore_index=True)
+
+# --- Incremental store ---
+
+STORE_CHUNK_ROWS = 5000  # chunk size for reading into the store (stable per-cell types -> stable row hashes)
+COLUMNS = ["CD Number", "Composer", "Mediatitle", "Interpreter", "Place", "Status", "Date", "Comment"]
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def open_store(path) -> sqlite3.Connection:
+    # One row per logbook row: position in the sheet, hash of the raw cells, converted values
+    # "Date" holds the row's own date (or NULL); the forward-fill runs at materialization
+    # user_version records the normalization rules the rows were converted with; other rules -> convert all rows again
+    con = sqlite3.connect(path)
+    columns = ", ".join(f"{quote(c)} TEXT" for c in COLUMNS)
+    con.execute(f"CREATE TABLE IF NOT EXISTS rows (row INTEGER PRIMARY KEY, hash INTEGER NOT NULL, {columns})")
+    if con.execute("PRAGMA user_version").fetchone()[0] != normalization.RULES_VERSION:
+        con.execute("DELETE FROM rows")
+        con.execute(f"PRAGMA user_version = {normalization.RULES_VERSION}")
+        con.commit()
+    return con
+
+def update_store(con: sqlite3.Connection, file_path, engine: str = "auto", chunk_rows: int = 0) -> tuple[int, int, int]:
+    # Transform only new or edited rows; returns (new, edited, removed)
+    known = dict(con.execute("SELECT row, hash FROM rows"))
+    columns = ", ".join(quote(c) for c in ["row", "hash", *COLUMNS])
+    insert = f"INSERT OR REPLACE INTO rows ({columns}) VALUES ({', '.join('?' * (len(COLUMNS) + 2))})"
+
+    offset = added = edited = 0
+    for chunk in read_chunks(file_path, engine, chunk_rows or STORE_CHUNK_ROWS):
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy().view("int64")
+        todo = [i for i, h in enumerate(hashes) if known.get(offset + i) != h]
+        if todo:
+            part = transform(chunk.iloc[todo], fill_dates=False).astype(object)
+            part = part.where(part.notna(), None)
+            rows = [offset + i for i in todo]
+            con.executemany(insert, zip(rows, (int(hashes[i]) for i in todo), *(part[c] for c in COLUMNS)))
+            new = sum(row not in known for row in rows)
+            added += new
+            edited += len(todo) - new
+        offset += len(chunk)
+
+    # Rows deleted at the end of the sheet (deletions in the middle shift the following rows -> edited)
+    removed = con.execute("DELETE FROM rows WHERE row >= ?", (offset,)).rowcount
+    con.commit()
+    return added, edited, removed
+
+def materialize(con: sqlite3.Connection) -> pd.DataFrame:
+    # Converted logbook in sheet order; the date forward-fill runs over all rows, so increments stay correct
+    columns = ", ".join(quote(c) for c in COLUMNS)
+    df = pd.read_sql_query(f"SELECT {columns} FROM rows ORDER BY row", con)
+    df["Date"] = df["Date"].ffill()
+    return df
+
+# --- Catalog for wav2flac ---
+
+def write_catalog(df: pd.DataFrame, path: Path) -> Path:
+    # Indexed lookup table for wav2flac, keyed by CD number and by normalized composer/media title
+    # Rows keep the order of df (natural CD number order), so box sets with one row per CD can be matched by disc
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    catalog = pd.DataFrame({
+        "pos": range(len(df)),
+        "cd_number": df["CD Number"].to_numpy(),
+        "composer": df["Composer"].to_numpy(),
+        "mediatitle": df["Mediatitle"].to_numpy(),
+        "interpreter": df["Interpreter"].to_numpy(),
+        "date": df["Date"].to_numpy(),
+        "comment": df["Comment"].where(df["Comment"] != "nan", "").to_numpy(),  # str(NaN) from empty cells
+        "composer_key": df["Composer"].map(match_key).to_numpy(),
+        "title_key": df["Mediatitle"].map(match_key).to_numpy(),
+    })
+    con = sqlite3.connect(tmp)
+    try:
+        catalog.to_sql("catalog", con, index=False)
+        con.execute("CREATE INDEX catalog_cd ON catalog (cd_number)")
+        con.execute("CREATE INDEX catalog_match ON catalog (composer_key, title_key)")
+        con.execute("CREATE INDEX catalog_title ON catalog (title_key)")
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp, path)  # wav2flac never sees a half-written catalog
+    return path
+
+# --- Writing ---
+
+FORMATS = ("xlsx", "csv", "parquet", "sqlite")
+SQLITE_TABLE = "logbook"
+
+def write_output(df: pd.DataFrame, base: Path, fmt: str) -> Path:
+    # Write the converted logbook as <base>.<fmt>
+    path = base.with_suffix(f".{fmt}")
+    if fmt == "xlsx":
+        # xlsxwriter is several times faster than openpyxl for writing, if installed
+        engine = "xlsxwriter" if importlib.util.find_spec("xlsxwriter") else None
+        df.to_excel(path, index=False, engine=engine)
+    elif fmt == "csv":
+        df.to_csv(path, index=False, encoding="utf-8")
+    elif fmt == "parquet":
+        if not (importlib.util.find_spec("pyarrow") or importlib.util.find_spec("fastparquet")):
+            raise SystemExit("Parquet output requires pyarrow (pip install pyarrow).")
+        df.to_parquet(path, index=False)
+    elif fmt == "sqlite":
+        con = sqlite3.connect(path)
+        try:
+            df.to_sql(SQLITE_TABLE, con, if_exists="replace", index=False)
+        finally:
+            con.close()
+    else:
+        raise ValueError(f"Unknown output format: {fmt}")
+    return path
+
 # --- Main script ---
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert the digitization logbook (without --input: file dialog)")
+    parser.add_argument("--input", type=Path, help="Logbook spreadsheet (.xlsx, .xls, .ods)")
+    parser.add_argument("--engine", choices=ENGINES, default="auto",
+                        help="Spreadsheet reader: calamine (fast, needs python-calamine) or openpyxl; auto picks calamine if installed")
+    parser.add_argument("--chunk-rows", type=int, default=0, metavar="N",
+                        help="Stream .xlsx input in chunks of N rows (bounded memory for very large sheets)")
+    parser.add_argument("--format", dest="formats", nargs="+", choices=FORMATS,
+                        help="Output format(s), written next to the input as converted_output.<format> "
+                             "(default: xlsx; with --store: none)")
+    parser.add_argument("--catalog", type=Path, metavar="FILE",
+                        help="Also write the SQLite catalog used by wav2flac --catalog")
+    parser.add_argument("--store", type=Path, metavar="FILE",
+                        help="Incremental mode: keep converted rows in this SQLite file and transform only new or edited rows")
+    return parser.parse_args()
+
 def main():
-    Tk().withdraw()  # Hide root window
-    file = filedialog.askopenfilename(
-        title="Select your Excel file", filetypes=[("Excel files", "*.xlsx *.xls *.ods")]
-    )
-    if not file:
-        print("No file selected.")
-        return
+    args = parse_args()
+    file = args.input
+    if file is None:
+        Tk().withdraw()  # Hide root window
+        file = filedialog.askopenfilename(
+            title="Select your Excel file", filetypes=[("Excel files", "*.xlsx *.xls *.ods")]
+        )
+        if not file:
+            print("No file selected.")
+            return
 
-    df = load_and_transform(file)
+    if args.store:
+        # Incremental: update the store, export only on request
+        con = open_store(args.store)
+        try:
+            added, edited, removed = update_store(con, file, engine=args.engine, chunk_rows=args.chunk_rows)
+            print(f"Store {args.store}: {added} new, {edited} edited, {removed} removed rows")
+            if not args.formats and not args.catalog:
+                return
+            df = materialize(con)
+        finally:
+            con.close()
+    else:
+        df = load_and_transform(file, engine=args.engine, chunk_rows=args.chunk_rows)
 
     # Natural sort by CD Number
-    df = df.sort_values(by="CD Number", key=lambda col: col.map(natural_sort_key))
+    df = df.sort_values(by="CD Number", key=natural_sort_col, kind="stable")
+
+    if args.catalog:
+        print(f"Catalog saved as {write_catalog(df, args.catalog)}")
+        if args.store and not args.formats:
+            return
 
-    output_path = Path(file).with_name("converted_output.xlsx")
-    df.to_excel(output_path, index=False)
-    print(f"Converted file saved as {output_path}")
+    base = Path(file).with_name("converted_output")
+    for fmt in dict.fromkeys(args.formats or ["xlsx"]):
+        output_path = write_output(df, base, fmt)
+        print(f"Converted file saved as {output_path}")
 
 if __name__ == "__main__":
     main()
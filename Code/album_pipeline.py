@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Gemeinsamer Lauf von wav2flac und jpg2pdf: ein Scan des Archivs, ein Auftrag pro Album
+# Beim Durchlaufen des Archivs (wav2flac.iter_containers) werden die booklet-Ordner mit erfasst. Pro Album
+# (Medienordner bzw. Box) entsteht zuerst das Booklet-PDF, danach werden die Tracks eingereicht; so ist das PDF
+# vorhanden, sobald eine FLAC mit seiner URL erscheint. Die URL selbst folgt derselben Regel wie in wav2flac
+# (wav2flac.has_booklet: booklet-Ordner mit Seiten), damit Einzel- und gemeinsame Läufe dieselben Tags schreiben.
+# PDF-Erstellung, Cover und FLAC-Kodierung laufen im selben Stufen-Scheduler, Manifest und Index bleiben
+# dieselben wie bei den Einzelwerkzeugen (spätere Einzelläufe setzen nahtlos fort).
+#
+# Aufruf:
+#   python3 album_pipeline.py --input /Volumes/Archiv/2025-09-15 --output /Volumes/FLAC-Ausgabe
+#   FLACs:    <output>/<Eingabename>/…           (wie wav2flac)
+#   Booklets: <output>/booklets/<Name>.pdf       (änderbar mit --booklets)
+
+# --- Imports ---
+import os, sys, queue, argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from tqdm import tqdm
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE / "Audio-Konvertierung"))
+sys.path.insert(0, str(HERE / "Booklet-Konvertierung"))
+
+import wav2flac, jpg2pdf, instrumentation
+from scheduler import Stage, ByteBudget
+from catalog import Catalog
+
+# --- Album-Aufträge ---
+BOOKLET_WORKERS = 2 # Threads der Booklet-Stufe (die Seiten großer Booklets laufen zusätzlich im Prozess-Pool)
+
+@dataclass
+class AlbumJob:
+    owner: Path                   # Medienordner (Einzel-CD) bzw. Box-Ordner, enthält den booklet-Ordner
+    folder: Path                  # booklet-Ordner
+    images: list[Path]
+    size: int = 0                 # Summe der Seitengrößen (Reihenfolge: größte zuerst)
+    stats: list | None = None     # stat-Ergebnisse der Seiten (für den Fingerprint in build_pdf wiederverwendet)
+    device: int = 0
+    status: str = ""              # Ergebnis von jpg2pdf.build_pdf
+    error: str | None = None
+    waiting: list[list[Path]] = field(default_factory=list) # Container, deren Tracks auf das PDF warten
+
+def booklet_stage(job: AlbumJob, bcfg: jpg2pdf.BuildConfig) -> None:
+    job.status = jpg2pdf.build_pdf(job.folder, job.images, bcfg, job.stats) if job.images else "empty"
+    return None
+
+def album_job(owner: Path, folder: Path) -> AlbumJob:
+    images = jpg2pdf.booklet_images(folder)
+    stats = jpg2pdf.page_stats(images)
+    return AlbumJob(owner, folder, images, size=sum(st.st_size for st in stats or ()), stats=stats)
+
+# --- Lauf ---
+def run(cfg: wav2flac.RunConfig, bcfg: jpg2pdf.BuildConfig, encode_workers: int, bar=None):
+    # Rückgabe: (Tracks pro Status, Booklets pro Status, Fehlerliste, Anzahl Tracks)
+    track_counts, booklet_counts = defaultdict(int), defaultdict(int)
+    errors = []
+    done = queue.SimpleQueue()
+    found: dict[Path, Path] = {}       # Ordner -> booklet-Ordner (aus dem Scan)
+    albums: dict[Path, AlbumJob] = {}  # Eigentümer -> Album-Auftrag (PDF in Arbeit oder fertig)
+    open_albums = submitted = finished = 0
+
+    scheduler = wav2flac.build_scheduler(cfg, encode_workers, on_done=done.put,
+                                         extra=(Stage("booklet", lambda job: booklet_stage(job, bcfg), BOOKLET_WORKERS),))
+
+    def release(job: AlbumJob) -> None:
+        # PDF fertig: wartende Container einreichen
+        for wavs in job.waiting:
+            wav2flac.submit_container(scheduler, wavs)
+        job.waiting = None
+
+    def collect(job) -> None:
+        nonlocal open_albums, finished
+        if isinstance(job, AlbumJob):
+            open_albums -= 1
+            if job.error:
+                job.status = "failed"
+                errors.append((job.folder, job.error))
+            booklet_counts[job.status] += 1
+            release(job)
+            return
+        if job.error:
+            job.status = "failed"
+            wav2flac.discard_output(job)
+            errors.append((job.wav, job.error))
+        track_counts[job.status] += 1
+        finished += 1
+        if bar is not None:
+            bar.update(1)
+
+    def start_album(owner: Path, folder: Path) -> AlbumJob:
+        nonlocal open_albums
+        job = albums[owner] = album_job(owner, folder)
+        open_albums += 1
+        scheduler.submit(job, "booklet")
+        return job
+
+    try:
+        for container, wavs in wav2flac.iter_containers(cfg.in_root, booklets=found, metrics=cfg.metrics):
+            submitted += len(wavs)
+            owner = wav2flac.cover_container(wavs[0]) # Einzel-CD: Medienordner, Box: Box-Ordner (wie das Cover)
+            job = None
+            if owner is not None and (owner in albums or owner in found):
+                job = albums.get(owner) or start_album(owner, found[owner])
+            if job is not None and job.waiting is not None:
+                job.waiting.append(wavs) # Tracks erst nach dem PDF einreichen
+            else:
+                wav2flac.submit_container(scheduler, wavs)
+            if bar is not None:
+                bar.total = submitted
+                bar.refresh()
+
+            while not done.empty():
+                collect(done.get())
+
+        # booklet-Ordner ohne WAVs (z. B. Alben, deren Audio schon konvertiert und archiviert ist)
+        for owner, folder in found.items():
+            if owner not in albums:
+                start_album(owner, folder)
+
+        while finished < submitted or open_albums:
+            collect(done.get())
+    finally:
+        scheduler.close()
+    return track_counts, booklet_counts, errors, submitted
+
+# --- Argumente ---
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="WAV → FLAC und Booklet → PDF in einem Lauf (ein Auftrag pro Album)")
+    parser.add_argument("--input", type=Path, required=True, help="Eingabe-Ordner (Archiv mit WAVs und booklet-Ordnern)")
+    parser.add_argument("--output", type=Path, required=True, help="Ausgabe-Ordner (FLACs in <output>/<Eingabename>)")
+    parser.add_argument("--booklets", type=Path, help="Ausgabe-Ordner der PDFs (Standard: <output>/booklets)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Kodier-Threads und Seiten-Prozesse")
+    parser.add_argument("--encoder", choices=list(wav2flac.ENCODERS), default="ffmpeg", help="Encoder-Backend")
+    parser.add_argument("--hash", action="store_true", help="Inhalts-Hash bei geänderter Änderungszeit prüfen (WAVs und Seiten)")
+    parser.add_argument("--derivatives", action="store_true", help="Zusätzlich Bildschirm-PDF und Vorschaubilder")
+    parser.add_argument("--linearize", action="store_true", help="PDFs linearisieren (pikepdf oder qpdf)")
+    parser.add_argument("--catalog", type=Path, help="Logbuch-Katalog (LogbuchConverter.py --catalog)")
+    parser.add_argument("--resume", action="store_true", help="Abgebrochenen Lauf fortsetzen (sonst wird das Journal verworfen)")
+    instrumentation.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if not args.input.is_dir():
+        parser.error(f"Eingabe-Ordner nicht gefunden: {args.input}")
+    if not wav2flac.encoder_available(args.encoder):
+        parser.error(f"Encoder '{args.encoder}' ist nicht verfügbar")
+    if args.linearize and jpg2pdf.linearize_backend() is None:
+        parser.error("Linearisierung benötigt pikepdf (pip install pikepdf) oder qpdf")
+    if args.catalog and not args.catalog.expanduser().exists():
+        parser.error(f"Katalog nicht gefunden: {args.catalog}")
+    return args
+
+# --- Main ---
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    input_root = args.input
+    output_root = args.output / input_root.name
+    booklet_dir = args.booklets or args.output / "booklets"
+    output_root.mkdir(parents=True, exist_ok=True)
+    booklet_dir.mkdir(parents=True, exist_ok=True)
+    print(f"FLACs: {output_root}\nBooklets: {booklet_dir}")
+
+    # Manifest und Journal wie in wav2flac, Index wie in jpg2pdf
+    manifest = wav2flac.load_manifest(output_root)
+    metrics = instrumentation.from_args("album_pipeline", args) # gemeinsam für Tracks und Booklets
+    if wav2flac.journal_files(output_root):
+        if args.resume:
+            print(f"Journal: {wav2flac.replay_journals(output_root, manifest)} fertige Tracks übernommen.")
+        else:
+            wav2flac.clear_journals(output_root)
+        wav2flac.clean_temp_files(output_root)
+    cfg = wav2flac.RunConfig(input_root, output_root, manifest, use_hash=args.hash, encoder=args.encoder,
+                             budget=ByteBudget(wav2flac.BUFFER_BYTES), verify=True,
+                             journal=wav2flac.open_journal(output_root, keep=args.resume),
+                             catalog=Catalog(args.catalog.expanduser()) if args.catalog else None, metrics=metrics)
+    bcfg = jpg2pdf.BuildConfig(booklet_dir, derivatives=args.derivatives, use_hash=args.hash,
+                               linearize=args.linearize, index=jpg2pdf.load_index(booklet_dir), metrics=metrics)
+    print(f"Manifest: {len(manifest)} bekannte Dateien, Index: {len(bcfg.index)} bekannte Booklets.")
+
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as procs, tqdm(total=0, desc="Tracks") as bar:
+            bcfg.pool = jpg2pdf.PagePool(procs, ByteBudget(jpg2pdf.PAGE_MEMORY_MB * 1024 * 1024 * args.workers))
+            tracks, booklets, errors, submitted = run(cfg, bcfg, args.workers, bar=bar)
+    finally:
+        # Manifest und Index auch bei Abbruch sichern
+        cfg.journal.close()
+        if manifest:
+            wav2flac.save_manifest(output_root, manifest)
+        wav2flac.clear_journals(output_root)
+        with bcfg.lock:
+            jpg2pdf.save_index(booklet_dir, bcfg.index)
+
+    print(f"\nTracks – konvertiert: {tracks['converted']}, neu getaggt: {tracks['retagged']}, "
+          f"unverändert: {tracks['unchanged']}, fehlgeschlagen: {tracks['failed']}")
+    print(f"Booklets – neu erstellt: {booklets['built']}, unverändert: {booklets['unchanged']}, "
+          f"übernommen: {booklets['adopted']}, doppelt benannt: {booklets['duplicate']}, "
+          f"ohne Bilder: {booklets['empty']}, fehlgeschlagen: {booklets['failed']}")
+    if cfg.catalog is not None:
+        wav2flac.print_unmatched(cfg.catalog, input_root)
+        cfg.catalog.close()
+    instrumentation.report(metrics, args)
+    if not submitted and not sum(booklets.values()):
+        print("Keine WAV-Dateien oder Booklets gefunden.", file=sys.stderr)
+        return 1
+
+    if errors:
+        print("\nFertig - mit Warnungen/Fehlern:")
+        for path, err in errors[:100]:
+            print(f"  - {path}: {err}")
+        if len(errors) > 100:
+            print(f"  ... und {len(errors)-100} weitere.")
+        return 2
+    print("\nFertig - alles ok.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
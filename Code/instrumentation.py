@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Laufzeit-Messung pro Stufe und Datei für wav2flac, jpg2pdf und album_pipeline
+# Jede Messung (Span) hält Wand- und CPU-Zeit des ausführenden Threads sowie gelesene und geschriebene Bytes fest.
+# Bytes nur in Spans mit echtem Plattenzugriff angeben, jede Datei einmal: die Summen über alle Stufen ergeben
+# dann das Datenvolumen des Laufs (Zusammenfassung, Prometheus).
+# Ausgaben: JSON-Lines-Ereignisprotokoll (eine Zeile pro Span), Zusammenfassung am Laufende (Perzentile,
+# langsamste Elemente) und optional eine Prometheus-Textdatei für den node_exporter (textfile collector).
+# Einbinden aus einem Unterordner von Code/ (wie normalization.py):
+#   metrics = instrumentation.from_args("wav2flac", args)       # None: Messung aus
+#   with instrumentation.timed(metrics, "encode", wav, read=size) as span:
+#       ...
+#       span.written = out.stat().st_size
+#   instrumentation.report(metrics, args)
+
+# --- Imports ---
+import os, sys, json, time, threading, argparse
+from contextlib import contextmanager, nullcontext
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+try: # Nur Unix: CPU-Zeit der Kindprozesse (ffmpeg, qpdf, Prozess-Pool)
+    import resource
+except ImportError:
+    resource = None
+
+# --- Messung ---
+SLOWEST = 10                 # langsamste Elemente in der Zusammenfassung
+QUANTILES = (0.5, 0.9, 0.99) # Perzentile der Wandzeit pro Element
+METRIC_PREFIX = "hfm_convert" # Präfix der Prometheus-Metriken (Label tool unterscheidet die Werkzeuge)
+
+@dataclass
+class Span:
+    stage: str
+    item: str
+    read: int = 0        # gelesene Bytes
+    written: int = 0     # geschriebene Bytes
+    wall: float = 0.0    # Sekunden
+    cpu: float = 0.0     # CPU-Sekunden des Threads (ohne Kindprozesse)
+    error: str | None = None
+
+def child_cpu() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class Metrics:
+    # Sammelt Spans aus allen Worker-Threads; events: Pfad des JSON-Lines-Protokolls (None: keins)
+    def __init__(self, tool: str, events: Path | None = None):
+        self.tool = tool
+        self.spans: dict[str, list[tuple[float, float, int, int, str]]] = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.started = time.time()
+        self._perf = time.perf_counter()
+        self._child_cpu = child_cpu()
+        self._lock = threading.Lock()
+        self._log = None
+        if events is not None:
+            events.parent.mkdir(parents=True, exist_ok=True)
+            self._log = open(events, "a", encoding="utf-8", buffering=1) # zeilengepuffert: Protokoll bleibt bei Abbruch lesbar
+
+    @contextmanager
+    def span(self, stage: str, item, read: int = 0):
+        rec = Span(stage, str(item), read=read)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield rec
+        except BaseException as e:
+            rec.error = type(e).__name__
+            raise
+        finally:
+            rec.wall = time.perf_counter() - wall
+            rec.cpu = time.thread_time() - cpu
+            self.add(rec)
+
+    def add(self, rec: Span) -> None:
+        with self._lock:
+            self.spans[rec.stage].append((rec.wall, rec.cpu, rec.read, rec.written, rec.item))
+            if rec.error:
+                self.errors[rec.stage] += 1
+            if self._log is not None:
+                event = {"ts": round(time.time(), 3), "tool": self.tool, "stage": rec.stage, "item": rec.item,
+                         "wall": round(rec.wall, 6), "cpu": round(rec.cpu, 6), "read": rec.read, "written": rec.written}
+                if rec.error:
+                    event["error"] = rec.error
+                self._log.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._perf
+
+    def child_cpu(self) -> float:
+        return child_cpu() - self._child_cpu
+
+    def close(self) -> None:
+        # Abschlusszeile mit den Gesamtwerten des Laufs
+        with self._lock:
+            if self._log is None:
+                return
+            self._log.write(json.dumps({"ts": round(time.time(), 3), "tool": self.tool, "stage": "run",
+                                        "wall": round(self.elapsed(), 6), "child_cpu": round(self.child_cpu(), 6),
+                                        "stages": {stage: len(rows) for stage, rows in self.spans.items()}}) + "\n")
+            self._log.close()
+            self._log = None
+
+def timed(metrics: Metrics | None, stage: str, item, read: int = 0):
+    # Span messen, ohne Metrics nur ein Platzhalter (Aufrufer können written trotzdem setzen)
+    if metrics is None:
+        return nullcontext(Span(stage, ""))
+    return metrics.span(stage, item, read)
+
+# --- Auswertung ---
+def percentile(values: list[float], q: float) -> float:
+    # Nächster Rang auf sortierten Werten
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(q * len(values) + 0.5) - 1))]
+
+def stage_stats(metrics: Metrics) -> dict[str, dict]:
+    stats = {}
+    with metrics._lock:
+        rows = {stage: list(r) for stage, r in metrics.spans.items()}
+    for stage, r in rows.items():
+        walls = sorted(row[0] for row in r)
+        stats[stage] = {
+            "count": len(r),
+            "wall": sum(walls),
+            "cpu": sum(row[1] for row in r),
+            "read": sum(row[2] for row in r),
+            "written": sum(row[3] for row in r),
+            "errors": metrics.errors.get(stage, 0),
+            "quantiles": {q: percentile(walls, q) for q in QUANTILES},
+            "max": walls[-1] if walls else 0.0,
+        }
+    return stats
+
+def slowest(metrics: Metrics, n: int = SLOWEST) -> list[tuple[float, str, str]]:
+    with metrics._lock:
+        rows = [(row[0], stage, row[4]) for stage, r in metrics.spans.items() for row in r]
+    rows.sort(reverse=True)
+    return rows[:n]
+
+def summary(metrics: Metrics, n: int = SLOWEST) -> str:
+    stats = stage_stats(metrics)
+    elapsed = metrics.elapsed()
+    lines = [f"\n=== Laufzeiten pro Stufe ({metrics.tool}) ===",
+             f"{'Stufe':<12} {'Anzahl':>7} {'Wand [s]':>9} {'CPU [s]':>8} "
+             + " ".join(f"{'p' + format(q * 100, 'g') + ' [ms]':>9}" for q in QUANTILES)
+             + f" {'max [ms]':>9} {'gelesen [MB]':>13} {'geschr. [MB]':>13} {'Fehler':>6}"]
+    for stage, s in stats.items():
+        lines.append(f"{stage:<12} {s['count']:>7} {s['wall']:>9.2f} {s['cpu']:>8.2f} "
+                     + " ".join(f"{s['quantiles'][q] * 1e3:>9.1f}" for q in QUANTILES)
+                     + f" {s['max'] * 1e3:>9.1f} {s['read'] / 1e6:>13.1f} {s['written'] / 1e6:>13.1f} {s['errors']:>6}")
+    read = sum(s["read"] for s in stats.values())
+    written = sum(s["written"] for s in stats.values())
+    lines.append(f"Gesamt: {elapsed:.2f} s, gelesen {read / 1e6:.1f} MB ({read / 1e6 / elapsed if elapsed else 0:.1f} MB/s), "
+                 f"geschrieben {written / 1e6:.1f} MB; CPU der Kindprozesse (ffmpeg, qpdf, Prozess-Pool): {metrics.child_cpu():.2f} s")
+    rows = slowest(metrics, n)
+    if rows:
+        lines.append(f"Langsamste {len(rows)}:")
+        lines.extend(f"  {wall * 1e3:>9.1f} ms  {stage:<12} {item}" for wall, stage, item in rows)
+    return "\n".join(lines)
+
+# --- Prometheus ---
+def prometheus_text(metrics: Metrics) -> str:
+    # Textformat für den node_exporter (textfile collector); alle Werte beziehen sich auf den letzten Lauf
+    stats = stage_stats(metrics)
+    p, tool = METRIC_PREFIX, metrics.tool
+    out = [f"# HELP {p}_stage_seconds Wandzeit pro Element und Stufe im letzten Lauf",
+           f"# TYPE {p}_stage_seconds summary"]
+    for stage, s in stats.items():
+        labels = f'tool="{tool}",stage="{stage}"'
+        out.extend(f'{p}_stage_seconds{{{labels},quantile="{q:g}"}} {s["quantiles"][q]:.6f}' for q in QUANTILES)
+        out.append(f"{p}_stage_seconds_sum{{{labels}}} {s['wall']:.6f}")
+        out.append(f"{p}_stage_seconds_count{{{labels}}} {s['count']}")
+    gauges = (("stage_cpu_seconds", "CPU-Zeit pro Stufe (Threads, ohne Kindprozesse)", "cpu", "{:.6f}"),
+              ("stage_read_bytes", "Gelesene Bytes pro Stufe", "read", "{}"),
+              ("stage_written_bytes", "Geschriebene Bytes pro Stufe", "written", "{}"),
+              ("stage_errors", "Fehlgeschlagene Elemente pro Stufe", "errors", "{}"))
+    for name, help_text, key, fmt in gauges:
+        out.append(f"# HELP {p}_{name} {help_text} im letzten Lauf")
+        out.append(f"# TYPE {p}_{name} gauge")
+        out.extend(f'{p}_{name}{{tool="{tool}",stage="{stage}"}} {fmt.format(s[key])}' for stage, s in stats.items())
+    for name, help_text, value in (("run_seconds", "Dauer des letzten Laufs", f"{metrics.elapsed():.3f}"),
+                                   ("run_child_cpu_seconds", "CPU-Zeit der Kindprozesse im letzten Lauf", f"{metrics.child_cpu():.3f}"),
+                                   ("run_timestamp_seconds", "Startzeit des letzten Laufs (Unix-Zeit)", f"{metrics.started:.0f}")):
+        out.extend([f"# HELP {p}_{name} {help_text}", f"# TYPE {p}_{name} gauge", f'{p}_{name}{{tool="{tool}"}} {value}'])
+    return "\n".join(out) + "\n"
+
+def write_prometheus(metrics: Metrics, path: Path) -> None:
+    # Atomar ersetzen, damit der node_exporter nie eine halbe Datei liest
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(prometheus_text(metrics), encoding="utf-8")
+    os.replace(tmp, path)
+
+# --- Kommandozeile ---
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("Laufzeit-Messung")
+    group.add_argument("--stats", action="store_true", help="Zusammenfassung pro Stufe am Ende ausgeben (Perzentile, langsamste Elemente)")
+    group.add_argument("--stats-log", type=Path, metavar="DATEI", help="Ereignisprotokoll (JSON Lines, eine Zeile pro Stufe und Datei)")
+    group.add_argument("--prometheus", type=Path, metavar="DATEI", help="Kennzahlen als Prometheus-Textdatei (node_exporter textfile collector)")
+    group.add_argument("--slowest", type=int, default=SLOWEST, metavar="N", help=f"Anzahl der langsamsten Elemente in der Zusammenfassung (Standard: {SLOWEST})")
+
+def from_args(tool: str, args: argparse.Namespace) -> Metrics | None:
+    # Messung nur, wenn eine der Ausgaben gewünscht ist
+    if not (args.stats or args.stats_log or args.prometheus):
+        return None
+    return Metrics(tool, events=args.stats_log.expanduser() if args.stats_log else None)
+
+def report(metrics: Metrics | None, args: argparse.Namespace) -> None:
+    if metrics is None:
+        return
+    metrics.close()
+    if args.stats:
+        print(summary(metrics, args.slowest))
+    if args.prometheus:
+        try:
+            write_prometheus(metrics, args.prometheus.expanduser())
+        except OSError as e:
+            print(f"[WARNING] Prometheus-Datei nicht geschrieben: {args.prometheus} ({e})", file=sys.stderr)
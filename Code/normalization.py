@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Gemeinsame Normalisierung von Namen und Titeln für wav2flac, jpg2pdf und LogbuchConverter
+# Alle drei Werkzeuge müssen gleich normalisieren: die Booklet-URL in den FLAC-Tags (wav2flac) muss den
+# PDF-Dateinamen (jpg2pdf) treffen, die Katalog-Schlüssel (LogbuchConverter) die Ordnernamen (wav2flac).
+# Einbinden aus einem Unterordner von Code/:
+#   sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+#   from normalization import nfc, norm_text, smart_titlecase
+# Micro-Benchmark: python3 normalization.py [ORDNER]   (ohne Ordner mit eingebauten Beispielnamen)
+# Golden-Test: tests/test_normalization.py (schlägt fehl, wenn sich Ergebnisse ohne neue RULES_VERSION ändern)
+
+# --- Imports ---
+import os, re, sys, time, argparse, unicodedata
+from functools import lru_cache
+from pathlib import Path
+
+# --- Muster ---
+CACHE_SIZE = 1 << 16  # Einträge pro Funktion; derselbe Ordnername wird für jede Datei darin erneut normalisiert
+RULES_VERSION = 1     # erhöhen, wenn sich die Regeln ändern (gespeicherte Ergebnisse werden dann neu berechnet)
+
+PLACEHOLDER = "§§§"  # Platzhalter für doppelten Bindestrich in Ordnernamen (z. B. "Jean--Féry")
+
+OPUS = re.compile(r"\b(?:[oO][pP](?:us)?)(?:\.?\s*)(?=\d)")
+NUMERO = re.compile("Nº")
+NUMBER = re.compile(r"\b(?:no|nr)\.?\s*(\d+)(?=\D|$)", re.IGNORECASE)
+VOLUME = re.compile(r"\b(?:vol(?:ume)?)\.?\s*([0-9IVXLCDM]+)\b", re.IGNORECASE)
+
+# Regeln von norm_text in dieser Reihenfolge (LogbuchConverter wendet sie spaltenweise mit pandas an)
+TEXT_RULES = (
+    (OPUS, "op. "),        # Opus vereinheitlichen → "op. n"
+    (NUMERO, "No"),
+    (NUMBER, r"Nr. \1"),   # Nummer vereinheitlichen → "Nr. n"
+    (VOLUME, r"Vol. \1"),  # Volume vereinheitlichen → "Vol. n"
+)
+
+_APOSTROPHE = re.compile(r"([DdOo])'([A-Za-z])")
+_SEPARATORS = ("+", ",", PLACEHOLDER, "_", ".")  # Sonderzeichen für Trennung in smart_titlecase
+
+_KEY_NR = re.compile(r"\b(?:no|nr)\b\.?\s*(?=\d)")
+_KEY_OP = re.compile(r"\bopus\b")
+_KEY_VOL = re.compile(r"\bvolume\b")
+_KEY_STRIP = re.compile(r"[\W_]+")
+
+# --- Normalisierung ---
+@lru_cache(maxsize=CACHE_SIZE)
+def nfc(s: str) -> str: # Unicode-Normalisierung (NFC) für Umlaute auf macOS
+    return unicodedata.normalize("NFC", s or "")
+
+@lru_cache(maxsize=CACHE_SIZE)
+def norm_text(s: str) -> str: # Normalisierung für Titel, Alben und Werke (Unterstriche vorher durch Leerzeichen ersetzen)
+    for pattern, repl in TEXT_RULES:
+        s = pattern.sub(repl, s)
+    return s
+
+def _fix_word(word: str) -> str:
+    # Alle definierten Sonderzeichen prüfen, Teile einzeln behandeln
+    for sep in _SEPARATORS:
+        if sep in word:
+            return sep.join(_fix_word(p) for p in word.split(sep))
+
+    w = word.capitalize()
+    # Apostrophe: d'Arc → d'Arc, O'Neill → O'Neill
+    if "'" in w:
+        w = _APOSTROPHE.sub(lambda m: m.group(1).lower() + "'" + m.group(2).upper(), w)
+    return w
+
+@lru_cache(maxsize=CACHE_SIZE)
+def smart_titlecase(s: str) -> str:
+    # Wandelt komplett großgeschriebene Strings in Title Case um
+    if not s or not s.isupper():
+        return s
+    return " ".join(_fix_word(w) for w in s.split())
+
+@lru_cache(maxsize=CACHE_SIZE)
+def booklet_basename(media_name: str) -> str:
+    # Basisname der Booklet-Ausgaben zum Medienordner (Einzel-CD oder Box), z. B. "Bach,Johann_Sebastian-Weihnachtsoratorium"
+    # jpg2pdf benennt die PDFs danach, wav2flac baut daraus die Booklet-URL
+    safe = nfc(media_name).replace("--", PLACEHOLDER)
+
+    # Trennen in Komponist und Medientitel (am ersten einfachen Bindestrich)
+    comp_raw, _, title_raw = safe.partition("-")
+    comp = smart_titlecase(comp_raw)
+    title = norm_text(title_raw.replace("_", " "))
+
+    # Wieder zusammensetzen, Leerzeichen in Unterstriche wandeln
+    return f"{comp}-{title}".replace(PLACEHOLDER, "--").replace(" ", "_")
+
+@lru_cache(maxsize=CACHE_SIZE)
+def match_key(s: str) -> str:
+    # Vergleichsschlüssel für Komponist und Medientitel (Katalog aus dem Logbuch, Suche in wav2flac):
+    # Groß-/Kleinschreibung, Leer- und Satzzeichen sowie Nr./No./Nº, Opus/op., Volume/Vol. egal
+    s = nfc(s).replace("Nº", "Nr").casefold()
+    s = _KEY_NR.sub("nr", s)
+    s = _KEY_OP.sub("op", s)
+    s = _KEY_VOL.sub("vol", s)
+    return _KEY_STRIP.sub("", s)
+
+CACHED = (nfc, norm_text, smart_titlecase, booklet_basename, match_key)
+
+# --- Micro-Benchmark ---
+SAMPLES = [
+    "Bach,Johann_Sebastian-Weihnachtsoratorium",
+    "BEETHOVEN,LUDWIG_VAN-Sinfonien_Vol_1",
+    "Beethoven,Ludwig_van-Klaviersonate_Nr_14_Op_27_Nº_2",
+    "Mondonville,Jean--Joseph_Cassanéa_de-Pièces_de_clavecin_op.3",
+    "D'INDY,VINCENT+O'NEILL,JOHN-Symphonie_sur_un_chant_montagnard",
+    "Brahms,Johannes-Ein_deutsches_Requiem_Opus45",
+    "Schütz,Heinrich-Musikalische_Exequien_SWV_279-281",
+    "MOZART,WOLFGANG_AMADEUS-Die_Zauberflöte_KV_620",
+]
+
+def corpus(root: Path | None) -> list[str]:
+    # Ordnernamen unter root (mit Wiederholung: einmal pro Datei darin) oder die Beispielnamen
+    if root is None:
+        return SAMPLES * 250
+    names = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        names.extend([Path(dirpath).name] * max(1, len(filenames)))
+    return names
+
+def clear_caches() -> None:
+    for func in CACHED:
+        func.cache_clear()
+
+def time_calls(func, names: list[str], repeat: int, cold: bool) -> float:
+    # Beste Zeit für alle Aufrufe; cold: Caches vor jedem Durchlauf leeren (erster Lauf über ein Archiv)
+    best = float("inf")
+    for _ in range(repeat):
+        if cold:
+            clear_caches()
+        start = time.perf_counter()
+        for name in names:
+            func(name)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-Benchmark der gemeinsamen Normalisierung.")
+    parser.add_argument("root", nargs="?", type=Path, help="Archiv-Ordner (Ordnernamen als Eingabe)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    names = corpus(args.root)
+    print(f"{len(names)} Aufrufe, {len(set(names))} verschiedene Namen")
+    print(f"{'Funktion':<18} {'ohne Cache [ms]':>16} {'kalt [ms]':>10} {'warm [ms]':>10} {'warm pro Aufruf [µs]':>21}")
+    for func in CACHED:
+        uncached = time_calls(func.__wrapped__, names, args.repeat, cold=True)
+        cold = time_calls(func, names, args.repeat, cold=True)
+        warm = time_calls(func, names, args.repeat, cold=False)
+        print(f"{func.__name__:<18} {uncached * 1e3:>16.2f} {cold * 1e3:>10.2f} {warm * 1e3:>10.2f} {warm / len(names) * 1e6:>21.3f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
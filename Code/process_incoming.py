@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# ============================================================
+#  Medienserver Upload-Verarbeitung (Dienst)
+#  ------------------------------------------------------------
+#  Zweck:
+#    - Überwacht /srv/incoming_media (inotify, ohne inotify_simple per Polling).
+#    - Verschiebt vollständig hochgeladene Alben als Ganzes in die Zielstruktur
+#      (FLAC → /mnt/media/music, PDF → /mnt/media/booklets, Pfad wie im Upload).
+#    - Setzt Leserechte nur auf die verschobenen Dateien und neu angelegten Ordner.
+#    - Schreibt die berührten Album-Ordner in eine Liste, damit der Medienserver
+#      nur diese neu einlesen muss.
+#    - Teildateien abgebrochener Uploads (.part/.tmp, versteckte rsync-Dateien,
+#      .rsync-partials) halten ein Album nur STALE_FACTOR × MIN_AGE lang zurück;
+#      danach wird das Album mit Warnung verschoben und die Teildateien entfernt.
+#  Ersetzt process_incoming.sh (Durchlauf über den ganzen Incoming-Ordner und
+#  chmod über die ganze Bibliothek bei jedem Lauf).
+#
+#  Aufruf:
+#    python3 process_incoming.py           # Dienst (process_incoming_watch.service)
+#    python3 process_incoming.py --once    # ein Durchlauf (process_incoming.service / Timer)
+#  Alle Pfade sind per Argument änderbar, z. B. für Testläufe mit temporären Ordnern.
+# ============================================================
+
+# --- Imports ---
+import os, sys, time, stat, errno, fcntl, shutil, argparse
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+try: # Optional: ereignisgesteuert statt Polling (pip install inotify_simple)
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+# --- Konfiguration ---
+INCOMING = "/srv/incoming_media"
+TARGET_MUSIC = "/mnt/media/music"
+TARGET_BOOKLETS = "/mnt/media/booklets"
+LOG = "/srv/logs/process.log"
+TOUCHED = "/srv/logs/touched_albums.txt"  # eine Zeile pro neu befülltem Album-Ordner (Ziel), wird nur angehängt
+
+MIN_AGE = 60          # Sekunden, die ein Album unverändert sein muss
+STALE_FACTOR = 10     # Teildateien, die STALE_FACTOR × MIN_AGE unverändert sind, gelten als verwaist (abgebrochener Upload)
+POLL_SECONDS = 60     # Intervall ohne inotify
+MAXSIZE = 50000       # Logrotation ab ~50 KB
+
+JUNK_NAMES = (".DS_Store",)  # macOS-Systemdateien: werden gelöscht, nicht verschoben
+JUNK_PREFIX = "._"
+PARTIAL_DIR = ".rsync-partials"
+
+@dataclass
+class Config:
+    incoming: Path
+    music: Path
+    booklets: Path
+    log: Path
+    touched: Path
+    min_age: float = MIN_AGE
+    stale_factor: float = STALE_FACTOR
+    reported: set = field(default_factory=set)  # bereits gemeldete Dateien unbekannten Typs (nur einmal loggen)
+    waiting: set = field(default_factory=set)   # bereits gemeldete Alben mit Teildateien (nur einmal loggen)
+
+    def target_root(self, rel: Path) -> Path | None:
+        suffix = rel.suffix.lower()
+        if suffix == ".flac":
+            return self.music
+        if suffix == ".pdf":
+            return self.booklets
+        return None
+
+# --- Logging ---
+def log(cfg: Config, tag: str, msg: str) -> None:
+    # Gleiches Format wie bisher: "2025-09-15 22:00:01 [OK] ..."
+    cfg.log.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if cfg.log.stat().st_size > MAXSIZE:
+            os.replace(cfg.log, cfg.log.with_name(cfg.log.name + ".1"))
+            with open(cfg.log, "a", encoding="utf-8") as f:
+                f.write(f"{datetime.now():%F %T} [INFO] Logdatei rotiert (zu groß)\n")
+    except FileNotFoundError:
+        pass
+    with open(cfg.log, "a", encoding="utf-8") as f:
+        f.write(f"{datetime.now():%F %T} [{tag}] {msg}\n")
+
+# --- Alben ---
+def album_of(rel: Path) -> Path:
+    # Album eines Eintrags (relativ zu Incoming): FLACs liegen in Werkordnern unter dem Medien- bzw. Disc-Ordner
+    # (Struktur von wav2flac), das Album ist also zwei Ebenen darüber; flachere Einträge bilden ihr eigenes Album
+    parts = rel.parts
+    if len(parts) >= 3:
+        return Path(*parts[:-2])
+    return rel.parent if len(parts) == 2 else rel
+
+def is_junk(name: str) -> bool:
+    return name in JUNK_NAMES or name.startswith(JUNK_PREFIX)
+
+def is_partial(name: str) -> bool:
+    # Upload läuft noch: versteckte Temp-Dateien von rsync, .part/.tmp-Dateien
+    return name.startswith(".") or name.endswith((".part", ".tmp"))
+
+def newest_change(path: Path, now: float) -> float:
+    # Jüngste Änderung (mtime oder ctime) einer Teildatei bzw. eines Ordners samt Inhalt
+    # Inzwischen verschwunden (von rsync umbenannt): zählt als Änderung jetzt
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return now
+    newest = max(st.st_mtime, st.st_ctime)
+    if stat.S_ISDIR(st.st_mode):
+        for dirpath, dirnames, filenames in os.walk(path):
+            for name in dirnames + filenames:
+                try:
+                    st = os.stat(Path(dirpath) / name)
+                except FileNotFoundError:
+                    return now
+                newest = max(newest, st.st_mtime, st.st_ctime)
+    return newest
+
+@dataclass
+class Album:
+    files: list = field(default_factory=list)  # relative Pfade der zu verschiebenden Dateien
+    last_change: float = 0.0                   # jüngste Änderung (mtime oder ctime) im Album
+    partial: bool = False                      # mindestens eine Datei wird noch übertragen
+    markers: list = field(default_factory=list) # relative Pfade der Teildateien (bzw. .rsync-partials-Ordner)
+    partial_change: float = 0.0                # jüngste Änderung an den Teildateien
+
+    def mark_partial(self, changed: float, rel: Path | None = None) -> None:
+        self.partial = True
+        self.partial_change = max(self.partial_change, changed)
+        if rel is not None:
+            self.markers.append(rel)
+
+def scan(cfg: Config, now: float | None = None) -> dict[Path, Album]:
+    # Ein Durchlauf über den Incoming-Ordner (enthält nur laufende Uploads, nicht die Bibliothek)
+    # ctime zählt mit: rsync -a übernimmt die alte mtime der Quelle, ctime zeigt die Ankunft auf dem Server
+    now = time.time() if now is None else now
+    albums: dict[Path, Album] = {}
+    for dirpath, dirnames, filenames in os.walk(cfg.incoming):
+        here = Path(dirpath).relative_to(cfg.incoming)
+        if PARTIAL_DIR in dirnames:
+            dirnames.remove(PARTIAL_DIR)
+            rel = here / PARTIAL_DIR
+            albums.setdefault(album_of(rel), Album()).mark_partial(newest_change(cfg.incoming / rel, now), rel)
+        for name in filenames:
+            if is_junk(name):
+                continue
+            rel = here / name
+            album = albums.setdefault(album_of(rel), Album())
+            if is_partial(name):
+                album.mark_partial(newest_change(cfg.incoming / rel, now), rel)
+                continue
+            try:
+                st = os.stat(cfg.incoming / rel)
+            except FileNotFoundError:  # inzwischen umbenannt (rsync) oder gelöscht: Upload aktiv
+                album.mark_partial(now)
+                continue
+            album.last_change = max(album.last_change, st.st_mtime, st.st_ctime)
+            album.files.append(rel)
+    return albums
+
+# --- Verschieben ---
+def make_dirs(directory: Path) -> None:
+    # Fehlende Zielordner anlegen; nur neu angelegte Ordner bekommen o+rx (Leserechte für nginx/Navidrome)
+    missing = []
+    while not directory.exists():
+        missing.append(directory)
+        directory = directory.parent
+    for d in reversed(missing):
+        try:
+            d.mkdir()
+        except FileExistsError:
+            continue
+        d.chmod(d.stat().st_mode | stat.S_IROTH | stat.S_IXOTH)
+
+def move_file(src: Path, dest: Path) -> None:
+    # Atomar per rename; über Dateisystemgrenzen erst als versteckte .part-Datei kopieren, dann umbenennen
+    try:
+        os.rename(src, dest)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        tmp = dest.with_name(f".{dest.name}.part")
+        shutil.copy2(src, tmp)
+        os.replace(tmp, dest)
+        src.unlink()
+    dest.chmod(dest.stat().st_mode | stat.S_IROTH)
+
+def remove_empty_dirs(cfg: Config, directories: set[Path]) -> None:
+    # Leere Upload-Ordner entfernen (tiefste zuerst), macOS-Systemdateien vorher löschen
+    for directory in sorted(directories, key=lambda d: len(d.parts), reverse=True):
+        while directory != cfg.incoming and cfg.incoming in directory.parents:
+            try:
+                for entry in os.scandir(directory):
+                    if entry.is_file() and is_junk(entry.name):
+                        os.unlink(entry.path)
+                directory.rmdir()
+            except OSError:  # nicht leer oder schon entfernt
+                break
+            directory = directory.parent
+
+def move_album(cfg: Config, album: Path, files: list[Path]) -> list[Path]:
+    # Alle Dateien eines fertigen Albums verschieben; gibt die berührten Musik-Album-Ordner (Ziel) zurück
+    touched, moved_dirs = set(), set()
+    for rel in sorted(files):
+        src = cfg.incoming / rel
+        root = cfg.target_root(rel)
+        if root is None:
+            if rel not in cfg.reported:
+                cfg.reported.add(rel)
+                log(cfg, "SKIP", f"Unbekannter Typ: {src}")
+            continue
+        dest = root / rel
+        if dest.exists():  # nie überschreiben (wie mv -n)
+            log(cfg, "ERROR", f"Ziel existiert bereits, nicht verschoben: {src}")
+            continue
+        try:
+            make_dirs(dest.parent)
+            move_file(src, dest)
+        except OSError as e:
+            log(cfg, "ERROR", f"Konnte Datei nicht verschieben: {src} ({e})")
+            continue
+        log(cfg, "OK", f"Verschoben: {src} → {dest}")
+        moved_dirs.add(src.parent)
+        if root == cfg.music:
+            touched.add(root / album_of(rel))
+    remove_empty_dirs(cfg, moved_dirs)
+    return sorted(touched)
+
+def remove_markers(cfg: Config, markers: list[Path]) -> None:
+    # Verwaiste Teildateien eines abgebrochenen Uploads entfernen (sonst bliebe das Album dauerhaft "in Übertragung")
+    for rel in markers:
+        path = cfg.incoming / rel
+        try:
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            log(cfg, "ERROR", f"Konnte verwaiste Teildatei nicht entfernen: {path} ({e})")
+            continue
+        log(cfg, "WARNING", f"Verwaiste Teildatei entfernt: {path}")
+    remove_empty_dirs(cfg, {(cfg.incoming / rel).parent for rel in markers})
+
+def record_touched(cfg: Config, touched: list[Path]) -> None:
+    # Ein Schreibvorgang pro Durchlauf; der Leser (z. B. Rescan-Job) verarbeitet und leert die Datei
+    if not touched:
+        return
+    cfg.touched.parent.mkdir(parents=True, exist_ok=True)
+    with open(cfg.touched, "a", encoding="utf-8") as f:
+        f.write("".join(f"{album}\n" for album in touched))
+
+# --- Durchlauf ---
+def process(cfg: Config, now: float | None = None) -> float | None:
+    # Fertige Alben verschieben; gibt den Zeitpunkt zurück, zu dem das nächste wartende Album fertig sein kann
+    # Sperre gegen parallele Läufe (Dienst und process_incoming.service)
+    cfg.log.parent.mkdir(parents=True, exist_ok=True)
+    with open(cfg.log.with_suffix(".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        now = time.time() if now is None else now
+        touched, next_due = [], None
+        stale_age = cfg.min_age * cfg.stale_factor
+        for album, state in sorted(scan(cfg, now).items()):
+            # Teildateien, die länger als stale_age unverändert sind, stammen von einem abgebrochenen Upload
+            stale = state.partial and now - state.partial_change >= stale_age
+            if state.partial and not stale and state.markers and album not in cfg.waiting:
+                cfg.waiting.add(album)
+                log(cfg, "INFO", f"Album {cfg.incoming / album} wartet auf laufenden Upload "
+                                 f"({len(state.markers)} Teildatei(en), z. B. {state.markers[0].name})")
+            if (state.partial and not stale) or now - state.last_change < cfg.min_age:
+                due = now + cfg.min_age if state.partial and not stale else state.last_change + cfg.min_age
+                next_due = due if next_due is None else min(next_due, due)
+                continue
+            cfg.waiting.discard(album)
+            if stale:
+                log(cfg, "WARNING", f"Album {cfg.incoming / album}: Teildateien seit {now - state.partial_change:.0f} s "
+                                    f"unverändert (abgebrochener Upload?), wird trotzdem verschoben")
+                remove_markers(cfg, state.markers)
+            if state.files:
+                touched.extend(move_album(cfg, album, state.files))
+        record_touched(cfg, touched)
+        if touched:
+            log(cfg, "INFO", f"{len(touched)} Album-Ordner berührt (Liste: {cfg.touched})")
+    return next_due
+
+# --- Überwachung ---
+WATCH_MASK = 0
+if INotify is not None:
+    WATCH_MASK = flags.CREATE | flags.CLOSE_WRITE | flags.MOVED_TO | flags.ATTRIB
+
+def watch_tree(ino, watches: dict, top: Path) -> None:
+    for dirpath, dirnames, _ in os.walk(top):
+        dirnames[:] = [d for d in dirnames if d != PARTIAL_DIR]
+        try:
+            watches[ino.add_watch(dirpath, WATCH_MASK)] = Path(dirpath)
+        except OSError:  # inzwischen entfernt
+            continue
+
+def run_inotify(cfg: Config) -> None:
+    # Ereignisgesteuert: nach jeder Änderung frühestens MIN_AGE später prüfen, sonst schlafen
+    ino, watches = INotify(), {}
+    watch_tree(ino, watches, cfg.incoming)
+    due = process(cfg)
+    while True:
+        timeout = None if due is None else max(0, int((due - time.time()) * 1000))
+        for event in ino.read(timeout=timeout):
+            if event.mask & flags.Q_OVERFLOW:  # Ereignisse verloren: alle Ordner neu überwachen
+                watch_tree(ino, watches, cfg.incoming)
+            elif event.mask & flags.IGNORED:
+                watches.pop(event.wd, None)
+            elif event.mask & flags.ISDIR and event.wd in watches:
+                watch_tree(ino, watches, watches[event.wd] / event.name)
+            changed = time.time() + cfg.min_age
+            due = changed if due is None else min(due, changed)
+        if due is not None and time.time() >= due:
+            due = process(cfg)
+
+def run_polling(cfg: Config) -> None:
+    while True:
+        process(cfg)
+        time.sleep(POLL_SECONDS)
+
+# --- Hauptprogramm ---
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Verschiebt fertige Uploads albumweise in die Medienbibliothek.")
+    parser.add_argument("--once", action="store_true", help="Ein Durchlauf statt Dienst")
+    parser.add_argument("--poll", action="store_true", help="Polling statt inotify")
+    parser.add_argument("--incoming", type=Path, default=Path(INCOMING), help="Upload-Ordner")
+    parser.add_argument("--music", type=Path, default=Path(TARGET_MUSIC), help="Ziel für FLACs")
+    parser.add_argument("--booklets", type=Path, default=Path(TARGET_BOOKLETS), help="Ziel für PDFs")
+    parser.add_argument("--log", type=Path, default=Path(LOG), help="Logdatei")
+    parser.add_argument("--touched", type=Path, default=Path(TOUCHED), help="Liste der berührten Album-Ordner")
+    parser.add_argument("--min-age", type=float, default=MIN_AGE, help="Sekunden ohne Änderung, bis ein Album fertig ist")
+    parser.add_argument("--stale-factor", type=float, default=STALE_FACTOR,
+                        help="Teildateien, die so viele × --min-age unverändert sind, gelten als verwaist")
+    return parser.parse_args(argv)
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    cfg = Config(args.incoming, args.music, args.booklets, args.log, args.touched, min_age=args.min_age,
+                 stale_factor=args.stale_factor)
+    if not cfg.incoming.is_dir():
+        print(f"Incoming-Ordner nicht gefunden: {cfg.incoming}", file=sys.stderr)
+        return 1
+
+    if args.once:
+        process(cfg)
+        return 0
+    if INotify is None or args.poll:
+        log(cfg, "INFO", f"Dienst gestartet (Polling alle {POLL_SECONDS} s)")
+        run_polling(cfg)
+    else:
+        log(cfg, "INFO", "Dienst gestartet (inotify)")
+        run_inotify(cfg)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
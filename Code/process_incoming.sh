@@ -6,6 +6,8 @@
 #    - Verschiebt neue Uploads aus /incoming in die passende Zielstruktur.
 #    - Setzt korrekte Rechte & führt Logrotation durch.
 #    - Entfernt leere oder temporäre Upload-Ordner nach erfolgreicher Verarbeitung.
+#  Abgelöst durch process_incoming.py (albumweise, Rechte nur für
+#  verschobene Dateien); bleibt als Referenz erhalten.
 # ============================================================
 
 INCOMING="/srv/incoming_media"
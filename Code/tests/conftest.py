@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+
+# Gemeinsame Einstellungen der Tests: Module aus Code/ und den Werkzeug-Ordnern importierbar machen
+# Aufruf (aus dem Repository oder aus Code/): python3 -m pytest Code/tests
+
+# --- Imports ---
+import sys
+from pathlib import Path
+
+CODE = Path(__file__).resolve().parents[1]
+for path in (CODE, CODE / "Audio-Konvertierung", CODE / "Booklet-Konvertierung"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+# Worker-Prozess für tests/test_worker.py: wav2flac --worker mit dem Schein-Encoder aus dem Benchmark
+# Umgebungsvariablen:
+#   FAKE_WORKER_LOG   Datei, in die jede fertig kodierte WAV eine Zeile schreibt (O_APPEND, prozessübergreifend)
+#   FAKE_WORKER_HANG  Marker-Datei: der Encoder legt sie an und bleibt dann hängen (Worker wird im Test beendet)
+# Aufruf: python3 fake_worker.py --worker --input … --output … --encoder fake [weitere wav2flac-Optionen]
+
+# --- Imports ---
+import os, sys, time
+from pathlib import Path
+
+import conftest # Pfade zu Code/ und Audio-Konvertierung/
+import wav2flac
+from benchmark import __main__ as bench # registriert den Encoder "fake"
+
+def encode_logged(in_wav: Path, out_flac: Path, *args, **kwargs) -> bool:
+    hang = os.environ.get("FAKE_WORKER_HANG")
+    if hang:
+        Path(hang).touch()
+        while True:
+            time.sleep(60)
+    result = bench.encode_fake(in_wav, out_flac, *args, **kwargs)
+    fd = os.open(os.environ["FAKE_WORKER_LOG"], os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+    try:
+        os.write(fd, f"{in_wav}\n".encode("utf-8"))
+    finally:
+        os.close(fd)
+    return result
+
+wav2flac.ENCODERS["fake"] = encode_logged
+wav2flac.POLL_SECONDS = 0.2 # wartende Worker sollen abgelaufene Leases schnell bemerken
+
+if __name__ == "__main__":
+    sys.exit(wav2flac.run_worker(wav2flac.parse_args(sys.argv[1:])))
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+# Gemeinsamer Lauf (album_pipeline.py) mit dem Schein-Encoder aus benchmark/: die Tracks eines Albums werden
+# erst gelesen, wenn sein Booklet-PDF fertig ist, und bookleturl folgt derselben Regel wie bei wav2flac allein
+# (ein anschließender Einzellauf findet nichts neu zu taggen).
+
+# --- Imports ---
+import time, shutil, threading
+from pathlib import Path
+
+from mutagen.flac import FLAC
+
+import album_pipeline, wav2flac, jpg2pdf
+from benchmark import __main__ as bench # registriert den Schein-Encoder "fake"
+from benchmark.archive import ArchiveSpec, generate_archive
+from scheduler import ByteBudget
+
+# --- Hilfen ---
+def urls(out: Path) -> dict[str, str]:
+    return {str(flac.relative_to(out)): (FLAC(str(flac)).get("bookleturl") or [""])[0] for flac in out.rglob("*.flac")}
+
+# --- Tests ---
+def test_tracks_wait_for_pdf_and_urls_match_standalone(tmp_path: Path, monkeypatch):
+    src, out, booklets = tmp_path / "archiv", tmp_path / "out", tmp_path / "booklets"
+    generate_archive(src, ArchiveSpec(singles=2, boxes=1, discs=2, works=1, tracks=2, seconds=0.05, covers=True))
+    bare = sorted((src / "EinzelCDs").iterdir())[0]
+    shutil.rmtree(bare / "booklet") # Album ohne Booklet
+    booklets.mkdir()
+    bench.clear_caches()
+
+    events, lock = [], threading.Lock()
+    real_build, real_read = jpg2pdf.build_pdf, wav2flac.read_stage
+
+    def build_pdf(folder, images, cfg, stats=None):
+        time.sleep(0.2) # langsames PDF: Tracks dürfen nicht vorbeiziehen
+        status = real_build(folder, images, cfg, stats)
+        with lock:
+            events.append(("pdf", folder.parent))
+        return status
+
+    def read_stage(job, cfg):
+        with lock:
+            events.append(("track", wav2flac.cover_container(job.wav)))
+        return real_read(job, cfg)
+
+    monkeypatch.setattr(jpg2pdf, "build_pdf", build_pdf)
+    monkeypatch.setattr(wav2flac, "read_stage", read_stage)
+    cfg = wav2flac.RunConfig(src, out, {}, encoder="fake", budget=ByteBudget(wav2flac.BUFFER_BYTES))
+    tracks, albums, errors, submitted = album_pipeline.run(cfg, jpg2pdf.BuildConfig(booklets), 2)
+    assert not errors and tracks["converted"] == submitted == 8
+    assert albums["built"] == 2
+
+    pdfs = {owner: i for i, (kind, owner) in enumerate(events) if kind == "pdf"}
+    assert bare not in pdfs and len(pdfs) == 2
+    for i, (kind, owner) in enumerate(events):
+        if kind == "track" and owner in pdfs:
+            assert pdfs[owner] < i, owner
+    assert sorted(p.name for p in booklets.glob("*.pdf")) == sorted(
+        f"{jpg2pdf.booklet_name(owner / 'booklet')}.pdf" for owner in pdfs)
+
+    # URL nur für Alben mit Booklet, und nur auf tatsächlich erzeugte PDFs
+    tagged = urls(out)
+    bare_rel = str(bare.relative_to(src))
+    for rel, url in tagged.items():
+        if rel.startswith(bare_rel + "/"):
+            assert url == "", rel
+        else:
+            assert url.startswith(wav2flac.BOOKLET_URL) and (booklets / url.rsplit("/", 1)[1]).exists(), rel
+
+    # Einzellauf von wav2flac danach: gleiche Tags, nichts neu getaggt
+    monkeypatch.undo()
+    bench.clear_caches()
+    cfg = wav2flac.RunConfig(src, out, cfg.manifest, encoder="fake", budget=ByteBudget(wav2flac.BUFFER_BYTES))
+    counts, errors, _ = wav2flac.convert_tree(cfg, 2)
+    assert not errors and dict(counts) == {"unchanged": 8}
+    assert urls(out) == tagged
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+# Byte-Zählung der Laufzeit-Messung in wav2flac: jede Datei wird genau einmal gezählt (gelesen in read und
+# verify, geschrieben in finish), damit Zusammenfassung und Prometheus das tatsächliche Datenvolumen zeigen.
+
+# --- Imports ---
+import shutil
+from pathlib import Path
+
+import pytest
+
+import wav2flac, instrumentation
+from benchmark import __main__ as bench # registriert den Schein-Encoder "fake"
+from benchmark.archive import ArchiveSpec, generate_archive
+from scheduler import ByteBudget
+
+# --- Tests ---
+@pytest.mark.parametrize("encoder", ["fake", "ffmpeg"])
+def test_each_file_is_counted_once(tmp_path: Path, encoder: str):
+    if encoder == "ffmpeg" and not shutil.which("ffmpeg"):
+        pytest.skip("ffmpeg nicht gefunden")
+    src, out = tmp_path / "archiv", tmp_path / "out"
+    generate_archive(src, ArchiveSpec(singles=2, boxes=0, works=1, tracks=3, seconds=0.2, covers=True))
+    bench.clear_caches()
+    metrics = instrumentation.Metrics("test")
+    cfg = wav2flac.RunConfig(src, out, {}, encoder=encoder, budget=ByteBudget(wav2flac.BUFFER_BYTES),
+                             verify=encoder != "fake", metrics=metrics) # Schein-Encoder schreibt keine MD5
+    counts, errors, submitted = wav2flac.convert_tree(cfg, 2)
+    assert not errors and counts["converted"] == submitted == 6
+
+    stats = instrumentation.stage_stats(metrics)
+    wav_bytes = sum(p.stat().st_size for p in src.rglob("*.wav"))
+    flac_bytes = sum(p.stat().st_size for p in out.rglob("*.flac"))
+    assert stats["read"]["read"] == wav_bytes
+    assert stats["finish"]["written"] == flac_bytes
+    for stage in ("encode", "digest", "tag"): # Daten im Speicher bzw. dieselbe Datei: nicht erneut zählen
+        if stage in stats:
+            assert stats[stage]["read"] == stats[stage]["written"] == 0, stage
+    assert sum(s["written"] for s in stats.values()) == flac_bytes
+    if encoder == "ffmpeg": # Prüfung liest nur Kopf und Dateiende
+        assert 0 < stats["verify"]["read"] <= flac_bytes
+        assert sum(s["read"] for s in stats.values()) == wav_bytes + stats["verify"]["read"]
+    else:
+        assert sum(s["read"] for s in stats.values()) == wav_bytes
+
+def test_retag_writes_no_full_file(tmp_path: Path):
+    src, out = tmp_path / "archiv", tmp_path / "out"
+    generate_archive(src, ArchiveSpec(singles=1, boxes=0, works=1, tracks=2, seconds=0.05, covers=True))
+    bench.clear_caches()
+    manifest = bench.convert_once(src, out, "fake", workers=2)
+    for scan in src.rglob("booklet-b.jpg"): # Cover entfernt -> nur neu taggen
+        scan.unlink()
+    bench.clear_caches()
+    metrics = instrumentation.Metrics("test")
+    cfg = wav2flac.RunConfig(src, out, manifest, encoder="fake", metrics=metrics)
+    counts, errors, _ = wav2flac.convert_tree(cfg, 2)
+    assert not errors and counts["retagged"] == 2
+    stats = instrumentation.stage_stats(metrics)
+    assert sum(s["read"] + s["written"] for s in stats.values()) == 0
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+# Regression test for the vectorized Logbuch transform: transform() must produce exactly what the former
+# per-row implementation (iterrows + parse_column_b) produced, including the natural CD number sort.
+
+# --- Imports ---
+import re
+import pandas as pd
+import pytest
+
+import normalization
+import LogbuchConverter as lc
+
+# --- Reference: former per-row implementation ---
+def norm_name(s: str) -> str:
+    s = normalization.nfc(s)
+    s = s.replace("_", " ")
+    s = re.sub(r",\s*(\S)", r", \1", s)
+    return s.strip()
+
+def norm_text(s: str) -> str:
+    return normalization.norm_text(normalization.nfc(s)).strip()
+
+def parse_column_b(value):
+    if pd.isna(value):
+        return "", "", ""
+    # The per-row code passed numeric cells straight to re.split (TypeError); transform() reads them as text
+    value = str(value)
+
+    parts = re.split(r"\s*[-–]\s*", value, maxsplit=1)
+    composer = norm_name(parts[0]) if parts else ""
+    mediatitle, interpreters = "", ""
+    if len(parts) > 1:
+        rest = parts[1]
+        if ". " in rest:
+            last_dot = rest.rfind(". ")
+            mediatitle = rest[:last_dot]
+            interpreters = rest[last_dot + 2 :]
+        else:
+            mediatitle = rest
+    return norm_name(composer), norm_text(mediatitle), norm_name(interpreters)
+
+def convert_date(date_series):
+    def fix_date(d):
+        if pd.isna(d):
+            return pd.NaT
+        return pd.to_datetime(d, format="%d.%m.%y", errors="coerce")
+    converted = date_series.apply(fix_date)
+    return converted.ffill().dt.strftime("%Y-%m-%d")
+
+def per_row_transform(df: pd.DataFrame) -> pd.DataFrame:
+    results = []
+    for _, row in df.iterrows():
+        composer, mediatitle, interpreters = parse_column_b(row.iloc[1])
+        results.append({
+            "CD Number": str(row.iloc[0]).strip(),
+            "Composer": composer,
+            "Mediatitle": mediatitle,
+            "Interpreter": interpreters,
+            "Place": "",
+            "Status": "",
+            "Date": row.iloc[5] if len(row) > 5 else None,
+            "Comment": norm_text(str(row.iloc[4])) if len(row) > 4 else "",
+        })
+    df_out = pd.DataFrame(results)
+    df_out["Date"] = convert_date(df_out["Date"])
+    return df_out
+
+# --- Test data ---
+NAN = float("nan")
+
+def sheet() -> pd.DataFrame:
+    # Columns by position as in the logbook: CD number, entry, -, -, comment, date
+    # Mixed str/int in columns A and B, tied CD numbers (12 and "12", "7" twice) and empty rows
+    rows = [
+        (12, "Bach, Johann_Sebastian - Weihnachtsoratorium op 248. Gardiner, John Eliot", NAN, NAN, "Box 1/2", "03.02.24"),
+        ("3a", "Beethoven – Klaviersonate No 14 Op.27 Nº 2. Brendel,Alfred", NAN, NAN, NAN, NAN),
+        (NAN, NAN, NAN, NAN, NAN, NAN),
+        ("7", 4711, NAN, NAN, "nr 5 fehlt", "05.02.24"),
+        ("12", "Bach, Johann Sebastian - Weihnachtsoratorium Vol 2. Gardiner", NAN, NAN, "Box 2/2", NAN),
+        (3, "Mozart", NAN, NAN, NAN, "kein Datum"),
+        (" 7 ", "Schütz_Heinrich-Psalmen Davids. Dresdner Kammerchor. Rademann, Hans-Christoph", NAN, NAN, NAN, "07.02.24"),
+        (NAN, NAN, NAN, NAN, NAN, NAN),
+        (100, "Brahms-Ein deutsches Requiem Opus 45", NAN, NAN, 2024, NAN),
+        (21, 1812, NAN, NAN, NAN, "08.02.24"),
+    ]
+    return pd.DataFrame(rows, columns=["CD", "Eintrag", "C", "D", "Kommentar", "Datum"], dtype=object)
+
+# --- Tests ---
+def test_transform_matches_per_row():
+    df = sheet()
+    pd.testing.assert_frame_equal(lc.transform(df), per_row_transform(df))
+
+@pytest.mark.parametrize("chunk_rows", [1, 3, 4])
+def test_chunked_transform_matches_per_row(chunk_rows):
+    # Chunks as in load_and_transform: the date forward-fill continues across chunk borders
+    df = sheet()
+    parts, start = [], None
+    for begin in range(0, len(df), chunk_rows):
+        part = lc.transform(df.iloc[begin:begin + chunk_rows], start)
+        dates = part["Date"].dropna()
+        if len(dates):
+            start = pd.Timestamp(dates.iloc[-1])
+        parts.append(part)
+    pd.testing.assert_frame_equal(pd.concat(parts, ignore_index=True), per_row_transform(df))
+
+def test_natural_sort_matches_per_row_key():
+    out = lc.transform(sheet())
+    new = out.sort_values(by="CD Number", key=lc.natural_sort_col, kind="stable")
+    old = out.sort_values(by="CD Number", key=lambda col: col.map(lc.natural_sort_key), kind="stable")
+    pd.testing.assert_frame_equal(new, old)
+
+def test_natural_sort_keeps_sheet_order_for_ties():
+    # The former quicksort left the order of equal CD numbers undefined; the stable sort keeps sheet order
+    out = lc.transform(sheet()).sort_values(by="CD Number", key=lc.natural_sort_col, kind="stable")
+    assert out["CD Number"].tolist() == ["3", "3a", "7", "7", "12", "12", "21", "100", "nan", "nan"]
+    assert out.index.tolist() == [5, 1, 3, 6, 0, 4, 9, 8, 2, 7]
+    assert out.loc[out["CD Number"] == "12", "Comment"].tolist() == ["Box 1/2", "Box 2/2"]
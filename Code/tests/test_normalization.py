@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+# Golden-Test der gemeinsamen Normalisierung (normalization.py) und ihrer Verwendung in wav2flac, jpg2pdf und
+# LogbuchConverter: Ergebnisse für feste Archiv- und Logbuch-Namen liegen in golden/normalization.json.
+# Ändern sich die Regeln, muss RULES_VERSION erhöht und die Golden-Datei neu erzeugt werden:
+#   python3 Code/tests/test_normalization.py --update
+
+# --- Imports ---
+import sys, json
+from pathlib import Path
+
+if __name__ == "__main__": # Aufruf als Skript (--update): Pfade wie in conftest.py
+    import conftest
+
+import pandas as pd
+import normalization, wav2flac, jpg2pdf
+import LogbuchConverter as lc
+
+# --- Korpus ---
+GOLDEN = Path(__file__).resolve().parent / "golden" / "normalization.json"
+
+# Medien- und Box-Ordnernamen aus dem Archiv (Einzel-CDs, Boxen, Discs) inkl. Sonderfällen
+MEDIA_NAMES = [
+    *normalization.SAMPLES,
+    "Bach,Johann_Sebastian-WEIHNACHTSORATORIUM",
+    "Bach,Johann_Sebastian-WEIHNACHTSORATORIUM._CD1",
+    "Bach,Johann_Sebastian-Variationen_über_ein_Thema_Nº18",
+    "Beethoven,Ludwig_van-ALBUM_1._CD3",
+    "Beethoven,Ludwig_van-FANTASIE_IN_F-MOLL_OP.3",
+    "Beethoven,Ludwig_van-Klaviertrio_Op._21",
+    "Brahms,Johannes-21_Lieder",
+    "Brahms,Johannes-GESAMTAUFNAHME_VOL._2",
+    "Brahms,Johannes-GESAMTAUFNAHME_VOL._2_Teil_1._CD1",
+    "Brahms,Johannes-Lieder_--_Zyklus_Nr._24",
+    "Brahms,Johannes-Sonate_op.54_Nº_2",
+    "Brahms,Johannes-Über_die_Heide,_op._86_No._4",
+    "Dvořák,Antonín-Klaviertrio_Op._27",
+    "Dvořák,Antonín-Sonate_op.9_Nº_2",
+    "Mozart,Wolfgang_Amadeus-Lieder_--_Zyklus_Nr._15",
+    "Schubert,Franz-GESAMTAUFNAHME_Vol._4",
+    "Schu\u0308tz,Heinrich-Psalmen_Davids_SWV_22-47", # NFD wie von macOS geliefert
+    "D'INDY,VINCENT+O'NEILL,JOHN",                     # nur Komponist, komplett groß (smart_titlecase)
+    "MONDONVILLE,JEAN--JOSEPH_CASSANÉA_DE",
+    "RAMEAU,JEAN--PHILIPPE-Pièces_de_clavecin_en_concerts",
+    "Wagner,Richard-Der_Ring_des_Nibelungen_Volume_III",
+    "Foo,Bar-Unbekannt",
+    "OhneBindestrich",
+]
+
+# Einträge aus Spalte B / Kommentaren des Logbuchs (LogbuchConverter, Katalog für wav2flac)
+LOGBOOK_TEXTS = [
+    "Weihnachtsoratorium BWV 248",
+    "Klaviersonate No 14 Op.27 Nº 2",
+    "Sinfonien vol 1",
+    "Ein deutsches Requiem Opus45",
+    "Sonate nr.5 op 5",
+    "Pièces de clavecin op.3",
+    "Box 2/2, no 5 fehlt",
+    "Die Zauberflöte KV 620",
+    "  Volume IV  ",
+]
+
+def media_entry(name: str) -> dict:
+    album, bookleturl = wav2flac.resolve_single_media(name)
+    return {
+        "norm_text": normalization.norm_text(name),
+        "smart_titlecase": normalization.smart_titlecase(name),
+        "booklet_basename": normalization.booklet_basename(name),
+        "match_key": normalization.match_key(name),
+        "wav2flac_album": album,
+        "wav2flac_bookleturl": bookleturl,
+        "jpg2pdf_booklet_name": jpg2pdf.booklet_name(Path(name) / "booklet"),
+    }
+
+def logbook_entry(text: str) -> dict:
+    col = pd.Series([text])
+    return {
+        "norm_text": normalization.norm_text(text),
+        "match_key": normalization.match_key(text),
+        "logbuch_text": lc.norm_text_col(col).iloc[0],
+        "logbuch_name": lc.norm_name_col(col).iloc[0],
+    }
+
+def current() -> dict:
+    return {
+        "rules_version": normalization.RULES_VERSION,
+        "media": {name: media_entry(name) for name in MEDIA_NAMES},
+        "logbook": {text: logbook_entry(text) for text in LOGBOOK_TEXTS},
+    }
+
+def load_golden() -> dict:
+    return json.loads(GOLDEN.read_text(encoding="utf-8"))
+
+# --- Tests ---
+def test_golden_matches_rules_version():
+    golden = load_golden()
+    assert golden["rules_version"] == normalization.RULES_VERSION, (
+        "RULES_VERSION wurde erhöht: Golden-Datei mit 'python3 Code/tests/test_normalization.py --update' neu erzeugen")
+
+def test_outputs_match_golden():
+    golden, now = load_golden(), current()
+    if golden["rules_version"] != now["rules_version"]:
+        return # meldet test_golden_matches_rules_version
+    changed = [(section, key, field, expected[field], now[section].get(key, {}).get(field))
+               for section in ("media", "logbook")
+               for key, expected in golden[section].items()
+               for field in expected
+               if now[section].get(key, {}).get(field) != expected[field]]
+    assert not changed, (
+        "Normalisierung hat sich geändert, ohne dass RULES_VERSION erhöht wurde (gespeicherte Logbuch-Zeilen, "
+        "Booklet-URLs und PDF-Namen würden auseinanderlaufen):\n"
+        + "\n".join(f"  {s}: {k!r} [{f}] {old!r} -> {new!r}" for s, k, f, old, new in changed[:20]))
+    assert set(golden["media"]) == set(now["media"]) and set(golden["logbook"]) == set(now["logbook"]), (
+        "Korpus geändert: Golden-Datei mit --update neu erzeugen")
+
+def test_bookleturl_matches_pdf_name():
+    # wav2flac und jpg2pdf müssen immer denselben Namen bilden, unabhängig von RULES_VERSION
+    for name in MEDIA_NAMES:
+        entry = media_entry(name)
+        assert entry["wav2flac_bookleturl"] == f"{wav2flac.BOOKLET_URL}{entry['jpg2pdf_booklet_name']}.pdf"
+        assert entry["jpg2pdf_booklet_name"] == entry["booklet_basename"]
+
+def test_logbook_columns_use_shared_rules():
+    # Spaltenweise Regeln im LogbuchConverter = norm_text aus normalization.py (nach NFC, ohne Rand-Leerzeichen)
+    for text in LOGBOOK_TEXTS:
+        assert logbook_entry(text)["logbuch_text"] == normalization.norm_text(normalization.nfc(text)).strip()
+
+# --- Golden-Datei neu erzeugen ---
+if __name__ == "__main__":
+    if sys.argv[1:] != ["--update"]:
+        sys.exit("Aufruf: python3 test_normalization.py --update")
+    GOLDEN.parent.mkdir(exist_ok=True)
+    GOLDEN.write_text(json.dumps(current(), ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"Golden-Datei geschrieben: {GOLDEN} (RULES_VERSION {normalization.RULES_VERSION})")
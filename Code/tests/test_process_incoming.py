@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+# Upload-Verarbeitung (process_incoming.py) auf temporären Ordnern: Wartezeit bis ein Album fertig ist,
+# zurückgehaltene und verwaiste Teildateien, Kopieren über Dateisystemgrenzen, macOS-Systemdateien und die
+# Liste der berührten Album-Ordner. Die Zeit wird über den now-Parameter von process() vorgestellt.
+
+# --- Imports ---
+import os, errno, time
+from pathlib import Path
+
+import pytest
+
+import process_incoming as pi
+
+# --- Hilfen ---
+MIN_AGE = 60
+ALBUM = Path("Bach,Johann_Sebastian-WEIHNACHTSORATORIUM")
+WORK = ALBUM / "Bach,Johann_Sebastian-Weihnachtsoratorium_BWV_248"
+
+@pytest.fixture
+def cfg(tmp_path: Path) -> pi.Config:
+    (tmp_path / "incoming").mkdir()
+    return pi.Config(tmp_path / "incoming", tmp_path / "music", tmp_path / "booklets",
+                     tmp_path / "logs" / "process.log", tmp_path / "logs" / "touched.txt", min_age=MIN_AGE)
+
+def upload(cfg: pi.Config, rel: Path | str, data: bytes = b"fLaC") -> Path:
+    path = cfg.incoming / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+def log_text(cfg: pi.Config) -> str:
+    return cfg.log.read_text(encoding="utf-8") if cfg.log.exists() else ""
+
+def touched(cfg: pi.Config) -> list[str]:
+    return cfg.touched.read_text(encoding="utf-8").splitlines() if cfg.touched.exists() else []
+
+def later(seconds: float) -> float:
+    # ctime lässt sich nicht zurückdatieren: statt alter Dateien eine spätere Prüfzeit
+    return time.time() + seconds
+
+# --- Tests ---
+def test_album_waits_min_age_then_moves(cfg: pi.Config):
+    upload(cfg, WORK / "01.flac")
+    upload(cfg, WORK / "02.flac")
+
+    due = pi.process(cfg)
+    assert not cfg.music.exists()
+    assert due == pytest.approx(time.time() + MIN_AGE, abs=5)
+    assert pi.process(cfg, now=due - 1) is not None # noch nicht lange genug unverändert
+
+    assert pi.process(cfg, now=due) is None
+    assert (cfg.music / WORK / "01.flac").read_bytes() == b"fLaC"
+    assert (cfg.music / WORK / "02.flac").stat().st_mode & 0o004 # Leserechte für nginx/Navidrome
+    assert not (cfg.incoming / ALBUM).exists() # leere Upload-Ordner entfernt
+
+def test_recent_change_holds_back_whole_album(cfg: pi.Config):
+    upload(cfg, WORK / "01.flac")
+    changed = later(MIN_AGE + 1)
+    os.utime(cfg.incoming / WORK / "01.flac", (changed, changed)) # mtime in der Zukunft: jüngste Änderung
+    pi.process(cfg, now=later(MIN_AGE + 1))
+    assert not (cfg.music / WORK / "01.flac").exists()
+    pi.process(cfg, now=changed + MIN_AGE)
+    assert (cfg.music / WORK / "01.flac").exists()
+
+@pytest.mark.parametrize("marker", [
+    WORK / ".03.flac.Xy12Ab",    # versteckte Temp-Datei von rsync
+    WORK / "03.flac.part",
+    WORK / "03.flac.tmp",
+    ALBUM / pi.PARTIAL_DIR / "03.flac", # rsync --partial-dir
+])
+def test_partial_album_is_held_back(cfg: pi.Config, marker: Path):
+    upload(cfg, WORK / "01.flac")
+    upload(cfg, marker)
+
+    for offset in (MIN_AGE + 1, 5 * MIN_AGE):
+        assert pi.process(cfg, now=later(offset)) is not None
+        assert not cfg.music.exists()
+    assert log_text(cfg).count("wartet auf laufenden Upload") == 1 # nur einmal gemeldet
+
+def test_stale_marker_is_removed_and_album_moved(cfg: pi.Config):
+    upload(cfg, WORK / "01.flac")
+    upload(cfg, WORK / "03.flac.part")
+    upload(cfg, ALBUM / pi.PARTIAL_DIR / "04.flac")
+
+    now = later(MIN_AGE * pi.STALE_FACTOR + 1)
+    assert pi.process(cfg, now=now) is None
+    assert (cfg.music / WORK / "01.flac").exists()
+    assert not (cfg.music / WORK / "03.flac.part").exists() # Teildateien werden nie verschoben
+    assert not (cfg.incoming / ALBUM).exists()
+    text = log_text(cfg)
+    assert "abgebrochener Upload?" in text
+    assert text.count("Verwaiste Teildatei entfernt") == 2
+
+def test_growing_partial_is_not_stale(cfg: pi.Config):
+    # Ein Upload, der noch schreibt, hat eine frische Teildatei, auch wenn das Album schon alt ist
+    upload(cfg, WORK / "01.flac")
+    part = upload(cfg, WORK / "03.flac.part")
+    now = later(MIN_AGE * pi.STALE_FACTOR + 1)
+    os.utime(part, (now, now))
+    assert pi.process(cfg, now=now) is not None
+    assert part.exists() and not cfg.music.exists()
+
+def test_cross_device_move_copies_via_part_file(cfg: pi.Config, monkeypatch):
+    src = upload(cfg, WORK / "01.flac", b"fLaC" * 1000)
+    calls = []
+    real_rename = os.rename
+
+    def rename(a, b):
+        calls.append((a, b))
+        if Path(a) == src:
+            raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+        return real_rename(a, b)
+
+    monkeypatch.setattr(pi.os, "rename", rename)
+    pi.process(cfg, now=later(MIN_AGE + 1))
+    dest = cfg.music / WORK / "01.flac"
+    assert calls and dest.read_bytes() == b"fLaC" * 1000
+    assert not src.exists()
+    assert list(dest.parent.iterdir()) == [dest] # keine .part-Reste
+    assert dest.stat().st_mode & 0o004
+
+def test_junk_is_deleted_not_moved(cfg: pi.Config):
+    upload(cfg, WORK / "01.flac")
+    upload(cfg, WORK / ".DS_Store")
+    upload(cfg, WORK / "._01.flac")
+    upload(cfg, ALBUM / ".DS_Store")
+
+    pi.process(cfg, now=later(MIN_AGE + 1))
+    assert sorted(p.name for p in (cfg.music / WORK).iterdir()) == ["01.flac"]
+    assert not (cfg.music / ALBUM / ".DS_Store").exists()
+    assert not (cfg.incoming / ALBUM).exists() # Systemdateien gelöscht, Ordner entfernt
+
+def test_touched_list_contains_music_albums_only(cfg: pi.Config):
+    box = Path("Brahms,Johannes-GESAMTAUFNAHME_VOL._2") / "Brahms,Johannes-GESAMTAUFNAHME_VOL._2._CD1"
+    upload(cfg, WORK / "01.flac")
+    upload(cfg, box / "Brahms,Johannes-21_Lieder" / "01.flac")
+    upload(cfg, "Bach,Johann_Sebastian-WEIHNACHTSORATORIUM.pdf", b"%PDF")
+    upload(cfg, ALBUM / "notizen.txt", b"?")
+
+    pi.process(cfg, now=later(MIN_AGE + 1))
+    assert touched(cfg) == [str(cfg.music / ALBUM), str(cfg.music / box)]
+    assert (cfg.booklets / "Bach,Johann_Sebastian-WEIHNACHTSORATORIUM.pdf").exists()
+    assert (cfg.incoming / ALBUM / "notizen.txt").exists() # unbekannter Typ bleibt liegen
+
+    # Nächster Durchlauf: unbekannter Typ nur einmal gemeldet, Liste wird nur angehängt
+    upload(cfg, WORK / "02.flac")
+    pi.process(cfg, now=later(MIN_AGE + 1))
+    assert touched(cfg) == [str(cfg.music / ALBUM), str(cfg.music / box), str(cfg.music / ALBUM)]
+    assert log_text(cfg).count("Unbekannter Typ") == 1
+
+def test_existing_target_is_not_overwritten(cfg: pi.Config):
+    upload(cfg, WORK / "01.flac", b"neu")
+    (cfg.music / WORK).mkdir(parents=True)
+    (cfg.music / WORK / "01.flac").write_bytes(b"alt")
+    pi.process(cfg, now=later(MIN_AGE + 1))
+    assert (cfg.music / WORK / "01.flac").read_bytes() == b"alt"
+    assert (cfg.incoming / WORK / "01.flac").exists()
+    assert "Ziel existiert bereits" in log_text(cfg)
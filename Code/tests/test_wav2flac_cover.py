@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+# Cover-Einbettung in wav2flac: MIME-Typ unverändert übernommener Bilder und Entfernen des eingebetteten Covers,
+# wenn der Scan aus dem booklet-Ordner verschwindet (Neu-Taggen mit dem Schein-Encoder aus benchmark/).
+
+# --- Imports ---
+from pathlib import Path
+
+import pytest
+from mutagen.flac import FLAC
+from PIL import Image
+
+import wav2flac
+from benchmark import __main__ as bench
+from benchmark.archive import ArchiveSpec, generate_archive
+
+# --- load_picture ---
+@pytest.fixture
+def png(tmp_path: Path) -> Path:
+    path = tmp_path / "booklet-b.png"
+    Image.new("RGB", (40, 30), "white").save(path, "PNG")
+    return path
+
+def test_png_without_cache_keeps_png_mime(png: Path):
+    pic = wav2flac.load_picture.__wrapped__(png)
+    assert (pic.mime, pic.width, pic.height, pic.depth) == ("image/png", 40, 30, 24)
+
+def test_mime_follows_image_format_not_extension(png: Path, tmp_path: Path):
+    misnamed = png.rename(tmp_path / "booklet-b.jpg")
+    assert wav2flac.load_picture.__wrapped__(misnamed).mime == "image/png"
+
+def test_mime_from_extension_without_pillow(png: Path, monkeypatch):
+    monkeypatch.setattr(wav2flac, "Image", None)
+    assert wav2flac.load_picture.__wrapped__(png).mime == "image/png"
+
+def test_small_jpeg_is_embedded_unchanged(tmp_path: Path):
+    jpeg = tmp_path / "booklet-b.jpg"
+    Image.new("RGB", (50, 50), "gray").save(jpeg, "JPEG")
+    pic = wav2flac.load_picture.__wrapped__(jpeg, tmp_path / "cache")
+    assert pic.mime == "image/jpeg" and pic.data == jpeg.read_bytes()
+
+# --- Neu-Taggen ---
+def pictures(out: Path) -> list[int]:
+    return [len(FLAC(str(flac)).pictures) for flac in sorted(out.rglob("*.flac"))]
+
+def test_retag_removes_cover_of_deleted_scan(tmp_path: Path):
+    src, out = tmp_path / "archiv", tmp_path / "out"
+    generate_archive(src, ArchiveSpec(singles=1, boxes=0, works=1, tracks=2, seconds=0.05, covers=True))
+    bench.clear_caches()
+    manifest = bench.convert_once(src, out, "fake", workers=2)
+    assert pictures(out) == [1, 1]
+
+    for scan in src.rglob("booklet-b.jpg"):
+        scan.unlink()
+    bench.clear_caches()
+    manifest = bench.convert_once(src, out, "fake", workers=2, manifest=manifest)
+    assert pictures(out) == [0, 0]
+    assert all(entry.get("cover") is None for entry in manifest.values())
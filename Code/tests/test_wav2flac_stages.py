@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+# Kodier-Stufe von wav2flac: ein WAV-Header, den verify.py nicht auswerten kann, darf einen erfolgreich
+# kodierten Track nicht scheitern lassen; er bleibt ungeprüft (wie verify_buffer: Status "error").
+
+# --- Imports ---
+import struct
+from pathlib import Path
+
+import pytest
+
+import wav2flac, verify
+
+# --- Hilfen ---
+def chunk(chunk_id: bytes, payload: bytes) -> bytes:
+    return chunk_id + struct.pack("<I", len(payload)) + payload + b"\0" * (len(payload) & 1)
+
+FMT = struct.pack("<HHIIHH", 1, 2, 44100, 44100 * 4, 4, 16)
+PCM = bytes(400)
+
+def riff(*chunks: bytes) -> bytes:
+    body = b"WAVE" + b"".join(chunks)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+BROKEN = {
+    "data-vor-fmt": riff(chunk(b"data", PCM), chunk(b"fmt ", FMT)),      # ValueError
+    "fmt-zu-kurz": riff(chunk(b"fmt ", FMT[:6])),                         # struct.error
+    "kein-data": riff(chunk(b"fmt ", FMT)),                               # ValueError
+}
+
+def encode_stub(in_wav, out_flac, tags, picture, compression_level=5, dry_run=False, data=None) -> bool:
+    out_flac.parent.mkdir(parents=True, exist_ok=True)
+    out_flac.write_bytes(b"fLaC")
+    return False
+
+# --- Tests ---
+@pytest.mark.parametrize("name", BROKEN)
+def test_undigestable_wav_stays_unverified(tmp_path: Path, monkeypatch, capsys, name: str):
+    data = BROKEN[name]
+    assert verify.verify_buffer(data, tmp_path / "x.flac")[0] == verify.ERROR # gleiche Fälle wie im Prüfmodus
+
+    monkeypatch.setitem(wav2flac.ENCODERS, "stub", encode_stub)
+    wav = tmp_path / "track.wav"
+    wav.write_bytes(data)
+    job = wav2flac.TrackJob(wav, {}, size=len(data), data=data, tmp_flac=tmp_path / ".track.flac.part")
+    cfg = wav2flac.RunConfig(tmp_path, tmp_path / "out", {}, encoder="stub", verify=True)
+
+    assert wav2flac.encode_stage(job, cfg) == "write"
+    assert job.expected is None and job.data is None
+    assert "Prüfung nicht möglich" in capsys.readouterr().out
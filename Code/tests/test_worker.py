@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+# Worker-Modus von wav2flac mit mehreren echten Prozessen (Schein-Encoder, tests/fake_worker.py):
+# jeder Container wird genau einmal konvertiert, die Lease eines abgebrochenen Workers wird übernommen,
+# ein späterer Lauf über ein gewachsenes Archiv erfasst die neuen Container (neue Queue-Generation).
+
+# --- Imports ---
+import os, sys, json, time, shutil, signal, subprocess
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+from benchmark.archive import ArchiveSpec, generate_archive
+from work_queue import generations, generation_dir
+
+# --- Hilfen ---
+HELPER = Path(__file__).resolve().parent / "fake_worker.py"
+LEASE = 2 # Sekunden; kurz, damit die Übernahme im Test schnell geht
+TIMEOUT = 120
+
+def start_worker(archive: Path, out: Path, log: Path, worker_id: str, hang: Path | None = None) -> subprocess.Popen:
+    env = {**os.environ, "FAKE_WORKER_LOG": str(log)}
+    if hang is not None:
+        env["FAKE_WORKER_HANG"] = str(hang)
+    return subprocess.Popen(
+        [sys.executable, str(HELPER), "--worker", "--input", str(archive), "--output", str(out), "--encoder", "fake",
+         "--no-verify", "--workers", "2", "--lease", str(LEASE), "--worker-id", worker_id],
+        env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+def finish(*procs: subprocess.Popen) -> None:
+    for proc in procs:
+        output, _ = proc.communicate(timeout=TIMEOUT)
+        assert proc.returncode == 0, output
+
+def encoded(log: Path) -> Counter:
+    return Counter(log.read_text(encoding="utf-8").splitlines()) if log.exists() else Counter()
+
+def wait_for(predicate, timeout: float = TIMEOUT) -> None:
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "Zeitüberschreitung"
+        time.sleep(0.05)
+
+@pytest.fixture
+def archive(tmp_path: Path) -> Path:
+    # 3 Einzel-CDs + 1 Box mit 2 CDs = 5 Container, 10 WAVs
+    root = tmp_path / "archiv"
+    generate_archive(root, ArchiveSpec(singles=3, boxes=1, discs=2, works=1, tracks=2, seconds=0.05, covers=False))
+    return root
+
+def all_wavs(root: Path) -> set[str]:
+    return {str(p) for p in root.rglob("*.wav")}
+
+# --- Tests ---
+def test_workers_convert_each_container_once_and_take_over_leases(archive: Path, tmp_path: Path):
+    out, log, hang = tmp_path / "out", tmp_path / "encoded.log", tmp_path / "hang"
+    queue_dir = out / archive.name / ".wav2flac-queue"
+
+    # Worker A beansprucht einen Container, bleibt im Encoder hängen und wird hart beendet
+    a = start_worker(archive, out, log, "A", hang=hang)
+    try:
+        wait_for(hang.exists)
+    finally:
+        a.send_signal(signal.SIGKILL)
+        a.communicate(timeout=TIMEOUT)
+    gen = generation_dir(queue_dir, generations(queue_dir)[-1])
+    held = [p.name.removesuffix(".lease") for p in (gen / "leases").glob("*.lease")
+            if json.loads(p.read_text(encoding="utf-8"))["worker"] == "A"]
+    assert len(held) == 1 # Lease von A bleibt liegen, bis sie abläuft
+
+    # B und C arbeiten alles ab, einschließlich des Containers von A
+    b, c = start_worker(archive, out, log, "B"), start_worker(archive, out, log, "C")
+    finish(b, c)
+
+    counts = encoded(log)
+    assert set(counts) == all_wavs(archive)
+    assert all(n == 1 for n in counts.values()), counts
+    results = {p.stem: json.loads(p.read_text(encoding="utf-8")) for p in (gen / "done").glob("*.json")}
+    assert len(results) == 5 and (gen / "complete").exists()
+    assert results[held[0]]["worker"] in ("B", "C")
+    assert sum(r["counts"].get("converted", 0) for r in results.values()) == 10
+
+    manifest = json.loads((out / archive.name / ".wav2flac-manifest.json").read_text(encoding="utf-8"))["files"]
+    assert len(manifest) == 10
+    assert all((out / archive.name / entry["flac"]).exists() for entry in manifest.values())
+
+def test_rerun_opens_new_generation_for_grown_archive(archive: Path, tmp_path: Path):
+    out, log = tmp_path / "out", tmp_path / "encoded.log"
+    queue_dir = out / archive.name / ".wav2flac-queue"
+    finish(start_worker(archive, out, log, "A"), start_worker(archive, out, log, "B"))
+    assert sum(encoded(log).values()) == 10
+    first = generations(queue_dir)
+
+    # Unverändertes Archiv: neue Generation, aber nichts neu kodiert
+    finish(start_worker(archive, out, log, "C"))
+    assert sum(encoded(log).values()) == 10
+    assert generations(queue_dir) == [first[-1] + 1] # abgeschlossene Generation aufgeräumt
+
+    # Neuer Container im Archiv: wird beim nächsten Lauf konvertiert, sonst nichts
+    album = next((archive / "EinzelCDs").iterdir())
+    new_album = album.with_name(album.name + "_Neu")
+    shutil.copytree(album, new_album)
+    finish(start_worker(archive, out, log, "D"), start_worker(archive, out, log, "E"))
+    counts = encoded(log)
+    assert set(counts) == all_wavs(archive)
+    assert all(n == 1 for n in counts.values()), counts
+    manifest = json.loads((out / archive.name / ".wav2flac-manifest.json").read_text(encoding="utf-8"))["files"]
+    assert len(manifest) == 12